@@ -0,0 +1,275 @@
+"""
+Write-behind answers.
+
+By default ("immediate") an answer's counter increment, stats delta and
+schedule update are written and committed before the response is sent, so
+answer latency includes the term's row lock and a commit. The other two
+durability modes take those writes off the request path; grading itself is
+unchanged, since it only reads the term:
+
+- ``commit``: the answer is appended to ``answer_events`` and the response
+  is sent once that insert is committed. Inserts never wait on a row lock.
+- ``enqueue``: the answer is put on an in-process asyncio queue and the
+  response is sent straight away. Answers still queued when the process
+  dies are lost.
+
+AnswerWriter runs in the app's event loop, from the first write-behind
+answer on (or from startup when that is the default mode), so a worker that
+only serves immediate answers never polls the table. Every ``interval`` seconds, or
+sooner once ``batch_size`` answers are queued, it takes one transaction to
+log the queued answers, claim logged ones not folded yet, and fold both into
+the counters. Answers to the same term are grouped like in the batch
+endpoint, so a hot term costs one UPDATE per flush rather than one per
+answer. Claims use FOR UPDATE SKIP LOCKED on Postgres, so each event is
+folded once however many processes run a writer. Queued answers to terms
+deleted since they were graded (by a sync) are dropped, as there is nothing
+left to update and their events would break the foreign key.
+
+Counters, stats and the practice pool lag the answers by up to one
+interval. Folded events stay in the table as the answer history.
+"""
+
+import asyncio
+import time
+from datetime import datetime
+from operator import attrgetter
+from typing import Any, Awaitable, Callable, List, NamedTuple, Optional, Sequence
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from database import AnswerEvent, Term
+
+DURABILITY_MODES = ("immediate", "commit", "enqueue")
+DEFAULT_FLUSH_INTERVAL_SECONDS = 1.0
+# Answers folded per transaction
+DEFAULT_FLUSH_BATCH_SIZE = 1000
+# Enqueueing waits for the flusher once this many answers are queued
+DEFAULT_MAX_QUEUED = 10_000
+
+
+class Answer(NamedTuple):
+    term_id: int
+    language_id: int
+    user_id: Optional[str]
+    correct: bool
+    answered_at: datetime
+
+
+def log_answers(db: Session, answers: Sequence[Answer], folded: bool = False) -> None:
+    """Append `answers` to ``answer_events``. Does not commit."""
+    if answers:
+        db.execute(insert(AnswerEvent), [{**answer._asdict(), "folded": folded} for answer in answers])
+
+
+def claim_answers(db: Session, limit: int) -> List[Answer]:
+    """Mark up to `limit` unfolded events folded and return them, oldest first. Does not commit.
+
+    On Postgres, events another transaction has claimed are skipped rather than waited for.
+    """
+    pending = (
+        select(AnswerEvent.id)
+        .where(AnswerEvent.folded == False)
+        .order_by(AnswerEvent.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    rows = db.execute(
+        update(AnswerEvent)
+        .where(AnswerEvent.id.in_(pending.scalar_subquery()))
+        .values(folded=True)
+        .returning(AnswerEvent.id, *(getattr(AnswerEvent, name) for name in Answer._fields))
+        .execution_options(synchronize_session=False)
+    ).all()
+    return [Answer(*row[1:]) for row in sorted(rows, key=lambda row: row[0])]
+
+
+def existing_answers(db: Session, answers: Sequence[Answer]) -> List[Answer]:
+    """Return the answers in `answers` whose term still exists."""
+    if not answers:
+        return []
+    term_ids = {answer.term_id for answer in answers}
+    existing = set(db.scalars(select(Term.id_vocabulary).where(Term.id_vocabulary.in_(term_ids))))
+    return [answer for answer in answers if answer.term_id in existing]
+
+
+class AnswerWriter:
+    """Folds write-behind answers into the counters from a background task.
+
+    `run_session(fn, *args)` runs ``fn(db, *args)`` in a session of its own.
+    `fold(db, answers)` applies answers without committing; its return value
+    is passed to `after_commit` once the flush has committed.
+    """
+
+    def __init__(
+        self,
+        run_session: Callable[..., Awaitable[Any]],
+        fold: Callable[[Session, List[Answer]], Any],
+        after_commit: Optional[Callable[[Any], None]] = None,
+        interval: float = DEFAULT_FLUSH_INTERVAL_SECONDS,
+        batch_size: int = DEFAULT_FLUSH_BATCH_SIZE,
+        max_queued: int = DEFAULT_MAX_QUEUED,
+    ):
+        self.run_session = run_session
+        self.fold = fold
+        self.after_commit = after_commit
+        self.interval = interval
+        self.batch_size = batch_size
+        self.max_queued = max_queued
+        # Created by start(), in the loop that serves requests
+        self._queue: Optional[asyncio.Queue] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        # Answers taken off the queue by a flush that failed, retried first
+        self._retry: List[Answer] = []
+        self.enqueued = 0
+        self.folded = 0
+        # Queued answers to terms deleted before they were folded
+        self.dropped = 0
+        self.flushes = 0
+        self.failures = 0
+        self.last_flush_ms: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._stopping
+
+    async def start(self, background: bool = True) -> None:
+        """Get ready to take answers; the background task starts now only with `background`.
+
+        Otherwise it starts on the first ``ensure_running()``, so an app
+        whose answers are all immediate sends no queries while idle.
+        """
+        self._queue = asyncio.Queue(maxsize=self.max_queued)
+        self._wake = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._stopping = False
+        if background:
+            self.ensure_running()
+
+    def ensure_running(self) -> None:
+        """Start the background task if start() was called and it is not running yet."""
+        if self._queue is not None and self._task is None and not self._stopping:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the background task and fold everything still queued or logged."""
+        if self._queue is None:
+            return
+        self._stopping = True
+        if self._task is not None:
+            self._wake.set()
+            await self._task
+            self._task = None
+        await self.flush()
+
+    async def enqueue(self, answers: Sequence[Answer]) -> None:
+        """Queue `answers` for the next flush; waits while the queue is full."""
+        for answer in answers:
+            await self._queue.put(answer)
+        self.enqueued += len(answers)
+        if self._queue.qsize() >= self.batch_size:
+            self._wake.set()
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await self.flush()
+
+    def _drain(self) -> List[Answer]:
+        answers, self._retry = self._retry, []
+        while len(answers) < self.batch_size and not self._queue.empty():
+            answers.append(self._queue.get_nowait())
+        return answers
+
+    def _flush_batch(self, db: Session, queued: List[Answer]):
+        kept = existing_answers(db, queued)
+        log_answers(db, kept, folded=True)
+        claimed = claim_answers(db, self.batch_size)
+        result = self.fold(db, sorted(kept + claimed, key=attrgetter("answered_at")))
+        db.commit()
+        return len(claimed), len(queued) - len(kept), result
+
+    async def _flush_singly(self, queued: List[Answer]) -> int:
+        """Flush `queued` one answer per transaction after a batch broke a constraint.
+
+        Answers that still break one (a term deleted after the check in
+        _flush_batch) are dropped rather than retried forever. Returns the
+        number folded; other errors propagate.
+        """
+        folded = 0
+        for i, answer in enumerate(queued):
+            try:
+                claimed, dropped, result = await self.run_session(self._flush_batch, [answer])
+            except IntegrityError:
+                self.dropped += 1
+                continue
+            except Exception:
+                self._retry = queued[i:] + self._retry
+                raise
+            folded += 1 - dropped + claimed
+            self.dropped += dropped
+            if self.after_commit is not None:
+                self.after_commit(result)
+        return folded
+
+    async def flush(self) -> int:
+        """Fold everything queued and logged so far; return the number of answers folded."""
+        if self._flush_lock is None:
+            return 0
+        folded = 0
+        async with self._flush_lock:
+            while True:
+                queued = self._drain()
+                started = time.perf_counter()
+                try:
+                    claimed, dropped, result = await self.run_session(self._flush_batch, queued)
+                except IntegrityError as exc:
+                    # Retrying the same batch would fail the same way and hold up every later answer
+                    self.failures += 1
+                    self.last_error = repr(exc)
+                    try:
+                        batch_folded = await self._flush_singly(queued)
+                    except Exception as exc:
+                        self.last_error = repr(exc)
+                        return folded
+                    claimed = 0
+                except Exception as exc:
+                    # Logged answers stay unfolded in the table; queued ones go back for the next flush
+                    self._retry = queued + self._retry
+                    self.failures += 1
+                    self.last_error = repr(exc)
+                    return folded
+                else:
+                    batch_folded = len(queued) - dropped + claimed
+                    self.dropped += dropped
+                    if self.after_commit is not None:
+                        self.after_commit(result)
+                self.flushes += 1
+                self.last_flush_ms = round((time.perf_counter() - started) * 1000, 3)
+                folded += batch_folded
+                self.folded += batch_folded
+                if claimed < self.batch_size and self._queue.empty():
+                    break
+        return folded
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "queued": (self._queue.qsize() if self._queue is not None else 0) + len(self._retry),
+            "enqueued": self.enqueued,
+            "folded": self.folded,
+            "dropped": self.dropped,
+            "flushes": self.flushes,
+            "failures": self.failures,
+            "last_flush_ms": self.last_flush_ms,
+            "last_error": self.last_error,
+        }
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Load test for the main API paths: GET /flashcards/random, GET
+/flashcards/stats and POST /flashcards/answer.
+
+For every deck size a fresh synthetic deck is seeded (SQLite, or Postgres
+when DATABASE_URL is set) and each scenario is driven at a fixed
+concurrency, either in-process through httpx's ASGI transport, over HTTP
+against a uvicorn subprocess, or both. Results (p50/p95/p99 latency,
+throughput, errors) are written as JSON together with the git commit, so
+runs can be compared between commits with --compare.
+
+Usage:
+    python benchmarks/bench_api.py --sizes 1000 100000 --concurrency 8 --requests 2000 --json before.json
+    python benchmarks/bench_api.py --sizes 1000 100000 --json after.json --compare before.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+import httpx
+from sqlalchemy import func
+
+from common import PROJECT_ROOT, make_sessionmaker, reset_schema, seed_deck, summarize
+from database import Term
+from main import create_app
+
+SCENARIOS = ("random", "stats", "answer")
+TRANSPORTS = ("inprocess", "uvicorn")
+SERVER_START_TIMEOUT = 30.0
+
+
+def request_for(scenario: str, rng: random.Random, id_range):
+    """Return (method, path, kwargs) for one request of `scenario`."""
+    if scenario == "random":
+        return "GET", "/flashcards/random", {"params": {"language_code": "ar"}}
+    if scenario == "stats":
+        return "GET", "/flashcards/stats", {"params": {"language_code": "ar"}}
+    # seed_deck names term i "term {i}", so the correct answer follows from the id
+    lo, hi = id_range
+    term_id = rng.randint(lo, hi)
+    answer = {"term_id": term_id, "user_answer": f"term {term_id - lo}", "answer_type": "english"}
+    return "POST", "/flashcards/answer", {"json": answer}
+
+
+async def drive(client: httpx.AsyncClient, scenario: str, total: int, concurrency: int, id_range, seed: int) -> dict:
+    rng = random.Random(seed)
+    plan = [request_for(scenario, rng, id_range) for _ in range(total)]
+    remaining = iter(plan)
+    latencies, errors = [], 0
+
+    async def worker():
+        nonlocal errors
+        for method, path, kwargs in remaining:
+            start = time.perf_counter()
+            r = await client.request(method, path, **kwargs)
+            latencies.append(time.perf_counter() - start)
+            if r.status_code >= 400:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return {**summarize(latencies), "throughput_rps": round(total / elapsed, 1), "errors": errors}
+
+
+async def run_scenarios(client, args, id_range) -> list:
+    rows = []
+    for scenario in SCENARIOS:
+        await drive(client, scenario, min(args.requests, 50), args.concurrency, id_range, args.seed)  # warm up
+        rows.append({"scenario": scenario, **await drive(client, scenario, args.requests, args.concurrency, id_range, args.seed)})
+    return rows
+
+
+async def run_inprocess(session_maker, args, id_range) -> list:
+    transport = httpx.ASGITransport(app=create_app(session_maker, stats_counters=args.stats_counters))
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        return await run_scenarios(client, args, id_range)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def wait_until_up(base_url: str, server: subprocess.Popen) -> None:
+    deadline = time.monotonic() + SERVER_START_TIMEOUT
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise RuntimeError(f"uvicorn exited with {server.returncode}")
+            try:
+                if (await client.get("/health")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.1)
+    raise RuntimeError("uvicorn did not start in time")
+
+
+async def run_uvicorn(args, id_range) -> list:
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, __file__, "--serve", "--port", str(port)] + (["--stats-counters"] if args.stats_counters else []),
+        cwd=os.getcwd(),
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        await wait_until_up(base_url, server)
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=base_url, limits=limits) as client:
+            return await run_scenarios(client, args, id_range)
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+
+def serve(port: int, stats_counters: bool) -> None:
+    """Run the app under uvicorn on the benchmark database (used by the uvicorn transport)."""
+    import uvicorn
+    app = create_app(make_sessionmaker(), stats_counters=stats_counters)
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning", access_log=False)
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(results: list, baseline_path: str) -> None:
+    """Print p50/p99/throughput changes against a previous run's JSON."""
+    with open(baseline_path) as fh:
+        baseline = json.load(fh)
+
+    def key(row):
+        return row["deck_size"], row["transport"], row["scenario"]
+
+    before = {key(row): row for row in baseline["results"]}
+    print(f"\ncompared with {baseline_path} (commit {baseline['meta']['commit']})")
+    for row in results:
+        old = before.get(key(row))
+        if old is None:
+            continue
+        changes = []
+        for metric in ("p50_ms", "p99_ms", "throughput_rps"):
+            if old[metric]:
+                changes.append(f"{metric}={(row[metric] / old[metric] - 1) * 100:+.1f}%")
+        print(f"size={row['deck_size']:>9} {row['transport']:<10} {row['scenario']:<7} " + " ".join(changes))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 100_000])
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=2_000, help="Requests per scenario")
+    parser.add_argument("--transport", choices=TRANSPORTS + ("both",), default="both")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--stats-counters", action="store_true", help="Serve stats from the language_stats counters")
+    parser.add_argument("--json", dest="json_path", help="Write results to this JSON file")
+    parser.add_argument("--compare", dest="baseline_path", help="Previous --json output to compare against")
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, default=0, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.port, args.stats_counters)
+        return
+
+    transports = TRANSPORTS if args.transport == "both" else (args.transport,)
+    session_maker = make_sessionmaker()
+    results = []
+    for size in args.sizes:
+        reset_schema(session_maker)
+        language_id = seed_deck(session_maker, size)
+        db = session_maker()
+        try:
+            id_range = db.query(func.min(Term.id_vocabulary), func.max(Term.id_vocabulary)).filter(
+                Term.language_id == language_id
+            ).one()
+        finally:
+            db.close()
+
+        for transport in transports:
+            if transport == "inprocess":
+                rows = asyncio.run(run_inprocess(session_maker, args, id_range))
+            else:
+                rows = asyncio.run(run_uvicorn(args, id_range))
+            for row in rows:
+                row = {"deck_size": size, "transport": transport, "concurrency": args.concurrency, **row}
+                results.append(row)
+                print(
+                    f"size={size:>9} {transport:<10} {row['scenario']:<7} "
+                    f"p50={row['p50_ms']:>8.3f}ms p95={row['p95_ms']:>8.3f}ms p99={row['p99_ms']:>8.3f}ms "
+                    f"{row['throughput_rps']:>8.1f} req/s errors={row['errors']}"
+                )
+
+    meta = {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "database": session_maker.kw["bind"].dialect.name,
+        "requests": args.requests,
+        "seed": args.seed,
+        "stats_counters": args.stats_counters,
+    }
+    if args.json_path:
+        with open(args.json_path, "w") as fh:
+            json.dump({"meta": meta, "results": results}, fh, indent=2)
+    if args.baseline_path:
+        compare(results, args.baseline_path)
+
+
+if __name__ == "__main__":
+    main()
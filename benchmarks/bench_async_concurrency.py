@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Requests per second for the sync and async database modes of create_app
+under concurrent load. Requests are driven in-process through httpx's ASGI
+transport, so the numbers isolate event-loop blocking from network cost.
+
+In sync mode the handlers block the loop while holding pooled connections,
+so a concurrency above the pool capacity (pool_size + max_overflow) stalls
+until the pool times out; that run is reported as "pool_exhausted".
+
+Usage:
+    python benchmarks/bench_async_concurrency.py --deck-size 10000 --concurrency 8 --requests 2000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+
+import httpx
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from common import make_sessionmaker, reset_schema, seed_deck
+from db_engine import get_async_engine
+from main import create_app
+
+
+async def drive(app, total: int, concurrency: int) -> float:
+    """Fire `total` GET /flashcards/random requests with `concurrency` in flight; return req/s."""
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        remaining = iter(range(total))
+
+        async def worker():
+            for _ in remaining:
+                r = await client.get("/flashcards/random", params={"language_code": "ar"})
+                r.raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return total / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--deck-size", type=int, default=10_000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=2_000)
+    parser.add_argument("--json", dest="json_path", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    sync_maker = make_sessionmaker()
+    reset_schema(sync_maker)
+    seed_deck(sync_maker, args.deck_size)
+
+    sync_url = os.getenv("DATABASE_URL") or str(sync_maker.kw["bind"].url)
+    async_engine = get_async_engine(sync_url)
+    async_maker = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+    results = []
+    for mode, maker in (("sync", sync_maker), ("async", async_maker)):
+        try:
+            rps = asyncio.run(drive(create_app(maker), args.requests, args.concurrency))
+        except PoolTimeoutError:
+            results.append({"mode": mode, "concurrency": args.concurrency, "requests": args.requests, "rps": None, "error": "pool_exhausted"})
+            print(f"{mode:<6} concurrency={args.concurrency:<4} pool exhausted")
+        else:
+            results.append({"mode": mode, "concurrency": args.concurrency, "requests": args.requests, "rps": round(rps, 1)})
+            print(f"{mode:<6} concurrency={args.concurrency:<4} {rps:>10.1f} req/s")
+        if mode == "async":
+            asyncio.run(async_engine.dispose())
+
+    if args.json_path:
+        with open(args.json_path, "w") as fh:
+            json.dump(results, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
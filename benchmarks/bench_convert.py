@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Peak RSS and rows per second of the spreadsheet -> CSV conversion, comparing
+the streaming converter in spreadsheet.py with the old pd.read_excel path.
+Each conversion runs in a fresh subprocess so its peak RSS is measured alone.
+
+Usage:
+    python benchmarks/bench_convert.py --rows 10000 100000 --chunk-size 1000
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from openpyxl import Workbook
+
+from common import PROJECT_ROOT
+
+HEADER = [
+    "Words (English)", "Word (Arabic script)", "Word (Arabic with Roman characters)",
+    "Sample sentence (Arabic)", "Sample sentence explained", "Notes", "Learned", "Correct Counter",
+]
+
+STREAMING = """
+import sys
+from spreadsheet import convert_to_csv
+convert_to_csv(sys.argv[1], sys.argv[2], chunk_size=int(sys.argv[3]))
+"""
+
+PANDAS = """
+import sys
+import pandas as pd
+pd.read_excel(sys.argv[1]).to_csv(sys.argv[2], index=False)
+"""
+
+
+def write_sheet(path: str, rows: int) -> None:
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Master List")
+    sheet.append(HEADER)
+    for i in range(rows):
+        sheet.append([f"term {i}", f"كلمة {i}", f"kalima {i}", f"جملة {i}", f"sentence {i}", None, i % 2 == 0, i % 4])
+    workbook.save(path)
+
+
+def run(script: str, xlsx: str, csv_path: str, chunk_size: int):
+    """Run one conversion in a child process; return (seconds, peak RSS in MiB)."""
+    started = time.perf_counter()
+    child = subprocess.Popen([sys.executable, "-c", script, xlsx, csv_path, str(chunk_size)], cwd=PROJECT_ROOT)
+    # wait4 reports the rusage of this child alone
+    _, status, usage = os.wait4(child.pid, 0)
+    elapsed = time.perf_counter() - started
+    child.returncode = os.waitstatus_to_exitcode(status)
+    if child.returncode != 0:
+        raise subprocess.CalledProcessError(child.returncode, child.args)
+    return elapsed, usage.ru_maxrss / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--chunk-size", type=int, default=1_000)
+    parser.add_argument("--json", dest="json_path", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in args.rows:
+            for name, script in (("streaming", STREAMING), ("pandas", PANDAS)):
+                xlsx = os.path.join(tmp, f"sheet_{rows}.xlsx")
+                if not os.path.exists(xlsx):
+                    write_sheet(xlsx, rows)
+                elapsed, peak_mib = run(script, xlsx, os.path.join(tmp, "out.csv"), args.chunk_size)
+                row = {
+                    "converter": name,
+                    "rows": rows,
+                    "seconds": round(elapsed, 3),
+                    "rows_per_second": round(rows / elapsed, 1),
+                    "peak_rss_mib": round(peak_mib, 1),
+                }
+                results.append(row)
+                print(f"{name:<10} rows={rows:>9} {row['rows_per_second']:>10.1f} rows/s  peak RSS {row['peak_rss_mib']:>8.1f} MiB")
+
+    if args.json_path:
+        with open(args.json_path, "w") as fh:
+            json.dump(results, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
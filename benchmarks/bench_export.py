@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Streaming exports (export.py): throughput and peak memory by deck size.
+
+For each format, the body ``GET /export`` would send is generated by
+export.stream_export and discarded, first timed, then again under
+tracemalloc for the peak of Python allocations. csv and jsonl also run
+gzipped. ``buffered`` is the approach streaming replaces: every row
+fetched with .all() and the whole jsonl body rendered before sending.
+
+Peak memory should stay flat as the deck grows for the streamed formats,
+and grow with it for ``buffered``. Driver buffers outside Python (libpq)
+are not counted, which is why Postgres needs the server-side cursor that
+yield_per asks for.
+
+Usage:
+    python benchmarks/bench_export.py --sizes 10000 100000 1000000
+"""
+
+import argparse
+import gc
+import json
+import time
+import tracemalloc
+
+from common import make_sessionmaker, reset_schema, seed_deck
+from export import ApkgWriter, CsvWriter, JsonlWriter, export_query, stream_export
+
+CASES = {
+    "csv": (CsvWriter, False),
+    "csv.gz": (CsvWriter, True),
+    "jsonl": (JsonlWriter, False),
+    "jsonl.gz": (JsonlWriter, True),
+    "apkg": (None, False),
+}
+
+
+def run_case(session_maker, language_id: int, case: str) -> int:
+    """Generate one export body; return its size in bytes."""
+    if case == "buffered":
+        db = session_maker()
+        try:
+            rows = db.execute(export_query(language_id, None, None).execution_options(yield_per=None)).all()
+            return len(JsonlWriter().write(rows))
+        finally:
+            db.close()
+    writer_class, gzip = CASES[case]
+    writer = writer_class() if writer_class is not None else ApkgWriter(language_id, "Arabic")
+    return sum(len(chunk) for chunk in stream_export(session_maker, export_query(language_id, None, None), writer, gzip=gzip))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--json", dest="json_path", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    session_maker = make_sessionmaker()
+    results = []
+    for size in args.sizes:
+        reset_schema(session_maker)
+        language_id = seed_deck(session_maker, size)
+        for case in list(CASES) + ["buffered"]:
+            gc.collect()
+            start = time.perf_counter()
+            nbytes = run_case(session_maker, language_id, case)
+            seconds = time.perf_counter() - start
+
+            gc.collect()
+            tracemalloc.start()
+            run_case(session_maker, language_id, case)
+            _size, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            row = {
+                "size": size,
+                "case": case,
+                "seconds": round(seconds, 3),
+                "rows_per_s": round(size / seconds),
+                "mb": round(nbytes / 2**20, 2),
+                "peak_mb": round(peak / 2**20, 2),
+            }
+            results.append(row)
+            print(
+                f"size={size:<8} {case:<9} {row['seconds']:>7.3f}s {row['rows_per_s']:>9} rows/s "
+                f"body={row['mb']:>8.2f}MB peak={row['peak_mb']:>8.2f}MB"
+            )
+
+    if args.json_path:
+        with open(args.json_path, "w") as fh:
+            json.dump(results, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
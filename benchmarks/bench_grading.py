@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Grading throughput: the old per-request path (closure rebuilt per call,
+re.sub on both the answer and the stored term) against comparing the
+normalized answer with the term's precomputed grading key.
+
+Usage:
+    python benchmarks/bench_grading.py --answers 200000
+"""
+
+import argparse
+import json
+import re
+import time
+
+import common  # noqa: F401  (puts the project on sys.path)
+from grading import answer_key
+
+TERMS = [("Good morning", "صَباح الخير"), ("library", "مكتبة"), ("who", "مَن"), ("on", "على")]
+
+
+def legacy(user_answer: str, stored: str) -> bool:
+    def normalize_text(text: str) -> str:
+        return re.sub(r'\s+', ' ', text.strip().lower())
+
+    return normalize_text(user_answer) == normalize_text(stored)
+
+
+def keyed(user_answer: str, stored_key: str) -> bool:
+    return answer_key(user_answer) == stored_key
+
+
+def throughput(fn, pairs, total: int) -> float:
+    started = time.perf_counter()
+    for i in range(total):
+        fn(*pairs[i % len(pairs)])
+    return total / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--answers", type=int, default=200_000)
+    parser.add_argument("--json", dest="json_path", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    answers = [(f"  {english.upper()} ", arabic) for english, arabic in TERMS]
+    legacy_pairs = [(answer, stored) for (answer, _), (stored, _) in zip(answers, TERMS)]
+    keyed_pairs = [(answer, answer_key(stored)) for (answer, _), (stored, _) in zip(answers, TERMS)]
+    legacy_pairs += [(arabic, arabic) for _, arabic in TERMS]
+    keyed_pairs += [(arabic, answer_key(arabic)) for _, arabic in TERMS]
+
+    results = []
+    for name, fn, pairs in (("legacy_re_sub", legacy, legacy_pairs), ("precomputed_key", keyed, keyed_pairs)):
+        rate = throughput(fn, pairs, args.answers)
+        results.append({"grader": name, "answers": args.answers, "answers_per_second": round(rate, 1)})
+        print(f"{name:<16} {rate:>12,.0f} answers/s")
+
+    if args.json_path:
+        with open(args.json_path, "w") as fh:
+            json.dump(results, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
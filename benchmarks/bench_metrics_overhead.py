@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Cost of the metrics subsystem: /flashcards/random latency with
+create_app(metrics=False) versus metrics=True, plus the time to render
+/metrics. Requests are driven in-process through httpx's ASGI transport and
+the two apps are measured in alternating rounds so drift affects both alike.
+
+Usage:
+    python benchmarks/bench_metrics_overhead.py --deck-size 10000 --requests 2000 --rounds 5
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+import httpx
+
+from common import make_sessionmaker, reset_schema, seed_deck, summarize
+from main import create_app
+
+
+async def measure(app, requests: int, path: str, params: dict) -> list:
+    transport = httpx.ASGITransport(app=app)
+    samples = []
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for _ in range(requests):
+            start = time.perf_counter()
+            r = await client.get(path, params=params)
+            r.raise_for_status()
+            samples.append(time.perf_counter() - start)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--deck-size", type=int, default=10_000)
+    parser.add_argument("--requests", type=int, default=2_000, help="Requests per app per round")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--json", dest="json_path", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    session_maker = make_sessionmaker()
+    reset_schema(session_maker)
+    seed_deck(session_maker, args.deck_size)
+
+    apps = {"metrics_off": create_app(session_maker, metrics=False), "metrics_on": create_app(session_maker, metrics=True)}
+    samples = {name: [] for name in apps}
+    params = {"language_code": "ar"}
+    for name, app in apps.items():
+        asyncio.run(measure(app, 50, "/flashcards/random", params))  # warm up
+    for _ in range(args.rounds):
+        for name, app in apps.items():
+            samples[name] += asyncio.run(measure(app, args.requests, "/flashcards/random", params))
+
+    results = []
+    for name in apps:
+        row = {"app": name, "mean_ms": round(sum(samples[name]) / len(samples[name]) * 1000, 4), **summarize(samples[name])}
+        results.append(row)
+        print(f"{name:<12} mean={row['mean_ms']:>8.4f}ms p50={row['p50_ms']:>8.3f}ms p99={row['p99_ms']:>8.3f}ms")
+    off, on = results
+    overhead = {"app": "overhead", "mean_ms": round(on["mean_ms"] - off["mean_ms"], 4),
+                "mean_pct": round((on["mean_ms"] / off["mean_ms"] - 1) * 100, 2)}
+    results.append(overhead)
+    print(f"overhead     mean={overhead['mean_ms']:>8.4f}ms ({overhead['mean_pct']:+.2f}%)")
+
+    render = asyncio.run(measure(apps["metrics_on"], 200, "/metrics", {}))
+    row = {"app": "render_metrics", **summarize(render)}
+    results.append(row)
+    print(f"/metrics     p50={row['p50_ms']:>8.3f}ms p99={row['p99_ms']:>8.3f}ms")
+
+    if args.json_path:
+        with open(args.json_path, "w") as fh:
+            json.dump(results, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Next-card selection on a large deck: ORDER BY random() over the practice
+pool, the random-id sampler, and the spaced-repetition due queue (range
+scan of ix_terms_due_queue).
+
+A fraction of the deck is given an SM-2 schedule with due dates spread
+around "now", so the due queue has both overdue and future entries.
+
+Usage:
+    python benchmarks/bench_next_due.py --size 1000000 --repeat 200
+"""
+
+import argparse
+import json
+import random
+from datetime import timedelta
+
+from sqlalchemy import bindparam, func, update
+
+from common import make_sessionmaker, reset_schema, seed_deck, summarize, time_call
+from database import Term
+from sampler import candidate_filters, due_terms, sample_term
+from scheduler import utcnow
+
+SCHEDULE_BATCH_SIZE = 10_000
+
+
+def schedule_deck(session_maker, language_id: int, scheduled_ratio: float, spread_days: int, seed: int = 0) -> int:
+    """Give every `1 / scheduled_ratio`-th term a due date within +-spread_days of now."""
+    rng = random.Random(seed)
+    now = utcnow()
+    step = max(int(round(1 / scheduled_ratio)), 1)
+    statement = (
+        update(Term)
+        .where(Term.id_vocabulary == bindparam("term_id"))
+        .values(due_at=bindparam("due_at"), interval_days=bindparam("interval_days"), repetitions=1)
+    )
+    db = session_maker()
+    try:
+        ids = [row.id_vocabulary for row in db.query(Term.id_vocabulary).filter(Term.language_id == language_id).order_by(Term.id_vocabulary)]
+        scheduled = ids[::step]
+        for start in range(0, len(scheduled), SCHEDULE_BATCH_SIZE):
+            # Core executemany on the session's connection (not an ORM bulk update)
+            db.connection().execute(statement, [
+                {
+                    "term_id": term_id,
+                    "due_at": now + timedelta(minutes=rng.randint(-spread_days * 1440, spread_days * 1440)),
+                    "interval_days": rng.randint(1, spread_days),
+                }
+                for term_id in scheduled[start:start + SCHEDULE_BATCH_SIZE]
+            ])
+        db.commit()
+        return len(scheduled)
+    finally:
+        db.close()
+
+
+def order_by_random(db, language_id):
+    return db.query(Term).filter(*candidate_filters(language_id)).order_by(func.random()).first()
+
+
+def next_due(db, language_id):
+    return due_terms(db, language_id, utcnow())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=1_000_000)
+    parser.add_argument("--scheduled-ratio", type=float, default=0.5)
+    parser.add_argument("--spread-days", type=int, default=30)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--random-repeat", type=int, default=20, help="Repeats for the slow ORDER BY random() baseline")
+    parser.add_argument("--json", dest="json_path", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    session_maker = make_sessionmaker()
+    reset_schema(session_maker)
+    language_id = seed_deck(session_maker, args.size)
+    scheduled = schedule_deck(session_maker, language_id, args.scheduled_ratio, args.spread_days)
+    print(f"deck={args.size} scheduled={scheduled}")
+
+    results = []
+    db = session_maker()
+    try:
+        strategies = (
+            ("order_by_random", order_by_random, args.random_repeat),
+            ("sampler", sample_term, args.repeat),
+            ("due_queue", next_due, args.repeat),
+        )
+        for name, fn, repeat in strategies:
+            samples = time_call(lambda: fn(db, language_id), repeat)
+            row = {"deck_size": args.size, "scheduled": scheduled, "strategy": name, **summarize(samples)}
+            results.append(row)
+            print(f"{name:<16} p50={row['p50_ms']:>9.3f}ms p95={row['p95_ms']:>9.3f}ms p99={row['p99_ms']:>9.3f}ms")
+    finally:
+        db.close()
+
+    if args.json_path:
+        with open(args.json_path, "w") as fh:
+            json.dump(results, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Compare the old ORDER BY random() card selection with the index-backed
+sampler in sampler.py across deck sizes.
+
+Usage:
+    python benchmarks/bench_random_flashcard.py --sizes 1000 10000 100000 --repeat 200
+"""
+
+import argparse
+import json
+
+from sqlalchemy import func
+
+from common import make_sessionmaker, reset_schema, seed_deck, summarize, time_call
+from database import Term
+from sampler import candidate_filters, sample_term
+
+
+def order_by_random(db, language_id, learned_only):
+    return db.query(Term).filter(*candidate_filters(language_id, learned_only)).order_by(func.random()).first()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--json", dest="json_path", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    session_maker = make_sessionmaker()
+    results = []
+    for size in args.sizes:
+        reset_schema(session_maker)
+        language_id = seed_deck(session_maker, size)
+        db = session_maker()
+        try:
+            for learned_only in (False, True):
+                for name, fn in (("order_by_random", order_by_random), ("sampler", sample_term)):
+                    samples = time_call(lambda: fn(db, language_id, learned_only), args.repeat)
+                    row = {"deck_size": size, "learned_only": learned_only, "strategy": name, **summarize(samples)}
+                    results.append(row)
+                    print(
+                        f"size={size:>9} learned_only={learned_only!s:<5} {name:<16} "
+                        f"p50={row['p50_ms']:>9.3f}ms p99={row['p99_ms']:>9.3f}ms"
+                    )
+        finally:
+            db.close()
+
+    if args.json_path:
+        with open(args.json_path, "w") as fh:
+            json.dump(results, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+/terms/search latency on synthetic vocabularies.
+
+Terms are built from a pool of random English-like and Arabic-script words
+(1-3 words each, some Arabic words with the article), so a query word
+matches a realistic handful of terms rather than the whole deck. For each
+deck size the script times TermSearch.search for:
+
+- prefix:   the first 4 letters of a pool word (English or Arabic)
+- two_words: the first two words of a seeded English term
+- next_page: the first and second page of a common two-letter prefix
+- fuzzy:    a pool word with one letter dropped
+
+On Postgres words mode runs on the full-text GIN index; fuzzy mode uses
+pg_trgm when it is installed, otherwise the in-memory index, whose build
+time is reported separately ("index_build").
+
+``api_invalidated`` sends fuzzy prefix searches through ``GET /terms/search``
+and calls cache.invalidate_all() (as a sync does) before every 50th one, so
+its p99 shows whether index rebuilds land in requests. ``api_cold`` is the
+first search of a fresh app, which has to wait for the first build.
+
+Usage:
+    python benchmarks/bench_search.py --sizes 100000 1000000 --repeat 200
+"""
+
+import argparse
+import json
+import random
+import time
+
+from fastapi.testclient import TestClient
+from sqlalchemy import insert
+
+from common import make_sessionmaker, reset_schema, summarize, time_call
+from cache import invalidate_all
+from database import Language, Term
+from grading import answer_key, search_key
+from main import CARD_COLUMNS, create_app
+from migrations import analyze
+from search import TermSearch
+
+LATIN = "bcdfghklmnprstvwz"
+VOWELS = "aeiou"
+ARABIC = "بتثجحخدذرزسشصضطظعغفقكلمنهوي"
+SEED_BATCH_SIZE = 10_000
+INVALIDATE_EVERY = 50
+
+
+def pool(rng: random.Random, size: int, make) -> list:
+    words = set()
+    while len(words) < size:
+        words.add(make(rng))
+    return sorted(words)
+
+
+def latin_word(rng: random.Random) -> str:
+    return "".join(rng.choice(LATIN) + rng.choice(VOWELS) for _ in range(rng.randint(2, 4)))
+
+
+def arabic_word(rng: random.Random) -> str:
+    return "".join(rng.choice(ARABIC) for _ in range(rng.randint(3, 6)))
+
+
+def seed_vocabulary(session_maker, size: int, rng: random.Random, english: list, arabic: list):
+    """Insert `size` terms; return the language id and the seeded (english, arabic) pairs."""
+    db = session_maker()
+    try:
+        language = Language(code="ar", name="Arabic")
+        db.add(language)
+        db.commit()
+        language_id = language.id
+        batch = []
+        seen = set()
+        while len(seen) < size:
+            english_term = " ".join(rng.sample(english, rng.randint(1, 3)))
+            target = " ".join(("ال" if rng.random() < 0.3 else "") + word for word in rng.sample(arabic, rng.randint(1, 2)))
+            if (english_term, target) in seen:
+                continue
+            seen.add((english_term, target))
+            transliteration = " ".join(latin_word(rng) for _ in range(target.count(" ") + 1))
+            batch.append({
+                "language_id": language_id,
+                "english_term": english_term,
+                "target_language_term": target,
+                "transliteration": transliteration,
+                "english_key": answer_key(english_term),
+                "target_language_key": answer_key(target),
+                "search_key": search_key(english_term, target, transliteration),
+                "learned": False,
+                "correct_counter": 0,
+            })
+            if len(batch) >= SEED_BATCH_SIZE:
+                db.execute(insert(Term), batch)
+                batch = []
+        if batch:
+            db.execute(insert(Term), batch)
+        db.commit()
+        return language_id, seen
+    finally:
+        db.close()
+
+
+def api_cases(session_maker, queries: list, repeat: int, rng: random.Random) -> dict:
+    """Time the first search of a fresh app, then searches with periodic invalidations."""
+    with TestClient(create_app(session_maker, metrics=False)) as client:
+        def run():
+            client.get("/terms/search", params={"q": rng.choice(queries), "mode": "fuzzy"}).raise_for_status()
+
+        started = time.perf_counter()
+        run()
+        cold = time.perf_counter() - started
+        samples = []
+        for i in range(1, repeat + 1):
+            if i % INVALIDATE_EVERY == 0:
+                invalidate_all()
+            started = time.perf_counter()
+            run()
+            samples.append(time.perf_counter() - started)
+    return {"api_cold": summarize([cold]), "api_invalidated": summarize(samples)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000])
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--json", dest="json_path", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    session_maker = make_sessionmaker()
+    engine = session_maker.kw["bind"]
+    results = []
+    for size in args.sizes:
+        rng = random.Random(size)
+        # Each pool word ends up in roughly 40 terms
+        english = pool(rng, max(size // 20, 100), latin_word)
+        arabic = pool(rng, max(size // 25, 100), arabic_word)
+        reset_schema(session_maker)
+        started = time.perf_counter()
+        language_id, pairs = seed_vocabulary(session_maker, size, rng, english, arabic)
+        with engine.begin() as conn:
+            analyze(conn)
+        print(f"seeded {size} terms in {time.perf_counter() - started:.1f}s")
+
+        search = TermSearch()
+        db = session_maker()
+        try:
+            started = time.perf_counter()
+            for mode in ("words", "fuzzy"):
+                if search.backend(db, mode) == "memory":
+                    search.ngrams.index(db, language_id)
+                    results.append({"size": size, "case": "index_build", "seconds": round(time.perf_counter() - started, 3)})
+                    print(f"  in-memory index built in {results[-1]['seconds']}s")
+                    break
+
+            def case(words, mode="words", cursor_of=None):
+                def run():
+                    query = rng.choice(words)
+                    cursor = None
+                    if cursor_of is not None:
+                        cursor = search.search(db, language_id, query, mode, columns=CARD_COLUMNS).next_cursor
+                    return search.search(db, language_id, query, mode, cursor=cursor, columns=CARD_COLUMNS)
+                return run
+
+            common = [word[:2] for word in english[:50]]
+            cases = {
+                "prefix": case([word[:4] for word in english + arabic]),
+                "two_words": case([" ".join(term.split()[:2]) for term, _ in rng.sample(sorted(pairs), 500) if " " in term]),
+                "next_page": case(common, cursor_of=True),
+                "fuzzy": case([word[:2] + word[3:] for word in rng.sample(english, 500) if len(word) > 5], "fuzzy"),
+            }
+            for name, run in cases.items():
+                summary = summarize(time_call(run, args.repeat))
+                backend = search.backend(db, "fuzzy" if name == "fuzzy" else "words")
+                results.append({"size": size, "case": name, "backend": backend, **summary})
+                print(f"  {name:<10} {backend:<9} p50 {summary['p50_ms']:>8.2f} ms  p95 {summary['p95_ms']:>8.2f} ms  p99 {summary['p99_ms']:>8.2f} ms")
+        finally:
+            db.close()
+
+        fuzzy_queries = [word[:2] + word[3:] for word in rng.sample(english, 500) if len(word) > 5]
+        for name, summary in api_cases(session_maker, fuzzy_queries, args.repeat, rng).items():
+            results.append({"size": size, "case": name, **summary})
+            print(f"  {name:<16} p50 {summary['p50_ms']:>9.2f} ms  p99 {summary['p99_ms']:>9.2f} ms")
+
+    if args.json_path:
+        with open(args.json_path, "w") as fh:
+            json.dump({"dialect": engine.dialect.name, "results": results}, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Cost of turning card rows into a JSON response body, per card and per batch.
+
+legacy      ORM Term entities -> FlashcardResponse.model_validate -> what
+            FastAPI does with a response_model (dump, validate again,
+            serialize) -> JSONResponse (stdlib json)
+columns     CARD_COLUMNS rows -> card_payload dicts -> JSONResponse
+fast        CARD_COLUMNS rows -> card_payload dicts -> FastJSONResponse
+            (orjson when installed)
+
+Loading (the SELECT plus ORM hydration) and rendering are timed separately,
+each on a fresh session, for batches of 1 and --batch cards.
+
+Usage:
+    python benchmarks/bench_serialization.py --deck 10000 --repeat 500
+"""
+
+import argparse
+import json
+import random
+import time
+from typing import List
+
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+from common import make_sessionmaker, reset_schema, seed_deck
+from database import Term
+from main import CARD_COLUMNS
+from schemas import FlashcardResponse
+from serialization import JSON_BACKEND, FastJSONResponse, card_payload
+
+CARDS = TypeAdapter(List[FlashcardResponse])
+
+
+def load_entities(db, ids):
+    return db.query(Term).filter(Term.id_vocabulary.in_(ids)).all()
+
+
+def load_rows(db, ids):
+    return db.query(*CARD_COLUMNS).filter(Term.id_vocabulary.in_(ids)).all()
+
+
+def render_legacy(terms) -> bytes:
+    models = [FlashcardResponse.model_validate(term) for term in terms]
+    # FastAPI dumps returned models, validates the result against the response model and serializes it
+    content = CARDS.validate_python([model.model_dump() for model in models])
+    return JSONResponse(CARDS.dump_python(content, mode="json")).body
+
+
+def render_columns(rows) -> bytes:
+    return JSONResponse([card_payload(row) for row in rows]).body
+
+
+def render_fast(rows) -> bytes:
+    return FastJSONResponse([card_payload(row) for row in rows]).body
+
+
+MODES = {
+    "legacy": (load_entities, render_legacy),
+    "columns": (load_rows, render_columns),
+    "fast": (load_rows, render_fast),
+}
+
+
+def measure(session_maker, load, render, id_batches) -> dict:
+    load_seconds = render_seconds = 0.0
+    for ids in id_batches:
+        db = session_maker()
+        try:
+            started = time.perf_counter()
+            rows = load(db, ids)
+            loaded = time.perf_counter()
+            render(rows)
+            load_seconds += loaded - started
+            render_seconds += time.perf_counter() - loaded
+        finally:
+            db.close()
+    return {"load": load_seconds / len(id_batches), "render": render_seconds / len(id_batches)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--deck", type=int, default=10_000)
+    parser.add_argument("--batch", type=int, default=100, help="Cards per batch for the batch measurement")
+    parser.add_argument("--repeat", type=int, default=500)
+    parser.add_argument("--json", dest="json_path", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    session_maker = make_sessionmaker()
+    reset_schema(session_maker)
+    seed_deck(session_maker, args.deck)
+    db = session_maker()
+    try:
+        all_ids = [term_id for (term_id,) in db.query(Term.id_vocabulary)]
+    finally:
+        db.close()
+
+    rng = random.Random(0)
+    results = []
+    print(f"JSON backend: {JSON_BACKEND}")
+    for size in (1, args.batch):
+        id_batches = [rng.sample(all_ids, size) for _ in range(args.repeat)]
+        for mode, (load, render) in MODES.items():
+            timing = measure(session_maker, load, render, id_batches)
+            total = timing["load"] + timing["render"]
+            row = {
+                "mode": mode,
+                "batch": size,
+                "load_us": round(timing["load"] * 1e6, 1),
+                "render_us": round(timing["render"] * 1e6, 1),
+                "total_us": round(total * 1e6, 1),
+                "per_card_us": round(total * 1e6 / size, 2),
+            }
+            results.append(row)
+            print(
+                f"{mode:<8} batch={size:<4} load {row['load_us']:>9.1f}us  render {row['render_us']:>9.1f}us  "
+                f"total {row['total_us']:>9.1f}us  per card {row['per_card_us']:>8.2f}us"
+            )
+
+    if args.json_path:
+        with open(args.json_path, "w") as fh:
+            json.dump({"deck": args.deck, "backend": JSON_BACKEND, "results": results}, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
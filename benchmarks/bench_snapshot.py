@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Deck snapshot (snapshot.py) against the database path: memory and latency.
+
+Memory, measured with tracemalloc, to hold every card of the deck as:
+
+- snapshot:   DeckSnapshots, column-wise with one UTF-8 text buffer
+- slots:      one __slots__ record per card holding str fields
+- rows:       CARD_COLUMNS Row tuples, what the card endpoints select
+- entities:   ORM Term entities with their instance state
+
+Latency of /flashcards/random and /flashcards/queue?n=20 through the
+in-process app, with and without DECK_SNAPSHOT, requests sent one at a time.
+
+The synthetic deck gets example sentences on every card and notes on every
+tenth, so text size is closer to a real deck than seed_deck alone.
+
+Usage:
+    python benchmarks/bench_snapshot.py --sizes 10000 100000 --requests 2000
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import time
+import tracemalloc
+
+import httpx
+from sqlalchemy import String, case, update
+
+from common import make_sessionmaker, reset_schema, seed_deck, summarize
+from database import Term
+from main import CARD_COLUMNS, create_app
+from snapshot import TEXT_FIELDS, DeckSnapshots
+
+ENDPOINTS = {
+    "random": ("/flashcards/random", {"language_code": "ar"}),
+    "queue20": ("/flashcards/queue", {"language_code": "ar", "n": 20}),
+}
+
+
+class CardRecord:
+    __slots__ = ("id_vocabulary",) + TEXT_FIELDS
+
+    def __init__(self, id_vocabulary, *values):
+        self.id_vocabulary = id_vocabulary
+        for field, value in zip(TEXT_FIELDS, values):
+            setattr(self, field, value)
+
+
+def add_sentences(session_maker) -> None:
+    term_id = Term.id_vocabulary.cast(String)
+    db = session_maker()
+    try:
+        db.execute(update(Term).values(
+            example_sentence="هذا مثال على استخدام الكلمة رقم " + term_id,
+            example_sentence_explained="This is an example of how to use word number " + term_id,
+            notes=case((Term.id_vocabulary % 10 == 0, "irregular plural"), else_=None),
+        ))
+        db.commit()
+    finally:
+        db.close()
+
+
+def measure(build) -> float:
+    """MB still allocated by the object `build()` returns."""
+    gc.collect()
+    tracemalloc.start()
+    held = build()
+    gc.collect()
+    size, _peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del held
+    return round(size / 2**20, 2)
+
+
+def memory(session_maker) -> dict:
+    text_columns = [Term.id_vocabulary] + [getattr(Term, field) for field in TEXT_FIELDS]
+
+    def with_session(load):
+        def build():
+            db = session_maker()
+            try:
+                return load(db)
+            finally:
+                db.close()
+        return build
+
+    def snapshot(db):
+        snapshots = DeckSnapshots()
+        snapshots.warm(db)
+        return snapshots
+
+    def entities(db):
+        # Kept with their session, as the identity map holds them while a request runs
+        return db, db.query(Term).all()
+
+    return {
+        "snapshot": measure(with_session(snapshot)),
+        "slots": measure(with_session(lambda db: [CardRecord(*row) for row in db.query(*text_columns)])),
+        "rows": measure(with_session(lambda db: db.query(*CARD_COLUMNS).all())),
+        "entities": measure(lambda: entities(session_maker())),
+    }
+
+
+async def latency(session_maker, deck_snapshot: bool, requests: int) -> dict:
+    app = create_app(session_maker, deck_snapshot=deck_snapshot)
+    transport = httpx.ASGITransport(app=app)
+    results = {}
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for name, (path, params) in ENDPOINTS.items():
+            for _ in range(50):  # warm up, including the snapshot load
+                (await client.get(path, params=params)).raise_for_status()
+            samples = []
+            for _ in range(requests):
+                start = time.perf_counter()
+                r = await client.get(path, params=params)
+                samples.append(time.perf_counter() - start)
+                r.raise_for_status()
+            results[name] = summarize(samples)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--json", dest="json_path", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    session_maker = make_sessionmaker()
+    results = []
+    for size in args.sizes:
+        reset_schema(session_maker)
+        seed_deck(session_maker, size)
+        add_sentences(session_maker)
+
+        row = {"size": size, "memory_mb": memory(session_maker)}
+        print(f"size={size:<8} memory: " + " ".join(f"{name}={mb:.1f}MB" for name, mb in row["memory_mb"].items()))
+        for deck_snapshot in (False, True):
+            path = "snapshot" if deck_snapshot else "database"
+            row[path] = asyncio.run(latency(session_maker, deck_snapshot, args.requests))
+            for endpoint, stats in row[path].items():
+                print(
+                    f"size={size:<8} {path:<8} {endpoint:<8} p50={stats['p50_ms']:>7.3f}ms "
+                    f"p95={stats['p95_ms']:>7.3f}ms p99={stats['p99_ms']:>7.3f}ms"
+                )
+        results.append(row)
+
+    if args.json_path:
+        with open(args.json_path, "w") as fh:
+            json.dump(results, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+API cold start: how long a fresh worker takes before it can serve.
+
+Each run starts a fresh interpreter that imports main, builds the app with
+main.app_from_env() and runs its lifespan, timing the three phases:
+
+- import:   ``import main``
+- create:   app_from_env(): engine, caches, routes
+- lifespan: startup work against the database (preload, stats rebuild, ...)
+
+It runs once with MIGRATE_ON_STARTUP=0 (the default) and once with it set,
+which adds the schema_migrations check every worker used to make. The
+slowest imports come from ``python -X importtime``.
+
+Usage:
+    DATABASE_URL=postgresql+psycopg2://... python benchmarks/bench_startup.py --runs 10
+"""
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+
+from common import PROJECT_ROOT, make_sessionmaker, reset_schema, seed_deck, summarize
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+\d+ \|\s+(\d+) \| (\s*)(\S+)")
+
+# Runs in the child interpreter; prints the phase times in seconds as JSON
+PROBE = """
+import asyncio, json, time
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+app = main.app_from_env()
+created = time.perf_counter()
+
+async def lifespan():
+    async with app.router.lifespan_context(app):
+        return time.perf_counter()
+
+started = asyncio.run(lifespan())
+print(json.dumps({"import": imported - start, "create": created - imported, "lifespan": started - created}))
+"""
+
+
+def probe(env: dict) -> dict:
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE], cwd=PROJECT_ROOT, env=env, capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.splitlines()[-1])
+
+
+def slowest_imports(env: dict, top: int) -> list:
+    """Return the `top` top-level imports of main by cumulative time, as (module, ms)."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=PROJECT_ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        # Two spaces of indent: imported by main itself
+        if match and len(match.group(2)) == 2:
+            rows.append((match.group(3), round(int(match.group(1)) / 1000, 1)))
+    return sorted(rows, key=lambda row: -row[1])[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--deck-size", type=int, default=10_000)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--top", type=int, default=10, help="Slowest imports to list")
+    parser.add_argument("--json", dest="json_path", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    session_maker = make_sessionmaker()
+    reset_schema(session_maker)
+    seed_deck(session_maker, args.deck_size)
+    database_url = os.getenv("DATABASE_URL") or f"sqlite:///{os.path.abspath('bench_db.sqlite3')}"
+    base_env = {**os.environ, "DATABASE_URL": database_url}
+
+    results = []
+    for migrate in ("0", "1"):
+        env = {**base_env, "MIGRATE_ON_STARTUP": migrate}
+        probe(env)  # the first migrating run records every version; later runs find them applied
+        runs = [probe(env) for _ in range(args.runs)]
+        row = {"migrate_on_startup": migrate == "1"}
+        for phase in ("import", "create", "lifespan"):
+            stats = summarize(run[phase] for run in runs)
+            row[f"{phase}_p50_ms"] = stats["p50_ms"]
+        row["total_p50_ms"] = summarize(sum(run.values()) for run in runs)["p50_ms"]
+        results.append(row)
+        print(
+            f"migrate={migrate} import={row['import_p50_ms']:>7.1f}ms create={row['create_p50_ms']:>6.1f}ms "
+            f"lifespan={row['lifespan_p50_ms']:>6.1f}ms total={row['total_p50_ms']:>7.1f}ms"
+        )
+
+    imports = slowest_imports(base_env, args.top)
+    print("slowest imports:", ", ".join(f"{module} {ms}ms" for module, ms in imports))
+
+    if args.json_path:
+        with open(args.json_path, "w") as fh:
+            json.dump({"runs": results, "slowest_imports": imports}, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
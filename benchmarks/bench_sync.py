@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Incremental spreadsheet sync (sync.py) versus a full reload.
+
+A synthetic source of --rows rows is written as CSV (or .xlsx with
+--format xlsx) and loaded once. A handful of edits is then made: notes
+changed, one translation edited, rows added and removed. The edited source
+is applied twice: by sync_terms, and by a full reload that deletes the
+language's terms and re-imports every row with migrate_data.bulk_import.
+Each timing includes reading the source file.
+
+Usage:
+    python benchmarks/bench_sync.py --rows 100000 --edits 10
+"""
+
+import argparse
+import csv
+import json
+import os
+import tempfile
+import time
+
+from sqlalchemy import delete, func, select
+
+from common import make_sessionmaker, reset_schema
+from database import Language, Term
+from migrate_data import bulk_import
+from sync import iter_file_rows, sync_terms
+
+HEADER = [
+    "Words (English)", "Word (Arabic script)", "Word (Arabic with Roman characters)",
+    "Sample sentence (Arabic)", "Sample sentence explained", "Notes", "Learned", "Correct Counter",
+]
+
+
+def source_rows(count: int) -> list:
+    return [
+        [f"term {i}", f"كلمة {i}", f"kalima {i}", f"جملة {i}", f"sentence {i}", "", "0", str(i % 3)]
+        for i in range(count)
+    ]
+
+
+def edit(rows: list, edits: int) -> list:
+    """Change notes on `edits` rows, edit one translation, drop two rows and add two."""
+    rows = [list(row) for row in rows]
+    step = max(len(rows) // max(edits, 1), 1)
+    for i in range(0, min(edits * step, len(rows)), step):
+        rows[i][5] = "edited"
+    rows[1][1] += " (edited)"
+    del rows[-2:]
+    rows += [[f"new term {i}", f"جديد {i}", "", "", "", "", "0", "0"] for i in range(2)]
+    return rows
+
+
+def write_source(path: str, rows: list, fmt: str) -> None:
+    if fmt == "xlsx":
+        from openpyxl import Workbook
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet()
+        sheet.append(HEADER)
+        for row in rows:
+            sheet.append(row)
+        workbook.save(path)
+        return
+    with open(path, "w", newline="", encoding="utf-8") as fh:
+        writer = csv.writer(fh)
+        writer.writerow(HEADER)
+        writer.writerows(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--edits", type=int, default=10, help="Rows whose notes change between the two sources")
+    parser.add_argument("--format", choices=("csv", "xlsx"), default="csv")
+    parser.add_argument("--json", dest="json_path", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    session_maker = make_sessionmaker()
+    engine = session_maker.kw["bind"]
+    original = source_rows(args.rows)
+    edited = edit(original, args.edits)
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        original_path = os.path.join(tmp, f"original.{args.format}")
+        edited_path = os.path.join(tmp, f"edited.{args.format}")
+        write_source(original_path, original, args.format)
+        write_source(edited_path, edited, args.format)
+
+        reset_schema(session_maker)
+        with engine.begin() as conn:
+            conn.execute(Language.__table__.insert().values(code="ar", name="Arabic"))
+            language_id = conn.execute(select(Language.id)).scalar_one()
+
+        report = sync_terms(engine, iter_file_rows(original_path), language_id)
+        results.append({"mode": "initial_sync", "seconds": round(report.timings["total"], 3), "report": str(report)})
+
+        report = sync_terms(engine, iter_file_rows(edited_path), language_id)
+        results.append({"mode": "incremental_sync", "seconds": round(report.timings["total"], 3), "report": str(report)})
+
+        started = time.perf_counter()
+        with engine.begin() as conn:
+            conn.execute(delete(Term).where(Term.language_id == language_id))
+        if args.format == "xlsx":
+            # bulk_import reads CSV, so the reload pays for a conversion first
+            from spreadsheet import convert_to_csv
+            csv_path = os.path.join(tmp, "edited.csv")
+            convert_to_csv(edited_path, csv_path)
+        else:
+            csv_path = edited_path
+        report = bulk_import(engine, csv_path, language_id)
+        results.append({"mode": "full_reload", "seconds": round(time.perf_counter() - started, 3), "report": str(report)})
+
+        with engine.connect() as conn:
+            count = conn.execute(select(func.count()).select_from(Term)).scalar_one()
+
+    for row in results:
+        print(f"{row['mode']:<17} {row['seconds']:>8.3f}s  {row['report']}")
+    print(f"terms after reload: {count}")
+    if args.json_path:
+        with open(args.json_path, "w") as fh:
+            json.dump({"rows": args.rows, "edits": args.edits, "format": args.format, "results": results}, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Write contention on a popular term as the number of concurrent users grows.
+
+Every simulated user answers the same term correctly in a loop. In "shared"
+mode (no X-User-Id) every answer updates the one `terms` row, so answers
+queue on its row lock; in "per_user" mode each user writes their own
+`user_term_progress` row. Requests run in-process against the async app
+with one pooled connection per user, so pool waits do not mask lock waits.
+
+Meant for Postgres (set DATABASE_URL); SQLite serializes all writers on its
+database lock, so both modes contend there.
+
+Usage:
+    DATABASE_URL=postgresql+psycopg2://... python benchmarks/bench_user_contention.py --users 1 4 16 32
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from dataclasses import replace
+
+import httpx
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from common import make_sessionmaker, reset_schema, seed_deck, summarize
+from database import Term
+from db_engine import PoolSettings, create_db_engine
+from main import create_app
+
+
+async def drive(app, term_id: int, users: int, answers: int, per_user: bool):
+    """Run `users` concurrent answer loops; return (answers per second, latencies)."""
+    transport = httpx.ASGITransport(app=app)
+    latencies = []
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+
+        async def user(index):
+            headers = {"X-User-Id": f"user-{index}"} if per_user else {}
+            for _ in range(answers):
+                start = time.perf_counter()
+                r = await client.post(
+                    "/flashcards/answer",
+                    json={"term_id": term_id, "user_answer": "term 1", "answer_type": "english"},
+                    headers=headers,
+                )
+                r.raise_for_status()
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(user(index) for index in range(users)))
+        return users * answers / (time.perf_counter() - start), latencies
+
+
+async def run_level(sync_url: str, term_id: int, users: int, answers: int) -> list:
+    # One engine and event loop per level: asyncpg connections belong to the loop that opened them
+    settings = replace(PoolSettings.from_env(), pool_size=users, max_overflow=0)
+    engine = create_db_engine(sync_url, async_mode=True, settings=settings)
+    app = create_app(async_sessionmaker(engine, autoflush=False, expire_on_commit=False))
+    rows = []
+    try:
+        for mode in ("shared", "per_user"):
+            rate, latencies = await drive(app, term_id, users, answers, mode == "per_user")
+            row = {"mode": mode, "users": users, "answers_per_s": round(rate, 1), **summarize(latencies)}
+            rows.append(row)
+            print(
+                f"{mode:<9} users={users:<4} {rate:>9.1f} answers/s "
+                f"p50={row['p50_ms']:>8.3f}ms p99={row['p99_ms']:>8.3f}ms"
+            )
+    finally:
+        await engine.dispose()
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--deck-size", type=int, default=1_000)
+    parser.add_argument("--users", type=int, nargs="+", default=[1, 4, 16, 32])
+    parser.add_argument("--answers", type=int, default=100, help="Answers per user")
+    parser.add_argument("--json", dest="json_path", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    sync_maker = make_sessionmaker()
+    reset_schema(sync_maker)
+    seed_deck(sync_maker, args.deck_size)
+    db = sync_maker()
+    try:
+        term_id = db.query(Term.id_vocabulary).filter(Term.english_term == "term 1").scalar()
+    finally:
+        db.close()
+
+    sync_url = os.getenv("DATABASE_URL") or str(sync_maker.kw["bind"].url)
+    results = []
+    for users in args.users:
+        results += asyncio.run(run_level(sync_url, term_id, users, args.answers))
+
+    if args.json_path:
+        with open(args.json_path, "w") as fh:
+            json.dump(results, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Throughput against the number of uvicorn worker processes.
+
+Starts ``python main.py`` with WEB_CONCURRENCY set to each --workers value,
+then drives a mix of /flashcards/random, /flashcards/stats and
+/flashcards/answer from --clients load-generating processes for --duration
+seconds. Client processes keep the load generator from being the bottleneck.
+
+"efficiency" is throughput divided by (single-worker throughput x workers):
+1.0 is linear scaling. Workers cannot scale past the cores the machine has,
+and the load generator and database compete for the same cores, so run it
+where ``os.cpu_count()`` exceeds the largest worker count.
+
+--reload sends SIGHUP halfway through each multi-worker run; "errors" then
+counts requests that failed while the workers were being replaced.
+
+Meant for Postgres (set DATABASE_URL); SQLite serializes every writer.
+
+Usage:
+    DATABASE_URL=postgresql+psycopg2://... python benchmarks/bench_workers.py --workers 1 2 4 --clients 4
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import random
+import signal
+import subprocess
+import sys
+import time
+
+import httpx
+from sqlalchemy import func
+
+from common import PROJECT_ROOT, make_sessionmaker, reset_schema, seed_deck, summarize
+from bench_api import free_port, request_for, wait_until_up
+from database import Term
+
+# Share of each scenario in the request mix
+MIX = {"random": 0.6, "stats": 0.2, "answer": 0.2}
+
+
+async def load(base_url: str, duration: float, concurrency: int, id_range, seed: int):
+    """Send mixed requests for `duration` seconds; return (latencies, errors)."""
+    rng = random.Random(seed)
+    scenarios, weights = list(MIX), list(MIX.values())
+    latencies, errors = [], 0
+    deadline = time.monotonic() + duration
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+
+        async def worker():
+            nonlocal errors
+            while time.monotonic() < deadline:
+                method, path, kwargs = request_for(rng.choices(scenarios, weights)[0], rng, id_range)
+                start = time.perf_counter()
+                try:
+                    r = await client.request(method, path, **kwargs)
+                    failed = r.status_code >= 400
+                except httpx.TransportError:
+                    failed = True
+                latencies.append(time.perf_counter() - start)
+                errors += failed
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, errors
+
+
+def client_process(base_url, duration, concurrency, id_range, seed, results):
+    results.put(asyncio.run(load(base_url, duration, concurrency, id_range, seed)))
+
+
+def run_level(workers: int, args, database_url: str, id_range) -> dict:
+    port = free_port()
+    env = {**os.environ, "DATABASE_URL": database_url, "APP_PORT": str(port), "WEB_CONCURRENCY": str(workers)}
+    server = subprocess.Popen(
+        [sys.executable, "main.py"], cwd=PROJECT_ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        asyncio.run(wait_until_up(base_url, server))
+        # Let every worker finish its startup and warm up before measuring
+        asyncio.run(load(base_url, args.warmup, args.concurrency, id_range, args.seed))
+
+        results = multiprocessing.Queue()
+        clients = [
+            multiprocessing.Process(
+                target=client_process,
+                args=(base_url, args.duration, args.concurrency, id_range, args.seed + index, results),
+            )
+            for index in range(args.clients)
+        ]
+        start = time.perf_counter()
+        for client in clients:
+            client.start()
+        reloaded = args.reload and workers > 1
+        if reloaded:
+            time.sleep(args.duration / 2)
+            server.send_signal(signal.SIGHUP)
+        latencies, errors = [], 0
+        for _ in clients:
+            client_latencies, client_errors = results.get()
+            latencies += client_latencies
+            errors += client_errors
+        elapsed = time.perf_counter() - start
+        for client in clients:
+            client.join()
+    finally:
+        server.terminate()
+        server.wait(timeout=60)
+    return {
+        "workers": workers,
+        "reloaded": reloaded,
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "errors": errors,
+        **summarize(latencies),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--deck-size", type=int, default=10_000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--clients", type=int, default=4, help="Load-generating processes")
+    parser.add_argument("--concurrency", type=int, default=16, help="In-flight requests per client process")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds of load per worker count")
+    parser.add_argument("--warmup", type=float, default=2.0)
+    parser.add_argument("--reload", action="store_true", help="Send SIGHUP halfway through multi-worker runs")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", dest="json_path", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    session_maker = make_sessionmaker()
+    reset_schema(session_maker)
+    seed_deck(session_maker, args.deck_size)
+    db = session_maker()
+    try:
+        id_range = db.query(func.min(Term.id_vocabulary), func.max(Term.id_vocabulary)).one()
+    finally:
+        db.close()
+    database_url = os.getenv("DATABASE_URL") or f"sqlite:///{os.path.abspath('bench_db.sqlite3')}"
+
+    print(f"cpu_count={os.cpu_count()}")
+    results = []
+    for workers in args.workers:
+        row = run_level(workers, args, database_url, tuple(id_range))
+        single = results[0]["throughput_rps"] / results[0]["workers"] if results else row["throughput_rps"] / workers
+        row["efficiency"] = round(row["throughput_rps"] / (single * workers), 2)
+        results.append(row)
+        print(
+            f"workers={workers:<3} {row['throughput_rps']:>9.1f} req/s efficiency={row['efficiency']:.2f} "
+            f"p50={row['p50_ms']:>8.3f}ms p99={row['p99_ms']:>8.3f}ms errors={row['errors']}"
+            + (" (reloaded)" if row["reloaded"] else "")
+        )
+
+    if args.json_path:
+        with open(args.json_path, "w") as fh:
+            json.dump(results, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
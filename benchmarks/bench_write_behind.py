@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Answer throughput with and without write-behind.
+
+Concurrent simulated users answer correctly in a loop, spread over a few hot
+terms, through the in-process async app with its lifespan running, once per
+durability mode:
+
+- immediate: counter UPDATE (row lock on the term) and commit per answer
+- commit:    one INSERT into answer_events and commit per answer
+- enqueue:   no write on the request path
+
+The background writer folds the log every --flush-interval seconds. After
+each run the writer is stopped, which folds what is left; "drain_ms" is how
+long that took, and the run fails if any correct answer was not counted.
+
+Meant for Postgres (set DATABASE_URL); SQLite serializes every writer.
+
+Usage:
+    DATABASE_URL=postgresql+psycopg2://... python benchmarks/bench_write_behind.py --users 1 8 32
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from dataclasses import replace
+
+import httpx
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from common import make_sessionmaker, reset_schema, seed_deck, summarize
+from answer_log import DURABILITY_MODES
+from database import Term
+from db_engine import PoolSettings, create_db_engine
+from main import create_app
+
+
+async def drive(app, terms: list, users: int, answers: int, durability: str):
+    """Run `users` concurrent answer loops; return (answers per second, latencies)."""
+    transport = httpx.ASGITransport(app=app)
+    latencies = []
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+
+        async def user(index):
+            for i in range(answers):
+                term_id, english = terms[(index + i) % len(terms)]
+                start = time.perf_counter()
+                r = await client.post(
+                    "/flashcards/answer",
+                    params={"durability": durability},
+                    json={"term_id": term_id, "user_answer": english, "answer_type": "english"},
+                )
+                r.raise_for_status()
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(user(index) for index in range(users)))
+        return users * answers / (time.perf_counter() - start), latencies
+
+
+async def run_level(sync_url: str, terms: list, users: int, answers: int, flush_interval: float, total) -> list:
+    # One engine and event loop per level: asyncpg connections belong to the loop that opened them
+    settings = replace(PoolSettings.from_env(), pool_size=users + 1, max_overflow=0)
+    engine = create_db_engine(sync_url, async_mode=True, settings=settings)
+    app = create_app(async_sessionmaker(engine, autoflush=False, expire_on_commit=False), flush_interval=flush_interval)
+    rows = []
+    try:
+        for durability in DURABILITY_MODES:
+            before = total()
+            async with app.router.lifespan_context(app):
+                rate, latencies = await drive(app, terms, users, answers, durability)
+                drain_started = time.perf_counter()
+            drain_ms = (time.perf_counter() - drain_started) * 1000
+            counted = total() - before
+            if counted != users * answers:
+                raise SystemExit(f"{durability}: {counted} of {users * answers} answers counted")
+            row = {
+                "durability": durability,
+                "users": users,
+                "answers_per_s": round(rate, 1),
+                "drain_ms": round(drain_ms, 1),
+                **summarize(latencies),
+            }
+            rows.append(row)
+            print(
+                f"{durability:<9} users={users:<4} {rate:>9.1f} answers/s "
+                f"p50={row['p50_ms']:>8.3f}ms p99={row['p99_ms']:>8.3f}ms drain={row['drain_ms']:>7.1f}ms"
+            )
+    finally:
+        await engine.dispose()
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--deck-size", type=int, default=1_000)
+    parser.add_argument("--hot-terms", type=int, default=10, help="Answers are spread over this many terms")
+    parser.add_argument("--users", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--answers", type=int, default=200, help="Answers per user")
+    parser.add_argument("--flush-interval", type=float, default=0.5)
+    parser.add_argument("--json", dest="json_path", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    sync_maker = make_sessionmaker()
+    reset_schema(sync_maker)
+    seed_deck(sync_maker, args.deck_size)
+    db = sync_maker()
+    try:
+        terms = db.execute(
+            select(Term.id_vocabulary, Term.english_term).order_by(Term.id_vocabulary).limit(args.hot_terms)
+        ).all()
+    finally:
+        db.close()
+
+    def total():
+        db = sync_maker()
+        try:
+            return db.scalar(select(func.sum(Term.correct_counter)))
+        finally:
+            db.close()
+
+    sync_url = os.getenv("DATABASE_URL") or str(sync_maker.kw["bind"].url)
+    results = []
+    for users in args.users:
+        results += asyncio.run(run_level(sync_url, terms, users, args.answers, args.flush_interval, total))
+
+    if args.json_path:
+        with open(args.json_path, "w") as fh:
+            json.dump(results, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
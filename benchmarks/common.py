@@ -0,0 +1,103 @@
+"""
+Shared helpers for the benchmark scripts: synthetic deck seeding and
+latency summaries. Benchmarks run against SQLite by default, or against
+Postgres when DATABASE_URL is set.
+"""
+
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+from sqlalchemy import insert
+from sqlalchemy.orm import sessionmaker
+
+# Make the project modules importable when running `python benchmarks/<script>.py`
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from database import Base, Language, Term  # noqa: E402
+from db_engine import create_db_engine  # noqa: E402
+
+SEED_BATCH_SIZE = 10_000
+
+
+def make_sessionmaker(db_path: str = "bench_db.sqlite3") -> sessionmaker:
+    """Build a sessionmaker for DATABASE_URL, falling back to a local SQLite file."""
+    engine = create_db_engine(os.getenv("DATABASE_URL") or f"sqlite:///{db_path}")
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def reset_schema(session_maker: sessionmaker) -> None:
+    bind = session_maker.kw["bind"]
+    Base.metadata.drop_all(bind=bind)
+    Base.metadata.create_all(bind=bind)
+
+
+def seed_deck(session_maker: sessionmaker, size: int, language_code: str = "ar", learned_ratio: float = 0.3) -> int:
+    """Insert a synthetic deck of `size` terms and return its language id.
+
+    Every `1 / learned_ratio`-th term is marked learned so both the practice
+    and the learned pools are populated.
+    """
+    db = session_maker()
+    try:
+        language = Language(code=language_code, name=language_code.upper())
+        db.add(language)
+        db.commit()
+        language_id = language.id
+
+        step = max(int(round(1 / learned_ratio)), 1) if learned_ratio > 0 else 0
+        batch = []
+        for i in range(size):
+            learned = bool(step) and i % step == 0
+            batch.append({
+                "language_id": language_id,
+                "english_term": f"term {i}",
+                "target_language_term": f"كلمة {i}",
+                "transliteration": f"kalima {i}",
+                "learned": learned,
+                "correct_counter": 3 if learned else i % 3,
+            })
+            if len(batch) >= SEED_BATCH_SIZE:
+                db.execute(insert(Term), batch)
+                batch = []
+        if batch:
+            db.execute(insert(Term), batch)
+        db.commit()
+        return language_id
+    finally:
+        db.close()
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    index = min(int(round(pct / 100 * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+def summarize(samples: Iterable[float]) -> dict:
+    """Summarize latencies given in seconds as p50/p95/p99 in milliseconds."""
+    samples = list(samples)
+    return {
+        "count": len(samples),
+        "p50_ms": round(percentile(samples, 50) * 1000, 3),
+        "p95_ms": round(percentile(samples, 95) * 1000, 3),
+        "p99_ms": round(percentile(samples, 99) * 1000, 3),
+    }
+
+
+def time_call(fn, repeat: int, warmup: Optional[int] = None) -> List[float]:
+    """Call `fn` `repeat` times and return per-call wall times in seconds."""
+    for _ in range(warmup if warmup is not None else min(repeat, 10)):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
@@ -0,0 +1,184 @@
+"""
+In-process caches for small, rarely changing tables.
+
+The ``languages`` table is tiny and almost never changes, yet every request
+used to look a language up by code. MetadataCache keeps a snapshot of the
+whole table and serves both the code -> id lookups and the ``/languages``
+listing from it. VersionCache does the same for ``language_versions``, so
+the ETag of a read endpoint can be checked without a database round-trip.
+
+Snapshots expire after a TTL and can be dropped early through
+``invalidate()``; ``invalidate_all()`` drops every cache in the process and
+is what import scripts and admin writes should call. Writes committed by
+other processes are picked up when the TTL runs out, or as soon as they
+commit on Postgres: ``notify_invalidation()`` sends a NOTIFY with the
+writing transaction, and every API worker LISTENs for it
+(cache_listener.py) and drops the caches it names.
+"""
+
+import hashlib
+import threading
+import time
+import weakref
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from database import Language, LanguageVersion
+
+DEFAULT_TTL_SECONDS = 300.0
+# Versions change with answers, so they are re-read far more often than the language list
+DEFAULT_VERSION_TTL_SECONDS = 5.0
+# Postgres channel for cross-process invalidations; the payload is a scope below
+INVALIDATION_CHANNEL = "flashcards_cache"
+# Data versions only (answers that moved the stats)
+VERSIONS = "versions"
+# Every cache (imports, syncs, language edits)
+ALL = "all"
+
+_caches: "weakref.WeakSet[SnapshotCache]" = weakref.WeakSet()
+
+
+class SnapshotCache:
+    """A whole small table held in memory; subclasses implement ``_load`` and ``_store``."""
+
+    def __init__(self, ttl: float, clock: Callable[[], float] = time.monotonic):
+        self.ttl = ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._expires_at: Optional[float] = None
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._generation = 0
+        _caches.add(self)
+
+    def _load(self, db: Session):
+        raise NotImplementedError
+
+    def _store(self, snapshot) -> None:
+        """Install a loaded snapshot; called with the lock held."""
+        raise NotImplementedError
+
+    def _snapshot(self, db: Session) -> None:
+        """Reload the snapshot from `db` if it is missing or expired, counting a hit or miss."""
+        if self._expires_at is not None and self._clock() < self._expires_at:
+            with self._lock:
+                self.hits += 1
+            return
+        # The lock is never held across the query: in async mode this runs in a
+        # greenlet that can yield to other requests on the same thread mid-query.
+        generation = self._generation
+        self._install(generation, self._load(db))
+
+    def _install(self, generation: int, snapshot) -> None:
+        """Store a snapshot loaded while the cache was at `generation`, counting a miss."""
+        with self._lock:
+            self.misses += 1
+            self._store(snapshot)
+            # An invalidation that raced with this load leaves the snapshot expired
+            if generation == self._generation:
+                self._expires_at = self._clock() + self.ttl
+
+    def warm(self, db: Session) -> None:
+        """Load the snapshot now instead of on first use."""
+        self._snapshot(db)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._expires_at = None
+            self._generation += 1
+            self.invalidations += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "invalidations": self.invalidations,
+            "ttl_seconds": self.ttl,
+        }
+
+
+class MetadataCache(SnapshotCache):
+    def __init__(self, ttl: float = DEFAULT_TTL_SECONDS, clock: Callable[[], float] = time.monotonic):
+        super().__init__(ttl, clock)
+        self._ids: Dict[str, int] = {}
+        self._listing: List[dict] = []
+        self._listing_etag = ""
+
+    def _load(self, db: Session):
+        return db.query(Language).order_by(Language.id).all()
+
+    def _store(self, languages) -> None:
+        self._ids = {lang.code: lang.id for lang in languages}
+        self._listing = [{"id": lang.id, "code": lang.code, "name": lang.name} for lang in languages]
+        digest = hashlib.blake2b(repr(self._listing).encode("utf-8"), digest_size=8).hexdigest()
+        self._listing_etag = f'W/"languages-{digest}"'
+
+    def language_id(self, db: Session, code: str) -> Optional[int]:
+        """Return the id for language `code`, or None if it does not exist."""
+        self._snapshot(db)
+        return self._ids.get(code)
+
+    def languages(self, db: Session) -> List[dict]:
+        """Return the `/languages` listing."""
+        self._snapshot(db)
+        return list(self._listing)
+
+    def listing(self, db: Session) -> Tuple[List[dict], str]:
+        """Return the `/languages` listing and its ETag, which changes whenever the listing does."""
+        self._snapshot(db)
+        with self._lock:
+            return list(self._listing), self._listing_etag
+
+    def stats(self) -> dict:
+        return {**super().stats(), "languages": len(self._ids)}
+
+
+class VersionCache(SnapshotCache):
+    """Data versions from ``language_versions``, for ETag and Last-Modified headers."""
+
+    def __init__(self, ttl: float = DEFAULT_VERSION_TTL_SECONDS, clock: Callable[[], float] = time.monotonic):
+        super().__init__(ttl, clock)
+        self._versions: Dict[int, Tuple[int, datetime]] = {}
+
+    def _load(self, db: Session):
+        return db.query(LanguageVersion.language_id, LanguageVersion.version, LanguageVersion.updated_at).all()
+
+    def _store(self, rows) -> None:
+        self._versions = {language_id: (version, updated_at) for language_id, version, updated_at in rows}
+
+    def version(self, db: Session, language_id: int) -> Tuple[int, Optional[datetime]]:
+        """Return (version, updated_at) of a language; (0, None) if it was never bumped."""
+        self._snapshot(db)
+        return self._versions.get(language_id, (0, None))
+
+
+def invalidate_all() -> None:
+    """Invalidate every cache in this process."""
+    for cache in list(_caches):
+        cache.invalidate()
+
+
+def invalidate_scope(scope: str) -> None:
+    """Invalidate the caches in this process that a `scope` notification names."""
+    if scope == VERSIONS:
+        for cache in list(_caches):
+            if isinstance(cache, VersionCache):
+                cache.invalidate()
+    else:
+        invalidate_all()
+
+
+def notify_invalidation(db: Session, scope: str = ALL) -> None:
+    """Have every listening process drop its `scope` caches once the caller's transaction commits.
+
+    Postgres delivers the NOTIFY on commit and drops it on rollback; on other
+    databases this does nothing and other processes wait out their TTLs.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(text("SELECT pg_notify(:channel, :scope)"), {"channel": INVALIDATION_CHANNEL, "scope": scope})
@@ -0,0 +1,141 @@
+"""
+Cross-process cache invalidation over Postgres LISTEN/NOTIFY.
+
+Every API worker keeps its own caches (cache.py). Writers call
+``cache.notify_invalidation()`` inside their transaction, so Postgres
+delivers a notification on INVALIDATION_CHANNEL to every listening
+connection when, and only if, the write commits. InvalidationListener holds
+one such connection per worker, outside the pool, and applies each
+notification's scope to the worker's caches.
+
+A lost connection is re-opened after ``retry_seconds``. Notifications sent
+while it was down are gone, so every (re)connect drops all caches. TTLs stay
+the backstop for writes that send no notification (e.g. manual SQL), and
+the listener is not used on SQLite or behind a transaction-mode pooler,
+which cannot hold a LISTEN.
+"""
+
+import asyncio
+from typing import Optional
+
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from cache import INVALIDATION_CHANNEL, invalidate_all, invalidate_scope
+
+DEFAULT_RETRY_SECONDS = 5.0
+
+
+class InvalidationListener:
+    """LISTENs on INVALIDATION_CHANNEL and invalidates this process's caches."""
+
+    def __init__(self, bind, retry_seconds: float = DEFAULT_RETRY_SECONDS):
+        self.bind = bind
+        self.retry_seconds = retry_seconds
+        self._task: Optional[asyncio.Task] = None
+        self.connected = False
+        self.received = 0
+        self.connects = 0
+        self.last_error: Optional[str] = None
+
+    @property
+    def supported(self) -> bool:
+        return self.bind is not None and self.bind.dialect.driver in ("asyncpg", "psycopg2")
+
+    async def start(self) -> None:
+        if self.supported:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def _received(self, scope: str) -> None:
+        self.received += 1
+        invalidate_scope(scope)
+
+    def _connected(self) -> None:
+        self.connected = True
+        self.connects += 1
+        # Anything sent while no connection was listening is lost
+        invalidate_all()
+
+    async def _run(self) -> None:
+        # A connection of its own, so the listener never holds a pool slot
+        if isinstance(self.bind, AsyncEngine):
+            engine = create_async_engine(self.bind.url, poolclass=NullPool)
+            listen = self._listen_asyncpg
+        else:
+            engine = create_engine(self.bind.url, poolclass=NullPool)
+            listen = self._listen_psycopg2
+        try:
+            while True:
+                try:
+                    await listen(engine)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as exc:
+                    self.last_error = repr(exc)
+                self.connected = False
+                await asyncio.sleep(self.retry_seconds)
+        finally:
+            self.connected = False
+            if isinstance(engine, AsyncEngine):
+                await engine.dispose()
+            else:
+                engine.dispose()
+
+    async def _listen_asyncpg(self, engine: AsyncEngine) -> None:
+        """Listen until the connection is lost."""
+        lost = asyncio.Event()
+        async with engine.connect() as conn:
+            raw = (await conn.get_raw_connection()).driver_connection
+            raw.add_termination_listener(lambda _conn: lost.set())
+            await raw.add_listener(INVALIDATION_CHANNEL, lambda _conn, _pid, _channel, scope: self._received(scope))
+            self._connected()
+            await lost.wait()
+
+    async def _listen_psycopg2(self, engine) -> None:
+        """Listen until the connection is lost; notifications are read as the socket becomes readable."""
+        lost = asyncio.Event()
+        wrapper = engine.raw_connection()
+        try:
+            raw = wrapper.driver_connection
+            raw.autocommit = True
+            with raw.cursor() as cursor:
+                cursor.execute(f"LISTEN {INVALIDATION_CHANNEL}")
+
+            def readable():
+                try:
+                    raw.poll()
+                except Exception as exc:
+                    self.last_error = repr(exc)
+                    lost.set()
+                    return
+                while raw.notifies:
+                    self._received(raw.notifies.pop(0).payload)
+
+            loop = asyncio.get_running_loop()
+            loop.add_reader(raw.fileno(), readable)
+            try:
+                self._connected()
+                await lost.wait()
+            finally:
+                loop.remove_reader(raw.fileno())
+        finally:
+            wrapper.close()
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self._task is not None,
+            "connected": self.connected,
+            "received": self.received,
+            "connects": self.connects,
+            "last_error": self.last_error,
+        }
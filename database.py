@@ -1,14 +1,16 @@
-from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime, ForeignKey, Numeric
+from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime, Float, ForeignKey, Numeric, Index, func, text
+from sqlalchemy import event
 from sqlalchemy.orm import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime
+from grading import answer_key, search_key
 
 Base = declarative_base()
 
 class Language(Base):
     __tablename__ = "languages"
     
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     code = Column(String(10), unique=True, index=True, nullable=False)
     name = Column(String(100), nullable=False)
     
@@ -18,7 +20,7 @@ class Language(Base):
 class Term(Base):
     __tablename__ = "terms"
     
-    id_vocabulary = Column(Integer, primary_key=True, index=True)
+    id_vocabulary = Column(Integer, primary_key=True)
     language_id = Column(Integer, ForeignKey("languages.id"), nullable=False)
     english_term = Column(Text, nullable=False)
     target_language_term = Column(Text, nullable=False)
@@ -28,14 +30,177 @@ class Term(Base):
     notes = Column(Text)
     learned = Column(Boolean, default=False)
     correct_counter = Column(Integer, default=0)
+    # Grading keys (grading.answer_key) of english_term / target_language_term
+    english_key = Column(Text)
+    target_language_key = Column(Text)
+    # Words of english_term, target_language_term and transliteration as /terms/search matches them (grading.search_key)
+    search_key = Column(Text)
+    # Digest of the spreadsheet row the term was synced from (migrate_data.source_hash)
+    source_hash = Column(String(32))
+    # SM-2 schedule (scheduler.py); due_at is NULL until the term is first reviewed
+    due_at = Column(DateTime)
+    interval_days = Column(Integer, default=0)
+    ease = Column(Float, default=2.5)
+    repetitions = Column(Integer, default=0)
     
     # Relationship
     language = relationship("Language", back_populates="terms")
 
+    __table_args__ = (
+        # One card per translation pair; bulk imports rely on it for ON CONFLICT DO NOTHING
+        Index("uq_terms_language_pair", "language_id", "english_term", "target_language_term", unique=True),
+        # Serve the id-range lookups in sampler.py for the practice and learned pools
+        Index(
+            "ix_terms_practice_pool",
+            "language_id",
+            "id_vocabulary",
+            postgresql_where=text("correct_counter < 3"),
+            sqlite_where=text("correct_counter < 3"),
+        ),
+        Index(
+            "ix_terms_learned_pool",
+            "language_id",
+            "id_vocabulary",
+            postgresql_where=text("learned = true"),
+            sqlite_where=text("learned = 1"),
+        ),
+        # Per-user sampling seeks over the whole deck and filters on user_term_progress
+        Index("ix_terms_language_deck", "language_id", "id_vocabulary"),
+        # Due queue: the next due card of a language is the first entry at or below now
+        Index(
+            "ix_terms_due_queue",
+            "language_id",
+            "due_at",
+            "id_vocabulary",
+            postgresql_where=text("due_at IS NOT NULL"),
+            sqlite_where=text("due_at IS NOT NULL"),
+        ),
+    )
+
+@event.listens_for(Term, "before_insert")
+@event.listens_for(Term, "before_update")
+def _set_answer_keys(mapper, connection, term):
+    # Core bulk writes bypass this hook and fill the keys themselves
+    term.english_key = answer_key(term.english_term)
+    term.target_language_key = answer_key(term.target_language_term)
+    term.search_key = search_key(term.english_term, term.target_language_term, term.transliteration)
+
+# Full-text form of search_key; queries must use this exact expression to hit ix_terms_search_fts
+SEARCH_VECTOR = func.to_tsvector(text("'simple'::regconfig"), Term.__table__.c.search_key)
+Index("ix_terms_search_fts", SEARCH_VECTOR, postgresql_using="gin").ddl_if(dialect="postgresql")
+
+
+def _has_pg_trgm(ddl, target, bind, **kw) -> bool:
+    return bool(bind.execute(text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")).first())
+
+
+# Fuzzy search; only created where the pg_trgm extension is installed (see migrations.py)
+Index(
+    "ix_terms_search_trgm",
+    Term.search_key,
+    postgresql_using="gin",
+    postgresql_ops={"search_key": "gin_trgm_ops"},
+).ddl_if(dialect="postgresql", callable_=_has_pg_trgm)
+
+# Migration 13 copies the progress recorded on terms to this user, which the web UI sends by default
+DEFAULT_USER_ID = "default"
+
+
+class UserTermProgress(Base):
+    """One user's progress on one term; the row is created by the user's first review."""
+    __tablename__ = "user_term_progress"
+
+    user_id = Column(String(64), primary_key=True)
+    term_id = Column(Integer, ForeignKey("terms.id_vocabulary", ondelete="CASCADE"), primary_key=True)
+    language_id = Column(Integer, ForeignKey("languages.id"), nullable=False)
+    learned = Column(Boolean, nullable=False, default=False)
+    correct_counter = Column(Integer, nullable=False, default=0)
+    due_at = Column(DateTime)
+    interval_days = Column(Integer, default=0)
+    ease = Column(Float, default=2.5)
+    repetitions = Column(Integer, default=0)
+
+    __table_args__ = (
+        # Learned-term lookups for sampling and stats (index-only count per user and language)
+        Index(
+            "ix_user_progress_learned",
+            "user_id",
+            "language_id",
+            "term_id",
+            postgresql_where=text("learned = true"),
+            sqlite_where=text("learned = 1"),
+        ),
+        # Per-user due queue
+        Index(
+            "ix_user_progress_due",
+            "user_id",
+            "language_id",
+            "due_at",
+            "term_id",
+            postgresql_where=text("due_at IS NOT NULL"),
+            sqlite_where=text("due_at IS NOT NULL"),
+        ),
+    )
+
+class LanguageStats(Base):
+    """Per-language term counters, kept in step with `terms` when stats counters are enabled."""
+    __tablename__ = "language_stats"
+
+    language_id = Column(Integer, ForeignKey("languages.id"), primary_key=True)
+    total_terms = Column(Integer, nullable=False, default=0)
+    learned_terms = Column(Integer, nullable=False, default=0)
+    practice_terms = Column(Integer, nullable=False, default=0)
+
+class LanguageVersion(Base):
+    """Data version of a language, bumped whenever what its read endpoints serve changes.
+
+    ETag and Last-Modified of /flashcards/stats are derived from it.
+    """
+    __tablename__ = "language_versions"
+
+    language_id = Column(Integer, ForeignKey("languages.id"), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, nullable=False)
+
+class AnswerEvent(Base):
+    """One graded answer taken by the write-behind path (answer_log.py).
+
+    Rows are only ever appended; ``folded`` turns true in the transaction that
+    applies the answer to the counters and schedules.
+    """
+    __tablename__ = "answer_events"
+
+    id = Column(Integer, primary_key=True)
+    term_id = Column(Integer, ForeignKey("terms.id_vocabulary", ondelete="CASCADE"), nullable=False)
+    language_id = Column(Integer, ForeignKey("languages.id"), nullable=False)
+    # NULL for answers to the shared counters on terms
+    user_id = Column(String(64))
+    correct = Column(Boolean, nullable=False)
+    answered_at = Column(DateTime, nullable=False)
+    folded = Column(Boolean, nullable=False, default=False)
+
+    __table_args__ = (
+        # The flusher's queue of answers still to fold
+        Index(
+            "ix_answer_events_pending",
+            "id",
+            postgresql_where=text("folded = false"),
+            sqlite_where=text("folded = 0"),
+        ),
+    )
+
+class SchemaMigration(Base):
+    """Versions applied by migrations.py."""
+    __tablename__ = "schema_migrations"
+
+    version = Column(Integer, primary_key=True, autoincrement=False)
+    description = Column(Text, nullable=False)
+    applied_at = Column(DateTime, nullable=False)
+
 class VocabRaw(Base):
     __tablename__ = "vocab_raw"
     
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     english = Column(Text)
     target_script = Column(Text)
     transliteration = Column(Text)
@@ -1,8 +1,153 @@
 # db_engine.py
 import os
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, replace
+from typing import Optional
+from uuid import uuid4
+
 from sqlalchemy import create_engine
-from sqlalchemy.engine.url import URL
+from sqlalchemy.engine.url import URL, make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
+
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+# Recent checkout waits kept per pool for the percentiles in pool_stats
+WAIT_SAMPLES = 1024
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None or value == "":
+        return default
+    return value.lower() in ("1", "true", "yes")
+
+
+def _env_int(name: str, default: Optional[int]) -> Optional[int]:
+    value = os.getenv(name)
+    return int(value) if value not in (None, "") else default
+
+
+@dataclass
+class PoolSettings:
+    """
+    Connection pool settings shared by the sync and async engines.
+
+    from_env() reads DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT,
+    DB_POOL_RECYCLE, DB_POOL_PRE_PING, DB_STATEMENT_TIMEOUT_MS and
+    DB_EXTERNAL_POOLER. With an external pooler (pgbouncer, Neon's pooled
+    endpoint) the app keeps no pool of its own and disables server-side
+    prepared statements, which transaction pooling cannot route.
+    """
+    pool_size: int = 5
+    max_overflow: int = 10
+    pool_timeout: float = 30.0
+    pool_recycle: int = 1800
+    pool_pre_ping: bool = True
+    statement_timeout_ms: Optional[int] = None
+    external_pooler: bool = False
+
+    @classmethod
+    def from_env(cls) -> "PoolSettings":
+        defaults = cls()
+        return cls(
+            pool_size=_env_int("DB_POOL_SIZE", defaults.pool_size),
+            max_overflow=_env_int("DB_MAX_OVERFLOW", defaults.max_overflow),
+            pool_timeout=float(os.getenv("DB_POOL_TIMEOUT") or defaults.pool_timeout),
+            pool_recycle=_env_int("DB_POOL_RECYCLE", defaults.pool_recycle),
+            pool_pre_ping=_env_bool("DB_POOL_PRE_PING", defaults.pool_pre_ping),
+            statement_timeout_ms=_env_int("DB_STATEMENT_TIMEOUT_MS", defaults.statement_timeout_ms),
+            external_pooler=_env_bool("DB_EXTERNAL_POOLER", defaults.external_pooler),
+        )
+
+
+class PoolMetrics:
+    """
+    Checkout wait times and saturation for one pool.
+
+    A checkout is counted as saturated when every connection the pool may
+    open (pool_size + max_overflow) was already checked out, i.e. it had to
+    wait for another request to return one.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.saturated_checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self._recent = deque(maxlen=WAIT_SAMPLES)
+
+    def record(self, wait: float, saturated: bool, timed_out: bool = False) -> None:
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.saturated_checkouts += saturated
+            self.wait_seconds_total += wait
+            self.wait_seconds_max = max(self.wait_seconds_max, wait)
+            self._recent.append(wait)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            recent = sorted(self._recent)
+            checkouts = self.checkouts
+            return {
+                "checkouts": checkouts,
+                "saturated_checkouts": self.saturated_checkouts,
+                "timeouts": self.timeouts,
+                "wait_ms_total": round(self.wait_seconds_total * 1000, 3),
+                "wait_ms_max": round(self.wait_seconds_max * 1000, 3),
+                "wait_ms_p50": round(_percentile(recent, 50) * 1000, 3),
+                "wait_ms_p99": round(_percentile(recent, 99) * 1000, 3),
+            }
+
+
+def _percentile(ordered, pct: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(int(round(pct / 100 * (len(ordered) - 1))), len(ordered) - 1)]
+
+
+class _TimedPoolMixin:
+    """Time every checkout of a QueuePool; metrics survive pool.recreate()."""
+
+    def __init__(self, *args, metrics: Optional[PoolMetrics] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = metrics or PoolMetrics()
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+    def _do_get(self):
+        saturated = self._max_overflow > -1 and self.checkedout() >= self.size() + self._max_overflow
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            self.metrics.record(time.perf_counter() - start, saturated, timed_out=True)
+            raise
+        self.metrics.record(time.perf_counter() - start, saturated)
+        return connection
+
+
+class TimedQueuePool(_TimedPoolMixin, QueuePool):
+    pass
+
+
+class TimedAsyncAdaptedQueuePool(_TimedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
 
 def get_database_url():
     """
@@ -15,23 +160,135 @@ def get_database_url():
         host=os.getenv("DB_HOST", "your‑neon‑host.neon.tech"),
         port=os.getenv("DB_PORT", "5432"),
         database=os.getenv("DB_NAME", "yourdatabase"),
+        query={"sslmode": os.getenv("DB_SSLMODE", "require")},
     )
 
+
+def resolve_database_url(db_url=None):
+    """
+    Return `db_url`, else DATABASE_URL, else the URL built from the Neon DB_* settings.
+    """
+    return make_url(db_url or os.getenv("DATABASE_URL") or get_database_url())
+
+
+def to_async_url(db_url):
+    """
+    Rewrite a sync database URL to its asyncio driver (asyncpg / aiosqlite).
+    """
+    url = make_url(db_url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for '{backend}' URLs")
+    url = url.set(drivername=ASYNC_DRIVERS[backend])
+    if backend == "postgresql" and "sslmode" in url.query:
+        # asyncpg spells libpq's sslmode as ssl
+        query = dict(url.query)
+        query["ssl"] = query.pop("sslmode")
+        url = url.set(query=query)
+    return url
+
+
+def _connect_args(url: URL, settings: PoolSettings) -> dict:
+    driver = url.get_driver_name()
+    args = {}
+    if url.get_backend_name() == "sqlite":
+        if driver != "aiosqlite":
+            # Sessions are used from FastAPI's threadpool
+            args["check_same_thread"] = False
+        return args
+
+    if settings.statement_timeout_ms is not None:
+        if settings.external_pooler:
+            # Poolers in transaction mode reject or drop per-connection startup options
+            raise ValueError("Set statement_timeout on the database role when using an external pooler")
+        if driver == "asyncpg":
+            args["server_settings"] = {"statement_timeout": str(settings.statement_timeout_ms)}
+        else:
+            args["options"] = f"-c statement_timeout={settings.statement_timeout_ms}"
+
+    if settings.external_pooler:
+        if driver == "asyncpg":
+            # No statement cache, and unique names for the unnamed statements asyncpg still prepares
+            args["statement_cache_size"] = 0
+            args["prepared_statement_name_func"] = lambda: f"__asyncpg_{uuid4()}__"
+        elif driver == "psycopg":
+            args["prepare_threshold"] = None
+    return args
+
+
+def create_db_engine(db_url=None, async_mode: bool = False, settings: Optional[PoolSettings] = None, echo: bool = False, **kwargs):
+    """
+    Create the Engine (or AsyncEngine when `async_mode`) every entry point uses.
+
+    `db_url` defaults to resolve_database_url() and `settings` to
+    PoolSettings.from_env(). Extra keyword arguments go to create_engine and
+    win over the computed ones (e.g. poolclass=NullPool in tests).
+    """
+    settings = settings or PoolSettings.from_env()
+    url = resolve_database_url(db_url)
+    if async_mode:
+        url = to_async_url(url)
+
+    if settings.external_pooler and url.get_driver_name() == "asyncpg":
+        # SQLAlchemy's own prepared statement cache for asyncpg is configured on the URL
+        url = url.update_query_dict({"prepared_statement_cache_size": "0"})
+
+    options = {"echo": echo, "connect_args": _connect_args(url, settings)}
+    if settings.external_pooler:
+        options["poolclass"] = NullPool
+    elif not (url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")):
+        options.update(
+            poolclass=TimedAsyncAdaptedQueuePool if async_mode else TimedQueuePool,
+            pool_size=settings.pool_size,
+            max_overflow=settings.max_overflow,
+            pool_timeout=settings.pool_timeout,
+            pool_recycle=settings.pool_recycle,
+            pool_pre_ping=settings.pool_pre_ping,
+        )
+    options.update(kwargs)
+    if "poolclass" in kwargs and not issubclass(kwargs["poolclass"], QueuePool):
+        for name in ("pool_size", "max_overflow", "pool_timeout"):
+            options.pop(name, None)
+    return (create_async_engine if async_mode else create_engine)(url, **options)
+
+
+def pool_stats(engine) -> dict:
+    """
+    Return the pool's current occupancy plus its checkout metrics, if it records them.
+    """
+    pool = engine.pool
+    stats = {"pool_class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        capacity = pool.size() + max(pool._max_overflow, 0)
+        checked_out = pool.checkedout()
+        stats.update(
+            size=pool.size(),
+            max_overflow=pool._max_overflow,
+            checked_out=checked_out,
+            idle=pool.checkedin(),
+            overflow=pool.overflow(),
+            saturation=round(checked_out / capacity, 3) if capacity else 0.0,
+        )
+    metrics = getattr(pool, "metrics", None)
+    if metrics is not None:
+        stats.update(metrics.snapshot())
+    return stats
+
+
 def get_engine(echo: bool = False, pool_size: int = 5, max_overflow: int = 10):
     """
     Create and return a SQLAlchemy Engine for Neon.
     """
-    db_url = get_database_url()
-    engine = create_engine(
-        db_url,
-        echo=echo,
-        pool_size=pool_size,
-        max_overflow=max_overflow,
-        connect_args = {
-            "sslmode": os.getenv("DB_SSLMODE", "require")
-        }
-    )
-    return engine
+    settings = replace(PoolSettings.from_env(), pool_size=pool_size, max_overflow=max_overflow)
+    return create_db_engine(get_database_url(), settings=settings, echo=echo)
+
+
+def get_async_engine(db_url=None, echo: bool = False):
+    """
+    Create and return an AsyncEngine for DATABASE_URL (or the Neon env settings).
+    """
+    return create_db_engine(db_url, async_mode=True, echo=echo)
+
 
 def get_session(engine=None):
     """
@@ -47,4 +304,4 @@ if __name__ == "__main__":
     eng = get_engine(echo=True)
     print("Engine created:", eng)
     sess = get_session(engine=eng)
-    print("Session created:", sess)
\ No newline at end of file
+    print("Session created:", sess)
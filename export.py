@@ -0,0 +1,421 @@
+"""
+Streaming deck exports for ``GET /export``.
+
+A language's terms are read in id order with a server-side cursor
+(``yield_per``) and encoded one batch at a time, so memory stays flat
+however large the deck is:
+
+- csv:   the spreadsheet's columns plus an ``Id`` column, so ``sync.py`` and
+         ``migrate_data.py`` read an export back
+- jsonl: one JSON object per term, with its full progress and schedule
+- apkg:  an Anki package with one note per term and a card per direction.
+         The collection is written to a temporary SQLite file and zipped
+         into the response as it is read back.
+
+Exports are keyset ranges over ``id_vocabulary``: ``after_id`` (exclusive)
+and ``max_id`` (inclusive). An interrupted csv or jsonl download resumes
+from the last id received, with the ``max_id`` of the first response, and
+the two parts add up to exactly the original export: a resumed csv part
+has no header row.
+"""
+
+import csv
+import hashlib
+import html
+import io
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+import zipfile
+import zlib
+from datetime import datetime
+from typing import AsyncIterator, Iterator, List, Optional, Union
+
+from fastapi.concurrency import iterate_in_threadpool, run_in_threadpool
+from sqlalchemy import and_, func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+
+from database import Term, UserTermProgress
+from serialization import dumps
+
+EXPORT_BATCH_SIZE = 1_000
+# CSV header -> export column; migrate_data.CSV_COLUMNS reads the same names
+CSV_HEADER = {
+    "Id": "id_vocabulary",
+    "Words (English)": "english_term",
+    "Word (Arabic script)": "target_language_term",
+    "Word (Arabic with Roman characters)": "transliteration",
+    "Sample sentence (Arabic)": "example_sentence",
+    "Sample sentence explained": "example_sentence_explained",
+    "Notes": "notes",
+    "Learned": "learned",
+    "Correct Counter": "correct_counter",
+}
+TEXT_COLUMNS = (
+    "english_term",
+    "target_language_term",
+    "transliteration",
+    "example_sentence",
+    "example_sentence_explained",
+    "notes",
+)
+PROGRESS_COLUMNS = ("learned", "correct_counter", "due_at", "interval_days", "ease", "repetitions")
+
+
+def export_query(language_id: int, after_id: Optional[int], max_id: Optional[int], user_id: Optional[str] = None):
+    """Select the exported columns of a language's terms in id order, within the keyset range.
+
+    With a user id, progress comes from that user's ``user_term_progress``
+    rows; terms the user never answered export as new.
+    """
+    text = [Term.id_vocabulary] + [getattr(Term, name) for name in TEXT_COLUMNS]
+    if user_id is None:
+        query = select(*text, *(getattr(Term, name) for name in PROGRESS_COLUMNS))
+    else:
+        query = select(
+            *text,
+            func.coalesce(UserTermProgress.learned, False).label("learned"),
+            func.coalesce(UserTermProgress.correct_counter, 0).label("correct_counter"),
+            *(getattr(UserTermProgress, name).label(name) for name in PROGRESS_COLUMNS[2:]),
+        ).outerjoin(
+            UserTermProgress,
+            and_(UserTermProgress.user_id == user_id, UserTermProgress.term_id == Term.id_vocabulary),
+        )
+    query = query.where(Term.language_id == language_id)
+    if after_id is not None:
+        query = query.where(Term.id_vocabulary > after_id)
+    if max_id is not None:
+        query = query.where(Term.id_vocabulary <= max_id)
+    return query.order_by(Term.id_vocabulary).execution_options(yield_per=EXPORT_BATCH_SIZE)
+
+
+class ExportWriter:
+    """Encodes batches of export rows; the bytes returned are sent in order."""
+
+    media_type = "application/octet-stream"
+    extension = ""
+    # Whether gzip on the wire helps; packages are zipped already
+    compressible = True
+
+    def start(self) -> bytes:
+        return b""
+
+    def write(self, rows: List) -> bytes:
+        raise NotImplementedError
+
+    def finish(self) -> Iterator[bytes]:
+        return iter(())
+
+    def close(self) -> None:
+        """Release what the writer holds; called whether or not the export completed."""
+
+
+class CsvWriter(ExportWriter):
+    media_type = "text/csv; charset=utf-8"
+    extension = "csv"
+
+    def __init__(self, header: bool = True):
+        self._header = header
+        self._buffer = io.StringIO()
+        self._csv = csv.writer(self._buffer)
+
+    def _drain(self) -> bytes:
+        chunk = self._buffer.getvalue().encode("utf-8")
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        return chunk
+
+    def start(self) -> bytes:
+        if self._header:
+            self._csv.writerow(list(CSV_HEADER))
+        return self._drain()
+
+    def write(self, rows: List) -> bytes:
+        columns = list(CSV_HEADER.values())
+        for row in rows:
+            values = [getattr(row, name) for name in columns]
+            # Learned as 1/0, as in the spreadsheet
+            values[-2] = int(bool(values[-2]))
+            self._csv.writerow(values)
+        return self._drain()
+
+
+class JsonlWriter(ExportWriter):
+    media_type = "application/x-ndjson"
+    extension = "jsonl"
+
+    def write(self, rows: List) -> bytes:
+        lines = []
+        for row in rows:
+            record = dict(zip(row._fields, row))
+            record["learned"] = bool(record["learned"])
+            if record["due_at"] is not None:
+                record["due_at"] = record["due_at"].isoformat()
+            lines.append(dumps(record))
+            lines.append(b"\n")
+        return b"".join(lines)
+
+
+# The collection schema Anki reads from a package (schema version 11)
+ANKI_SCHEMA = """
+CREATE TABLE col (
+    id integer primary key, crt integer not null, mod integer not null, scm integer not null,
+    ver integer not null, dty integer not null, usn integer not null, ls integer not null,
+    conf text not null, models text not null, decks text not null, dconf text not null, tags text not null
+);
+CREATE TABLE notes (
+    id integer primary key, guid text not null, mid integer not null, mod integer not null,
+    usn integer not null, tags text not null, flds text not null, sfld integer not null,
+    csum integer not null, flags integer not null, data text not null
+);
+CREATE TABLE cards (
+    id integer primary key, nid integer not null, did integer not null, ord integer not null,
+    mod integer not null, usn integer not null, type integer not null, queue integer not null,
+    due integer not null, ivl integer not null, factor integer not null, reps integer not null,
+    lapses integer not null, left integer not null, odue integer not null, odid integer not null,
+    flags integer not null, data text not null
+);
+CREATE TABLE revlog (
+    id integer primary key, cid integer not null, usn integer not null, ease integer not null,
+    ivl integer not null, lastIvl integer not null, factor integer not null, time integer not null,
+    type integer not null
+);
+CREATE TABLE graves (usn integer not null, oid integer not null, type integer not null);
+CREATE INDEX ix_notes_usn ON notes (usn);
+CREATE INDEX ix_cards_usn ON cards (usn);
+CREATE INDEX ix_revlog_usn ON revlog (usn);
+CREATE INDEX ix_cards_nid ON cards (nid);
+CREATE INDEX ix_cards_sched ON cards (did, queue, due);
+CREATE INDEX ix_revlog_cid ON revlog (cid);
+CREATE INDEX ix_notes_csum ON notes (csum);
+"""
+# Fixed ids, so re-importing a later export updates the same notes, model and deck
+ANKI_MODEL_ID = 1_600_000_000_000
+ANKI_DECK_ID_BASE = 1_600_000_000_000
+ANKI_NOTE_ID_BASE = 1_500_000_000_000
+ANKI_FIELDS = ("English", "Term", "Transliteration", "Example", "Example explained", "Notes")
+ANKI_TEMPLATES = (
+    ("English → Term", "{{English}}", "{{Term}}<br>{{Transliteration}}"),
+    ("Term → English", "{{Term}}", "{{English}}"),
+)
+ANKI_BACK_EXTRAS = "<hr>{{Example}}<br><i>{{Example explained}}</i><br>{{Notes}}"
+ANKI_CSS = ".card { font-family: arial; font-size: 24px; text-align: center; }"
+# Card type / queue values
+ANKI_NEW, ANKI_REVIEW = 0, 2
+COPY_CHUNK_SIZE = 1 << 20
+EPOCH = datetime(1970, 1, 1)
+
+
+def _anki_collection_row(deck_id: int, deck_name: str, crt: int, now: int) -> tuple:
+    deck = {
+        "id": deck_id, "name": deck_name, "desc": "", "mod": now, "usn": -1, "collapsed": False,
+        "browserCollapsed": False, "dyn": 0, "conf": 1, "extendNew": 0, "extendRev": 0,
+        "newToday": [0, 0], "revToday": [0, 0], "lrnToday": [0, 0], "timeToday": [0, 0],
+    }
+    default_deck = {**deck, "id": 1, "name": "Default"}
+    model = {
+        "id": ANKI_MODEL_ID, "name": "Flashcards", "type": 0, "mod": now, "usn": -1, "sortf": 0,
+        "did": deck_id, "css": ANKI_CSS, "latexPre": "", "latexPost": "", "tags": [], "vers": [],
+        "flds": [
+            {"name": name, "ord": ord_, "sticky": False, "rtl": False, "font": "Arial", "size": 20, "media": []}
+            for ord_, name in enumerate(ANKI_FIELDS)
+        ],
+        "tmpls": [
+            {
+                "name": name, "ord": ord_, "qfmt": front, "afmt": "{{FrontSide}}<hr id=answer>" + back + ANKI_BACK_EXTRAS,
+                "did": None, "bqfmt": "", "bafmt": "",
+            }
+            for ord_, (name, front, back) in enumerate(ANKI_TEMPLATES)
+        ],
+        # Each card needs its front field
+        "req": [[0, "any", [0]], [1, "any", [1]]],
+    }
+    deck_options = {
+        "id": 1, "name": "Default", "mod": 0, "usn": 0, "maxTaken": 60, "autoplay": True, "timer": 0,
+        "replayq": True, "dyn": False,
+        "new": {"delays": [1, 10], "ints": [1, 4, 7], "initialFactor": 2500, "order": 1, "perDay": 20, "bury": True},
+        "lapse": {"delays": [10], "mult": 0, "minInt": 1, "leechFails": 8, "leechAction": 0},
+        "rev": {"perDay": 200, "ease4": 1.3, "fuzz": 0.05, "minSpace": 1, "ivlFct": 1, "maxIvl": 36500, "bury": True},
+    }
+    conf = {"activeDecks": [deck_id], "curDeck": deck_id, "curModel": ANKI_MODEL_ID, "nextPos": 1, "sortType": "noteFld"}
+    return (
+        1, crt, now * 1000, now * 1000, 11, 0, 0, 0, json.dumps(conf),
+        json.dumps({str(ANKI_MODEL_ID): model}), json.dumps({"1": default_deck, str(deck_id): deck}),
+        json.dumps({"1": deck_options}), "{}",
+    )
+
+
+class ApkgWriter(ExportWriter):
+    """Anki package of one deck, with the exported progress as the cards' schedule.
+
+    Learned or scheduled terms become review cards due on their ``due_at``
+    (today when unscheduled); the rest are new cards in id order.
+    """
+
+    media_type = "application/zip"
+    extension = "apkg"
+    compressible = False
+
+    def __init__(self, language_id: int, deck_name: str, clock=time.time):
+        self._deck_id = ANKI_DECK_ID_BASE + language_id
+        self._deck_name = deck_name
+        self._now = int(clock())
+        # Anki counts review days from the collection's creation, taken as today 00:00 UTC
+        self._crt = self._now - self._now % 86400
+        self._dir = None
+        self._db = None
+
+    def start(self) -> bytes:
+        # Created once the body is being sent, so close() always follows
+        self._dir = tempfile.mkdtemp(prefix="export-")
+        self._path = os.path.join(self._dir, "collection.anki2")
+        # Written batch by batch from the threadpool, never concurrently
+        self._db = sqlite3.connect(self._path, check_same_thread=False)
+        self._db.executescript(ANKI_SCHEMA)
+        self._db.execute(
+            "INSERT INTO col VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            _anki_collection_row(self._deck_id, self._deck_name, self._crt, self._now),
+        )
+        return b""
+
+    def _card_schedule(self, row) -> tuple:
+        """(type, queue, due, ivl, factor, reps) of the row's cards."""
+        if not row.learned and row.due_at is None:
+            return ANKI_NEW, ANKI_NEW, row.id_vocabulary, 0, 0, 0
+        due = (row.due_at - EPOCH).days - self._crt // 86400 if row.due_at is not None else 0
+        factor = int((row.ease or 2.5) * 1000)
+        return ANKI_REVIEW, ANKI_REVIEW, due, max(row.interval_days or 0, 1), factor, row.repetitions or row.correct_counter
+
+    def write(self, rows: List) -> bytes:
+        notes, cards = [], []
+        for row in rows:
+            note_id = ANKI_NOTE_ID_BASE + row.id_vocabulary
+            fields = [html.escape(getattr(row, name) or "") for name in TEXT_COLUMNS]
+            # Sort field and checksum are taken from the first field's plain text
+            sort_field = row.english_term
+            checksum = int(hashlib.sha1(sort_field.encode("utf-8")).hexdigest()[:8], 16)
+            notes.append((
+                note_id, f"flashcards-{row.id_vocabulary}", ANKI_MODEL_ID, self._now, -1, "",
+                "\x1f".join(fields), sort_field, checksum, 0, "",
+            ))
+            schedule = self._card_schedule(row)
+            for ord_ in range(len(ANKI_TEMPLATES)):
+                cards.append((note_id * 2 + ord_, note_id, self._deck_id, ord_, self._now, -1, *schedule, 0, 0, 0, 0, 0, ""))
+        self._db.executemany("INSERT INTO notes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", notes)
+        self._db.executemany(
+            "INSERT INTO cards VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", cards
+        )
+        return b""
+
+    def finish(self) -> Iterator[bytes]:
+        self._db.commit()
+        self._db.close()
+        sink = _ChunkSink()
+        # Streamed to a non-seekable sink, so nothing but one copy chunk is held
+        with zipfile.ZipFile(sink, "w", zipfile.ZIP_DEFLATED) as package:
+            info = zipfile.ZipInfo.from_file(self._path, "collection.anki2")
+            info.compress_type = zipfile.ZIP_DEFLATED
+            with open(self._path, "rb") as source, package.open(info, "w") as target:
+                while True:
+                    data = source.read(COPY_CHUNK_SIZE)
+                    if not data:
+                        break
+                    target.write(data)
+                    yield sink.drain()
+            package.writestr("media", "{}")
+        yield sink.drain()
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+        if self._dir is not None:
+            shutil.rmtree(self._dir, ignore_errors=True)
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file object collecting zipfile's output until it is drained."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        chunk = b"".join(self._chunks)
+        self._chunks.clear()
+        return chunk
+
+
+class _Encoder:
+    """Passes chunks through, gzip-compressing them when asked."""
+
+    def __init__(self, gzip: bool):
+        # wbits 31: a gzip header and trailer around the deflate stream
+        self._compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if gzip else None
+
+    def __call__(self, chunk: bytes) -> bytes:
+        return self._compressor.compress(chunk) if self._compressor is not None else chunk
+
+    def end(self) -> bytes:
+        return self._compressor.flush() if self._compressor is not None else b""
+
+
+def stream_export(
+    session_maker: Union[sessionmaker, async_sessionmaker],
+    query,
+    writer: ExportWriter,
+    gzip: bool = False,
+) -> Union[Iterator[bytes], AsyncIterator[bytes]]:
+    """The response body of an export, for a StreamingResponse.
+
+    Opens its own session: the request's session is closed before the body
+    is sent. With an async session maker the body is an async iterator and
+    the rows are encoded in the threadpool; otherwise it is a plain iterator,
+    which the StreamingResponse runs in the threadpool.
+    """
+    encode = _Encoder(gzip)
+    if isinstance(session_maker, async_sessionmaker):
+        async def async_chunks():
+            try:
+                async with session_maker() as db:
+                    yield encode(writer.start())
+                    result = await db.stream(query)
+                    async for rows in result.partitions():
+                        yield await run_in_threadpool(lambda: encode(writer.write(rows)))
+                async for chunk in iterate_in_threadpool(writer.finish()):
+                    yield encode(chunk)
+                yield encode.end()
+            finally:
+                writer.close()
+
+        async def non_empty():
+            async for chunk in async_chunks():
+                if chunk:
+                    yield chunk
+        return non_empty()
+
+    def sync_chunks():
+        try:
+            db = session_maker()
+            try:
+                yield encode(writer.start())
+                for rows in db.execute(query).partitions():
+                    yield encode(writer.write(rows))
+            finally:
+                db.close()
+            for chunk in writer.finish():
+                yield encode(chunk)
+            yield encode.end()
+        finally:
+            writer.close()
+    # Gzip and the package's database buffer their output, so many chunks come back empty
+    return (chunk for chunk in sync_chunks() if chunk)
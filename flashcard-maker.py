@@ -1,11 +1,17 @@
-import pandas as pd
+import argparse
+from itertools import islice
 
-excel_file = "arabic-vocabulary-master-list.xlsx"
+from spreadsheet import DEFAULT_CHUNK_SIZE, convert_to_csv, iter_sheet_rows
 
-df = pd.read_excel(excel_file)
+parser = argparse.ArgumentParser(description="Convert the vocabulary spreadsheet to CSV without loading it into memory")
+parser.add_argument("--input", default="arabic-vocabulary-master-list.xlsx", help="Source .xlsx workbook")
+parser.add_argument("--output", default="output.csv", help="CSV file to write")
+parser.add_argument("--sheet", default=None, help="Worksheet name (default: the active sheet)")
+parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Rows buffered per CSV write")
+args = parser.parse_args()
 
-df.to_csv("output.csv", index=False)
+rows = convert_to_csv(args.input, args.output, sheet=args.sheet, chunk_size=args.chunk_size)
 
-print(df.head())
-
-# df.tosql
\ No newline at end of file
+print(f"Wrote {rows} rows to {args.output}")
+for row in islice(iter_sheet_rows(args.input, args.sheet), 6):
+    print(row)
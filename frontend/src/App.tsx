@@ -1,4 +1,4 @@
-import React, { useEffect, useMemo, useState } from 'react'
+import React, { useEffect, useMemo, useRef, useState } from 'react'
 
 type Flashcard = {
   id_vocabulary: number
@@ -13,6 +13,19 @@ type Flashcard = {
 
 const API_BASE = import.meta.env.VITE_API_BASE_URL
 
+// Cards are prefetched in batches from /flashcards/queue; the buffer is
+// refilled in the background once it drops to REFILL_THRESHOLD cards
+const QUEUE_SIZE = 20
+const REFILL_THRESHOLD = 5
+
+// Progress is tracked per user id, kept in localStorage and sent as X-User-Id. Browsers start
+// as the default user, who holds the progress made before per-user tracking (migration 13);
+// storing another id under USER_ID_KEY gives this browser progress of its own
+const USER_ID_KEY = 'flashcards.userId'
+const DEFAULT_USER_ID = 'default'
+const getUserId = (): string => localStorage.getItem(USER_ID_KEY) || DEFAULT_USER_ID
+const USER_HEADERS = { 'X-User-Id': getUserId() }
+
 export const App: React.FC = () => {
   const [card, setCard] = useState<Flashcard | null>(null)
   const [answer, setAnswer] = useState('')
@@ -23,6 +36,8 @@ export const App: React.FC = () => {
   const [showDetailedInfo, setShowDetailedInfo] = useState(false)
   const [hasAnswered, setHasAnswered] = useState(false)
   const [wasCorrect, setWasCorrect] = useState<boolean | null>(null)
+  const bufferRef = useRef<Flashcard[]>([])
+  const refillRef = useRef<Promise<void> | null>(null)
 
   // Centralized Arabic font stack for consistency
   const arabicFontFamily = '"Noto Naskh Arabic", serif, "Scheherazade New"'
@@ -33,27 +48,53 @@ export const App: React.FC = () => {
     return /[\u0600-\u06FF]/.test(text)
   }
 
+  const refillBuffer = (excludeId?: number): Promise<void> => {
+    if (refillRef.current) return refillRef.current
+    const url = excludeId
+      ? `${API_BASE}/flashcards/queue?language_code=ar&n=${QUEUE_SIZE}&exclude_id=${excludeId}`
+      : `${API_BASE}/flashcards/queue?language_code=ar&n=${QUEUE_SIZE}`
+    refillRef.current = fetch(url, { headers: USER_HEADERS })
+      .then(res => (res.ok ? res.json() : []))
+      .then((cards: Flashcard[]) => {
+        const queued = new Set(bufferRef.current.map(c => c.id_vocabulary))
+        for (const c of cards) {
+          if (!queued.has(c.id_vocabulary)) {
+            bufferRef.current.push(c)
+            queued.add(c.id_vocabulary)
+          }
+        }
+      })
+      .catch(() => {})
+      .finally(() => { refillRef.current = null })
+    return refillRef.current
+  }
+
+  // Take the next buffered card other than excludeId, if any
+  const takeFromBuffer = (excludeId?: number): Flashcard | undefined => {
+    bufferRef.current = bufferRef.current.filter(c => c.id_vocabulary !== excludeId)
+    return bufferRef.current.shift()
+  }
+
   const fetchCard = async (excludeId?: number) => {
-    setLoading(true)
     setFeedback(null)
     setAnswer('')
     setShowDetailedInfo(false)
     setHasAnswered(false)
     setWasCorrect(null)
-    try {
-      const url = excludeId
-        ? `${API_BASE}/flashcards/random?language_code=ar&exclude_id=${excludeId}`
-        : `${API_BASE}/flashcards/random?language_code=ar`
-      const res = await fetch(url)
-      if (!res.ok) throw new Error('No card available')
-      const data = await res.json()
-      setCard(data)
-    } catch (e) {
+    let next = takeFromBuffer(excludeId)
+    if (!next) {
+      setLoading(true)
+      await refillBuffer(excludeId)
+      next = takeFromBuffer(excludeId)
+      setLoading(false)
+    }
+    if (next) {
+      setCard(next)
+      if (bufferRef.current.length <= REFILL_THRESHOLD) void refillBuffer(next.id_vocabulary)
+    } else {
       // Keep current card if we have only one available
       if (!card) setCard(null)
       setFeedback('No other card available')
-    } finally {
-      setLoading(false)
     }
   }
 
@@ -66,7 +107,7 @@ export const App: React.FC = () => {
     if (hasAnswered) return
     const res = await fetch(`${API_BASE}/flashcards/answer`, {
       method: 'POST',
-      headers: { 'Content-Type': 'application/json' },
+      headers: { 'Content-Type': 'application/json', ...USER_HEADERS },
       body: JSON.stringify({ term_id: card.id_vocabulary, user_answer: answer, answer_type: mode })
     })
     const data = await res.json()
@@ -0,0 +1,57 @@
+"""
+Answer normalization for grading.
+
+``answer_key`` maps a string to the form answers are compared in: Unicode
+compatibility-normalized, case-folded, whitespace collapsed, and with Arabic
+spelling variation removed (tashkeel, tatweel, alef/ya/ta-marbuta variants).
+Keys for the stored terms are computed once when a term is written and kept
+in ``Term.english_key`` / ``Term.target_language_key``, so grading only has to
+normalize the user's answer.
+
+``search_key`` is the looser form /terms/search matches on: the answer keys
+of several texts split into words, with punctuation and Latin diacritics
+dropped ("marḥaba" -> "marhaba") and the Arabic definite article stripped
+("الكتاب" -> "كتاب"). It is stored in ``Term.search_key``.
+"""
+
+import re
+import unicodedata
+from typing import Optional
+
+_WHITESPACE = re.compile(r"\s+")
+_NON_WORD = re.compile(r"[\W_]+")
+ARABIC_ARTICLE = "ال"
+# Harakat, superscript alef and Quranic annotation marks, plus tatweel (U+0640)
+_ARABIC_MARKS = re.compile("[\u0610-\u061A\u0640\u064B-\u065F\u0670\u06D6-\u06DC\u06DF-\u06E8\u06EA-\u06ED]")
+_ARABIC_FOLDS = str.maketrans({
+    "أ": "ا",  # alef with hamza above -> alef
+    "إ": "ا",  # alef with hamza below -> alef
+    "آ": "ا",  # alef with madda -> alef
+    "ٱ": "ا",  # alef wasla -> alef
+    "ى": "ي",  # alef maksura -> ya
+    "ة": "ه",  # ta marbuta -> ha
+})
+
+
+def answer_key(text: Optional[str]) -> Optional[str]:
+    """Return the grading key for `text` (None stays None)."""
+    if text is None:
+        return None
+    text = unicodedata.normalize("NFKC", text).casefold()
+    text = _ARABIC_MARKS.sub("", text).translate(_ARABIC_FOLDS)
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+def search_key(*texts: Optional[str]) -> Optional[str]:
+    """Return the search key of `texts`, space-separated words (None when there are none)."""
+    words = []
+    for text in texts:
+        key = answer_key(text)
+        if not key:
+            continue
+        key = "".join(ch for ch in unicodedata.normalize("NFKD", key) if not unicodedata.combining(ch))
+        for word in _NON_WORD.sub(" ", key).split():
+            if word.startswith(ARABIC_ARTICLE) and len(word) > len(ARABIC_ARTICLE) + 1:
+                word = word[len(ARABIC_ARTICLE):]
+            words.append(word)
+    return " ".join(words) or None
@@ -0,0 +1,145 @@
+"""
+Conditional GET helpers and a short-lived response cache for read endpoints.
+
+Read endpoints send an ``ETag`` (and ``Last-Modified`` where the data has a
+timestamp). A request whose ``If-None-Match`` matches gets an empty 304;
+``If-Modified-Since`` is only consulted when ``If-None-Match`` is absent, as
+RFC 9110 requires. ETags are weak: the body is equivalent, not byte-for-byte
+guaranteed (key order, whitespace).
+
+ResponseCache keeps rendered bodies for a few seconds, keyed by whatever
+identifies the data (for stats: language id and data version), so a burst of
+clients re-reading the same stats after a version change costs one query.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Callable, Hashable, Optional
+
+from fastapi import Request, Response
+
+from serialization import dumps
+
+DEFAULT_MAX_ENTRIES = 256
+JSON_MEDIA_TYPE = "application/json"
+
+
+def http_date(moment: datetime) -> str:
+    """Format a UTC datetime (naive values are taken as UTC) as an HTTP date."""
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return format_datetime(moment.astimezone(timezone.utc), usegmt=True)
+
+
+def body_etag(prefix: str, body: bytes) -> str:
+    """A weak ETag derived from a rendered body, for responses without a data version."""
+    return f'W/"{prefix}-{hashlib.blake2b(body, digest_size=8).hexdigest()}"'
+
+
+def _opaque(tag: str) -> str:
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Weak comparison of `etag` against an If-None-Match header value."""
+    if if_none_match.strip() == "*":
+        return True
+    return _opaque(etag) in {_opaque(tag) for tag in if_none_match.split(",")}
+
+
+def not_modified(request: Request, etag: str, last_modified: Optional[datetime] = None) -> bool:
+    """True when the client's cached copy, described by its conditional headers, is current."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return etag_matches(if_none_match, etag)
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is None or last_modified is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    if last_modified.tzinfo is None:
+        last_modified = last_modified.replace(tzinfo=timezone.utc)
+    # HTTP dates have one-second resolution
+    return last_modified.replace(microsecond=0) <= since
+
+
+def _validators(etag: str, last_modified: Optional[datetime], cache_control: str) -> dict:
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if last_modified is not None:
+        headers["Last-Modified"] = http_date(last_modified)
+    return headers
+
+
+def not_modified_response(etag: str, last_modified: Optional[datetime] = None, cache_control: str = "no-cache") -> Response:
+    return Response(status_code=304, headers=_validators(etag, last_modified, cache_control))
+
+
+def json_response(
+    body: bytes, etag: str, last_modified: Optional[datetime] = None, cache_control: str = "no-cache"
+) -> Response:
+    return Response(body, media_type=JSON_MEDIA_TYPE, headers=_validators(etag, last_modified, cache_control))
+
+
+def render_json(payload) -> bytes:
+    """Render `payload` the way FastAPI's JSONResponse does, with orjson when available."""
+    return dumps(payload)
+
+
+class ResponseCache:
+    """Rendered bodies kept for `ttl` seconds, at most `max_entries` of them (oldest evicted first)."""
+
+    def __init__(self, ttl: float, max_entries: int = DEFAULT_MAX_ENTRIES, clock: Callable[[], float] = time.monotonic):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    def get(self, key: Hashable) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._clock() < entry[0]:
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: Hashable, body: bytes) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[key] = (self._clock() + self.ttl, body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "entries": len(self._entries),
+            "ttl_seconds": self.ttl,
+        }
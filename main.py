@@ -1,20 +1,136 @@
-from fastapi import FastAPI, Depends, HTTPException, Query
-from typing import Optional
+from fastapi import FastAPI, Depends, Header, HTTPException, Query, Request, Response
+from typing import List, Optional, Union
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session, sessionmaker
-from sqlalchemy import create_engine, and_, text, func
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+from sqlalchemy import func, text
+import asyncio
 import random
-import re
 import os
 from dotenv import load_dotenv
-from database import Term, Language, Base
-from schemas import FlashcardResponse, AnswerRequest, AnswerResponse
+from database import Term, Language
+from schemas import FlashcardResponse, AnswerRequest, AnswerResponse, SearchResponse
+from sampler import due_terms, sample_term, sample_terms
+from snapshot import DeckSnapshots
+from search import MODES as SEARCH_MODES, TermSearch
+from export import ApkgWriter, CsvWriter, JsonlWriter, export_query, stream_export
+from cache import MetadataCache, VersionCache, DEFAULT_TTL_SECONDS, DEFAULT_VERSION_TTL_SECONDS
+from serialization import FastJSONResponse, card_payload
+from http_cache import ResponseCache, body_etag, json_response, not_modified, not_modified_response, render_json
+from stats import (
+    aggregate_stats, apply_stats_delta, bump_language_version, counter_stats, rebuild_language_stats, stats_payload,
+    threshold_delta, user_stats,
+)
+from answer_log import DEFAULT_FLUSH_INTERVAL_SECONDS, DURABILITY_MODES, Answer, AnswerWriter, log_answers
+from progress import apply_reviews, apply_user_reviews, increment_correct, increment_user_correct
+from scheduler import utcnow
+from grading import answer_key
+from db_engine import PoolSettings, create_db_engine, pool_stats
+from cache_listener import InvalidationListener
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, AppMetrics, MetricsMiddleware
 
 # Load env
 load_dotenv()
 
-def create_app(session_maker: sessionmaker) -> FastAPI:
-    app = FastAPI(title="Flashcards API", version="1.0.0")
+DbSession = Union[Session, AsyncSession]
+
+MAX_ANSWER_BATCH = 500
+MAX_QUEUE_SIZE = 100
+MAX_SEARCH_PAGE = 100
+MAX_USER_ID_LENGTH = 64
+EXPORT_FORMATS = ("csv", "jsonl", "apkg")
+# answer_type -> (displayed answer column, precomputed grading key column)
+ANSWER_FIELDS = {
+    "english": ("english_term", "english_key"),
+    "arabic": ("target_language_term", "target_language_key"),
+}
+DURABILITY_DESCRIPTION = (
+    "immediate: counters are updated before the response; commit: the answer is logged and "
+    "folded in later; enqueue: the answer is queued in memory and may be lost in a crash"
+)
+# Card endpoints select just the FlashcardResponse columns and render the rows directly
+CARD_COLUMNS = tuple(getattr(Term, name) for name in FlashcardResponse.model_fields)
+
+
+def validate_answer_type(answer_type: str) -> None:
+    if answer_type not in ANSWER_FIELDS:
+        raise HTTPException(status_code=400, detail="Invalid answer_type. Use 'english' or 'arabic'")
+
+
+def get_user_id(
+    x_user_id: Optional[str] = Header(
+        None,
+        max_length=MAX_USER_ID_LENGTH,
+        description="Track progress for this user; without it the shared counters on terms are used",
+    ),
+) -> Optional[str]:
+    return x_user_id or None
+
+
+def grade_answer(term: Term, answer: AnswerRequest) -> AnswerResponse:
+    """Grade one answer against `term` without touching its counters."""
+    validate_answer_type(answer.answer_type)
+    answer_field, key_field = ANSWER_FIELDS[answer.answer_type]
+    correct_answer = getattr(term, answer_field)
+    # Rows written before the key columns existed fall back to normalizing on the fly
+    expected_key = getattr(term, key_field) or answer_key(correct_answer)
+    correct = answer_key(answer.user_answer) == expected_key
+    message = "برافو! 🎉" if correct else f"Incorrect. The answer is: {correct_answer}"
+    return AnswerResponse(correct=correct, correct_answer=correct_answer, message=message)
+
+
+async def run_db(db: DbSession, fn, *args, **kwargs):
+    """Run a synchronous ORM callable against either session flavour.
+
+    Handlers keep their query logic in plain functions taking a `Session`.
+    With an `AsyncSession` the function runs through `run_sync`, so database
+    I/O is awaited on the event loop instead of blocking it. With a `Session`
+    it runs in the threadpool: on the loop, a request waiting for a pooled
+    connection would block the requests that hold them from finishing.
+    """
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(fn, *args, **kwargs)
+    return await run_in_threadpool(fn, db, *args, **kwargs)
+
+
+def create_app(
+    session_maker: Union[sessionmaker, async_sessionmaker],
+    cache_ttl: float = DEFAULT_TTL_SECONDS,
+    stats_counters: bool = False,
+    scheduling: bool = False,
+    metrics: bool = True,
+    response_cache_ttl: float = 0.0,
+    version_ttl: float = DEFAULT_VERSION_TTL_SECONDS,
+    answer_durability: str = "immediate",
+    flush_interval: float = DEFAULT_FLUSH_INTERVAL_SECONDS,
+    preload: bool = False,
+    listen_for_invalidations: bool = True,
+    migrate: bool = False,
+    deck_snapshot: bool = False,
+) -> FastAPI:
+    if answer_durability not in DURABILITY_MODES:
+        raise ValueError(f"answer_durability must be one of {DURABILITY_MODES}")
+    app = FastAPI(title="Flashcards API", version="1.0.0", default_response_class=FastJSONResponse)
+    # Language metadata cache; call cache.invalidate_all() after writing to `languages`
+    metadata_cache = MetadataCache(ttl=cache_ttl)
+    app.state.metadata_cache = metadata_cache
+    # Data versions behind the stats ETag; other processes' bumps show up within `version_ttl`
+    version_cache = VersionCache(ttl=version_ttl)
+    # Rendered shared stats per (language, version); disabled when the TTL is 0
+    response_cache = ResponseCache(ttl=response_cache_ttl)
+    # Postgres full-text/trigram search, with an in-memory trigram index where those are missing
+    term_search = TermSearch(index_ttl=cache_ttl)
+    # Whether a search can need the in-memory index depends on the database, known before any session opens
+    search_bind = session_maker.kw.get("bind")  # type: ignore[attr-defined]
+    search_dialect = search_bind.dialect.name if search_bind is not None else ""
+    # Card text served from memory, with progress read per request; see snapshot.py
+    deck_snapshots = DeckSnapshots(ttl=cache_ttl) if deck_snapshot else None
+    # Other processes' writes reach the caches above through NOTIFY (Postgres only)
+    invalidation_listener = InvalidationListener(
+        session_maker.kw.get("bind") if listen_for_invalidations else None  # type: ignore[attr-defined]
+    )
 
     app.add_middleware(
         CORSMiddleware,
@@ -23,23 +139,112 @@ def create_app(session_maker: sessionmaker) -> FastAPI:
         allow_methods=["*"],
         allow_headers=["*"],
     )
+    # Added last so it wraps CORS and times the whole request
+    app_metrics = AppMetrics(session_maker.kw.get("bind")) if metrics else None  # type: ignore[attr-defined]
+    if app_metrics is not None:
+        app.add_middleware(MetricsMiddleware, metrics=app_metrics)
 
-    def get_db():
+    if isinstance(session_maker, async_sessionmaker):
+        async def get_db():
+            async with session_maker() as db:
+                yield db
+    else:
+        def get_db():
+            db = session_maker()
+            try:
+                yield db
+            finally:
+                db.close()
+
+    async def run_db_session(fn, *args, **kwargs):
+        """Run `fn` through run_db in a session of its own, for work outside a request."""
+        if isinstance(session_maker, async_sessionmaker):
+            async with session_maker() as db:
+                return await run_db(db, fn, *args, **kwargs)
         db = session_maker()
         try:
-            yield db
+            return await run_db(db, fn, *args, **kwargs)
         finally:
             db.close()
 
+    def rebuild_all_stats(db: Session):
+        for (language_id,) in db.query(Language.id).all():
+            rebuild_language_stats(db, language_id)
+        db.commit()
+
+    def warm_caches(db: Session):
+        metadata_cache.warm(db)
+        version_cache.warm(db)
+        if deck_snapshots is not None:
+            deck_snapshots.warm(db)
+
+    # At most one in-memory search index build at a time; see search.NgramIndexCache
+    search_index_builds: List[asyncio.Task] = []
+
+    async def rebuild_search_index():
+        rows = await run_db_session(term_search.index_rows)
+        if rows is not None:
+            await run_in_threadpool(term_search.ngrams.install, rows)
+
+    def build_search_index() -> asyncio.Task:
+        """Start rebuilding the in-memory search index in the background, or return the build already running."""
+        if not search_index_builds or search_index_builds[-1].done():
+            search_index_builds[:] = [asyncio.create_task(rebuild_search_index())]
+        return search_index_builds[-1]
+
+    def random_cards(db: Session, language_id: int, n: int, learned_only: bool, exclude_id, user_id) -> List[dict]:
+        """Up to `n` random eligible card bodies, from the deck snapshot when it can tell."""
+        if deck_snapshots is not None:
+            cards = deck_snapshots.sample_cards(
+                db, language_id, n, learned_only=learned_only, exclude_id=exclude_id, user_id=user_id
+            )
+            if cards is not None:
+                return cards
+        if n == 1:
+            term = sample_term(
+                db, language_id, learned_only=learned_only, exclude_id=exclude_id, user_id=user_id, columns=CARD_COLUMNS
+            )
+            return [card_payload(term)] if term is not None else []
+        terms = sample_terms(
+            db, language_id, n, learned_only=learned_only, exclude_id=exclude_id, user_id=user_id, columns=CARD_COLUMNS
+        )
+        return [card_payload(term) for term in terms]
+
+    async def migrate_schema():
+        """Bring the schema up to date, creating the tables in a new database."""
+        # Imported here: with migrations run as a deploy step, workers never load them
+        from migrations import upgrade as upgrade_schema
+
+        bind = session_maker.kw.get("bind")  # type: ignore[attr-defined]
+        if isinstance(bind, AsyncEngine):
+            async with bind.begin() as conn:
+                await conn.run_sync(upgrade_schema)
+        elif bind is not None:
+            with bind.begin() as conn:
+                upgrade_schema(conn)
+
     from contextlib import asynccontextmanager
 
     @asynccontextmanager
     async def lifespan(app: FastAPI):
-        # ensure tables exist in dev runs
-        bind = session_maker.kw.get("bind")  # type: ignore[attr-defined]
-        if bind is not None:
-            Base.metadata.create_all(bind=bind)
-        yield
+        if migrate:
+            await migrate_schema()
+        if stats_counters:
+            # Answers served while counters were disabled left them stale
+            await run_db_session(rebuild_all_stats)
+        await invalidation_listener.start()
+        if preload:
+            # Uvicorn reports a worker ready only after this, so reloads never route to a cold one
+            await run_db_session(warm_caches)
+            await build_search_index()
+        # With immediate answers by default, the flusher waits for the first write-behind one
+        await answer_writer.start(background=answer_durability != "immediate")
+        try:
+            yield
+        finally:
+            # Folds what is still queued, so a clean shutdown loses no answers
+            await answer_writer.stop()
+            await invalidation_listener.stop()
 
     app.router.lifespan_context = lifespan
 
@@ -52,83 +257,370 @@ def create_app(session_maker: sessionmaker) -> FastAPI:
         language_code: str = Query("ar", description="Language code (e.g., 'ar' for Arabic)"),
         learned_only: bool = Query(False, description="Show only learned terms"),
         exclude_id: Optional[int] = Query(None, description="Exclude this term id from selection"),
-        db: Session = Depends(get_db)
+        user_id: Optional[str] = Depends(get_user_id),
+        db: DbSession = Depends(get_db)
+    ):
+        def query(db: Session):
+            language_id = metadata_cache.language_id(db, language_code)
+            if language_id is None:
+                raise HTTPException(status_code=404, detail="Language not found")
+
+            if scheduling and not learned_only:
+                # Due reviews first; otherwise fall back to a random practice card
+                due = due_terms(db, language_id, utcnow(), exclude_id=exclude_id, user_id=user_id, columns=CARD_COLUMNS)
+                if due:
+                    return FastJSONResponse(card_payload(due[0]))
+            cards = random_cards(db, language_id, 1, learned_only, exclude_id, user_id)
+            if not cards:
+                raise HTTPException(status_code=404, detail="No flashcards available")
+            # Returned as a response, so the body is not validated again against the response model
+            return FastJSONResponse(cards[0])
+
+        return await run_db(db, query)
+
+    @app.get("/flashcards/queue", response_model=List[FlashcardResponse])
+    async def get_flashcard_queue(
+        language_code: str = Query("ar", description="Language code (e.g., 'ar' for Arabic)"),
+        n: int = Query(20, ge=1, le=MAX_QUEUE_SIZE, description="Number of distinct cards to return"),
+        learned_only: bool = Query(False, description="Show only learned terms"),
+        exclude_id: Optional[int] = Query(None, description="Exclude this term id from selection"),
+        user_id: Optional[str] = Depends(get_user_id),
+        db: DbSession = Depends(get_db)
+    ):
+        def query(db: Session):
+            language_id = metadata_cache.language_id(db, language_code)
+            if language_id is None:
+                raise HTTPException(status_code=404, detail="Language not found")
+
+            cards = []
+            if scheduling and not learned_only:
+                due = due_terms(db, language_id, utcnow(), n, exclude_id=exclude_id, user_id=user_id, columns=CARD_COLUMNS)
+                cards = [card_payload(term) for term in due]
+            if len(cards) < n:
+                due_ids = {card["id_vocabulary"] for card in cards}
+                extra = random_cards(db, language_id, n - len(cards), learned_only, exclude_id, user_id)
+                cards += [card for card in extra if card["id_vocabulary"] not in due_ids]
+            return FastJSONResponse(cards)
+
+        return await run_db(db, query)
+
+    @app.get("/terms/search", response_model=SearchResponse)
+    async def search_terms(
+        q: str = Query(..., min_length=1, max_length=200, description="Words to look for in English, Arabic or transliteration"),
+        language_code: str = Query("ar", description="Language code"),
+        mode: str = Query("words", description="'words': every word starts a word of the term; 'fuzzy': typo-tolerant, best match first"),
+        limit: int = Query(20, ge=1, le=MAX_SEARCH_PAGE, description="Page size"),
+        cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+        db: DbSession = Depends(get_db)
+    ):
+        if mode not in SEARCH_MODES:
+            raise HTTPException(status_code=400, detail="Invalid mode. Use 'words' or 'fuzzy'")
+        if term_search.may_use_memory(search_dialect, mode):
+            if not term_search.ngrams.loaded:
+                # Cold worker: every search waits for the same build instead of starting its own
+                await asyncio.shield(build_search_index())
+            elif term_search.ngrams.expired():
+                # Searches keep using the expired index until the new one replaces it
+                build_search_index()
+
+        def query(db: Session):
+            language_id = metadata_cache.language_id(db, language_code)
+            if language_id is None:
+                raise HTTPException(status_code=404, detail="Language not found")
+            try:
+                page = term_search.search(db, language_id, q, mode, limit, cursor, columns=CARD_COLUMNS)
+            except ValueError:
+                raise HTTPException(status_code=400, detail="Invalid cursor")
+            return FastJSONResponse({"items": [card_payload(row) for row in page.rows], "next_cursor": page.next_cursor})
+
+        return await run_db(db, query)
+
+    @app.get("/export")
+    async def export_deck(
+        request: Request,
+        language_code: str = Query("ar", description="Language code"),
+        format: str = Query("csv", description="csv, jsonl or apkg (Anki package)"),
+        after_id: Optional[int] = Query(None, ge=0, description="Only terms with a greater id; to resume, the last id received"),
+        max_id: Optional[int] = Query(None, ge=0, description="Only terms up to this id; to resume, the X-Export-Max-Id of the first response"),
+        user_id: Optional[str] = Depends(get_user_id),
+        db: DbSession = Depends(get_db)
     ):
-        language = db.query(Language).filter(Language.code == language_code).first()
-        if not language:
-            raise HTTPException(status_code=404, detail="Language not found")
+        if format not in EXPORT_FORMATS:
+            raise HTTPException(status_code=400, detail="Invalid format. Use 'csv', 'jsonl' or 'apkg'")
+
+        def resolve(db: Session):
+            language = next((lang for lang in metadata_cache.languages(db) if lang["code"] == language_code), None)
+            if language is None:
+                raise HTTPException(status_code=404, detail="Language not found")
+            # Pinned before streaming, so terms added meanwhile are not in a resumed export either
+            last_id = max_id
+            if last_id is None:
+                last_id = db.query(func.max(Term.id_vocabulary)).filter(Term.language_id == language["id"]).scalar() or 0
+            return language, last_id
+
+        # Errors are raised here, before the 200 and the first byte are sent
+        language, last_id = await run_db(db, resolve)
+        if format == "csv":
+            # A resumed part continues the first one, which carried the header
+            writer = CsvWriter(header=after_id is None)
+        elif format == "jsonl":
+            writer = JsonlWriter()
+        else:
+            writer = ApkgWriter(language["id"], language["name"])
+        gzip = writer.compressible and "gzip" in request.headers.get("accept-encoding", "")
+        headers = {
+            "Content-Disposition": f'attachment; filename="flashcards-{language_code}.{writer.extension}"',
+            "X-Export-Max-Id": str(last_id),
+            "Vary": "Accept-Encoding",
+        }
+        if gzip:
+            headers["Content-Encoding"] = "gzip"
+        query = export_query(language["id"], after_id, last_id, user_id)
+        return StreamingResponse(
+            stream_export(session_maker, query, writer, gzip=gzip), media_type=writer.media_type, headers=headers
+        )
+
+    def record_correct(db: Session, term: Term, increments: int = 1, user_id: Optional[str] = None) -> bool:
+        """Count correct answers for `term` in the caller's transaction.
+
+        Returns True when the shared stats changed, i.e. the language's data version was bumped.
+        """
+        if user_id is not None:
+            # Per-user progress leaves the shared terms row and its stats counters alone
+            increment_user_correct(db, user_id, term.id_vocabulary, term.language_id, increments)
+            return False
+        # `term` was loaded for grading; learned only turns true when the counter
+        # crosses the threshold, so the flag read then is still accurate for the crossing
+        was_learned = term.learned
+        result = increment_correct(db, term.id_vocabulary, increments)
+        if result is None or not result.crossed_threshold:
+            return False
+        if stats_counters:
+            learned_delta, practice_delta = threshold_delta(result.crossed_threshold, was_learned)
+            apply_stats_delta(db, result.language_id, learned_delta, practice_delta)
+        bump_language_version(db, result.language_id)
+        return True
 
-        query = db.query(Term).filter(Term.language_id == language.id)
-        if learned_only:
-            query = query.filter(Term.learned == True)
+    def record_reviews(db: Session, term: Term, results: List[bool], now, user_id: Optional[str] = None) -> None:
+        """Advance the schedule of `term` in the caller's transaction."""
+        if user_id is not None:
+            apply_user_reviews(db, user_id, term.id_vocabulary, term.language_id, results, now)
         else:
-            query = query.filter(Term.correct_counter < 3)
-        if exclude_id is not None:
-            query = query.filter(Term.id_vocabulary != exclude_id)
-        term = query.order_by(func.random()).first()
-        if term is None:
-            raise HTTPException(status_code=404, detail="No flashcards available")
-        return term
+            apply_reviews(db, term.id_vocabulary, results, now)
+
+    def fold_answers(db: Session, answers: List[Answer]) -> bool:
+        """Apply write-behind answers in the caller's transaction; True when the shared stats changed."""
+        if not answers:
+            return False
+        terms = {
+            term.id_vocabulary: term
+            for term in db.query(Term).filter(Term.id_vocabulary.in_({answer.term_id for answer in answers}))
+        }
+        correct_counts = {}
+        reviews = {}
+        for answer in answers:
+            # A term deleted by a sync since it was answered has nothing left to update
+            if answer.term_id not in terms:
+                continue
+            key = (answer.user_id, answer.term_id)
+            if answer.correct:
+                correct_counts[key] = correct_counts.get(key, 0) + 1
+            reviews.setdefault(key, []).append(answer)
+        stats_changed = False
+        for (user_id, term_id), increments in correct_counts.items():
+            stats_changed |= record_correct(db, terms[term_id], increments, user_id)
+        if scheduling:
+            for (user_id, term_id), term_answers in reviews.items():
+                results = [answer.correct for answer in term_answers]
+                record_reviews(db, terms[term_id], results, term_answers[-1].answered_at, user_id)
+        return stats_changed
+
+    def invalidate_versions(stats_changed: bool) -> None:
+        if stats_changed:
+            version_cache.invalidate()
+
+    answer_writer = AnswerWriter(run_db_session, fold_answers, invalidate_versions, interval=flush_interval)
+    app.state.answer_writer = answer_writer
+
+    def resolve_durability(durability: Optional[str]) -> str:
+        durability = durability or answer_durability
+        if durability not in DURABILITY_MODES:
+            raise HTTPException(status_code=400, detail=f"Invalid durability. Use one of {', '.join(DURABILITY_MODES)}")
+        if durability != "immediate":
+            answer_writer.ensure_running()
+        return durability
+
+    def write_behind(db: Session, durability: str, answers: List[Answer]) -> List[Answer]:
+        """Log and commit `answers`, unless they can go on the writer's queue; return those to enqueue."""
+        if durability == "enqueue" and answer_writer.running:
+            return answers
+        # "commit", or no writer running in this process to take them
+        log_answers(db, answers)
+        db.commit()
+        return []
 
     @app.post("/flashcards/answer", response_model=AnswerResponse)
     async def submit_answer(
         answer: AnswerRequest,
-        db: Session = Depends(get_db)
+        durability: Optional[str] = Query(None, description=DURABILITY_DESCRIPTION),
+        user_id: Optional[str] = Depends(get_user_id),
+        db: DbSession = Depends(get_db)
     ):
-        term = db.query(Term).filter(Term.id_vocabulary == answer.term_id).first()
-        if not term:
-            raise HTTPException(status_code=404, detail="Term not found")
-
-        def normalize_text(text: str) -> str:
-            return re.sub(r'\s+', ' ', text.strip().lower())
-
-        user_answer_normalized = normalize_text(answer.user_answer)
-        if answer.answer_type == "english":
-            correct_answer = term.english_term
-        elif answer.answer_type == "arabic":
-            correct_answer = term.target_language_term
-        else:
-            raise HTTPException(status_code=400, detail="Invalid answer_type. Use 'english' or 'arabic'")
+        durability = resolve_durability(durability)
+
+        def grade(db: Session):
+            term = db.query(Term).filter(Term.id_vocabulary == answer.term_id).first()
+            if not term:
+                raise HTTPException(status_code=404, detail="Term not found")
+
+            result = grade_answer(term, answer)
+            if durability != "immediate":
+                answers = [Answer(term.id_vocabulary, term.language_id, user_id, result.correct, utcnow())]
+                return result, write_behind(db, durability, answers)
+            stats_changed = result.correct and record_correct(db, term, user_id=user_id)
+            if scheduling:
+                record_reviews(db, term, [result.correct], utcnow(), user_id)
+            if result.correct or scheduling:
+                db.commit()
+            if stats_changed:
+                version_cache.invalidate()
+            return result, []
+
+        result, queued = await run_db(db, grade)
+        if queued:
+            await answer_writer.enqueue(queued)
+        return result
 
-        correct = user_answer_normalized == normalize_text(correct_answer)
-        if correct:
-            term.correct_counter += 1
-            if term.correct_counter >= 3:
-                term.learned = True
+    @app.post("/flashcards/answers/batch", response_model=List[AnswerResponse])
+    async def submit_answers_batch(
+        answers: List[AnswerRequest],
+        durability: Optional[str] = Query(None, description=DURABILITY_DESCRIPTION),
+        user_id: Optional[str] = Depends(get_user_id),
+        db: DbSession = Depends(get_db)
+    ):
+        durability = resolve_durability(durability)
+        if len(answers) > MAX_ANSWER_BATCH:
+            raise HTTPException(status_code=400, detail=f"At most {MAX_ANSWER_BATCH} answers per batch")
+        for answer in answers:
+            validate_answer_type(answer.answer_type)
+
+        def grade_all(db: Session):
+            term_ids = {answer.term_id for answer in answers}
+            terms = {term.id_vocabulary: term for term in db.query(Term).filter(Term.id_vocabulary.in_(term_ids))}
+            missing = sorted(term_ids - terms.keys())
+            if missing:
+                raise HTTPException(status_code=404, detail=f"Term not found: {missing}")
+
+            results = [grade_answer(terms[answer.term_id], answer) for answer in answers]
+            if durability != "immediate":
+                now = utcnow()
+                logged = [
+                    Answer(answer.term_id, terms[answer.term_id].language_id, user_id, result.correct, now)
+                    for answer, result in zip(answers, results)
+                ]
+                return results, write_behind(db, durability, logged)
+
+            correct_counts = {}
+            reviews = {}
+            for answer, result in zip(answers, results):
+                if result.correct:
+                    correct_counts[answer.term_id] = correct_counts.get(answer.term_id, 0) + 1
+                reviews.setdefault(answer.term_id, []).append(result.correct)
+            # One atomic increment per term, however many times it was answered
+            stats_changed = False
+            for term_id, increments in correct_counts.items():
+                stats_changed |= record_correct(db, terms[term_id], increments, user_id)
+            if scheduling:
+                now = utcnow()
+                for term_id, term_results in reviews.items():
+                    record_reviews(db, terms[term_id], term_results, now, user_id)
             db.commit()
+            if stats_changed:
+                version_cache.invalidate()
+            return results, []
 
-        message = "برافو! 🎉" if correct else f"Incorrect. The answer is: {correct_answer}"
-        return AnswerResponse(correct=correct, correct_answer=correct_answer, message=message)
+        results, queued = await run_db(db, grade_all)
+        if queued:
+            await answer_writer.enqueue(queued)
+        return results
 
     @app.get("/flashcards/stats")
     async def get_stats(
+        request: Request,
         language_code: str = Query("ar", description="Language code"),
-        db: Session = Depends(get_db)
+        user_id: Optional[str] = Depends(get_user_id),
+        db: DbSession = Depends(get_db)
     ):
-        language = db.query(Language).filter(Language.code == language_code).first()
-        if not language:
-            raise HTTPException(status_code=404, detail="Language not found")
+        def resolve(db: Session):
+            # Both lookups are served from cache snapshots, so a 304 normally costs no query
+            language_id = metadata_cache.language_id(db, language_code)
+            if language_id is None:
+                raise HTTPException(status_code=404, detail="Language not found")
+            return (language_id, *version_cache.version(db, language_id))
+
+        def query(db: Session, language_id: int):
+            if user_id is not None:
+                total = counter_stats(db, language_id)[0] if stats_counters else None
+                return stats_payload(*user_stats(db, user_id, language_id, total))
+            if stats_counters:
+                return stats_payload(*counter_stats(db, language_id))
+            return stats_payload(*aggregate_stats(db, language_id))
 
-        total_terms = db.query(Term).filter(Term.language_id == language.id).count()
-        learned_terms = db.query(Term).filter(and_(Term.language_id == language.id, Term.learned == True)).count()
-        practice_terms = db.query(Term).filter(and_(Term.language_id == language.id, Term.correct_counter < 3)).count()
+        language_id, version, updated_at = await run_db(db, resolve)
+        if user_id is not None:
+            # A user's progress has no version of its own, so the ETag hashes the body
+            body = render_json(await run_db(db, query, language_id))
+            etag = body_etag("stats", body)
+            if not_modified(request, etag):
+                return not_modified_response(etag, cache_control="private, no-cache")
+            return json_response(body, etag, cache_control="private, no-cache")
 
+        etag = f'W/"stats-{language_id}-{version}"'
+        if not_modified(request, etag, updated_at):
+            return not_modified_response(etag, updated_at)
+        key = ("stats", language_id, version)
+        body = response_cache.get(key) if response_cache.enabled else None
+        if body is None:
+            body = render_json(await run_db(db, query, language_id))
+            response_cache.put(key, body)
+        return json_response(body, etag, updated_at)
+
+    @app.get("/languages")
+    async def get_languages(request: Request, db: DbSession = Depends(get_db)):
+        listing, etag = await run_db(db, metadata_cache.listing)
+        if not_modified(request, etag):
+            return not_modified_response(etag)
+        return json_response(render_json(listing), etag)
+
+    @app.get("/cache/stats")
+    async def cache_stats():
         return {
-            "total_terms": total_terms,
-            "learned_terms": learned_terms,
-            "practice_terms": practice_terms,
-            "progress_percentage": round((learned_terms / total_terms * 100) if total_terms > 0 else 0, 1),
+            "metadata": metadata_cache.stats(),
+            "versions": version_cache.stats(),
+            "responses": response_cache.stats(),
+            **term_search.stats(),
+            "listener": invalidation_listener.stats(),
+            "decks": deck_snapshots.stats() if deck_snapshots is not None else None,
         }
 
-    @app.get("/languages")
-    async def get_languages(db: Session = Depends(get_db)):
-        languages = db.query(Language).all()
-        return [{"id": lang.id, "code": lang.code, "name": lang.name} for lang in languages]
+    @app.get("/answer-log/stats")
+    async def answer_log_stats():
+        return answer_writer.stats()
+
+    @app.get("/pool/stats")
+    async def get_pool_stats():
+        bind = session_maker.kw.get("bind")  # type: ignore[attr-defined]
+        return {"pool": pool_stats(bind) if bind is not None else None}
+
+    if app_metrics is not None:
+        @app.get("/metrics")
+        async def get_metrics():
+            return Response(app_metrics.render(), media_type=METRICS_CONTENT_TYPE)
 
     @app.get("/health")
-    async def health(db: Session = Depends(get_db)):
+    async def health(db: DbSession = Depends(get_db)):
         try:
-            db.execute(text("SELECT 1"))
+            await run_db(db, lambda db: db.execute(text("SELECT 1")))
             return {"status": "ok"}
         except Exception as exc:
             raise HTTPException(status_code=503, detail=f"db_unhealthy: {exc}")
@@ -136,11 +628,54 @@ def create_app(session_maker: sessionmaker) -> FastAPI:
     return app
 
 
+def _env_flag(name: str, default: str = "") -> bool:
+    return os.getenv(name, default).lower() in ("1", "true", "yes")
+
+
+def app_from_env() -> FastAPI:
+    """Build the app from the environment.
+
+    This is the factory uvicorn imports in every worker
+    (``uvicorn main:app_from_env --factory``), so each process opens its own
+    engine and pool after it has started.
+    """
+    # DATABASE_URL plus the DB_POOL_* / DB_STATEMENT_TIMEOUT_MS / DB_EXTERNAL_POOLER settings
+    settings = PoolSettings.from_env()
+    if _env_flag("DB_ASYNC"):
+        engine = create_db_engine(async_mode=True, settings=settings)
+        SessionLocal = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+    else:
+        engine = create_db_engine(settings=settings)
+        SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    return create_app(
+        SessionLocal,
+        cache_ttl=float(os.getenv("METADATA_CACHE_TTL", str(DEFAULT_TTL_SECONDS))),
+        stats_counters=_env_flag("STATS_COUNTERS"),
+        scheduling=_env_flag("SCHEDULING"),
+        metrics=_env_flag("METRICS", "1"),
+        response_cache_ttl=float(os.getenv("RESPONSE_CACHE_TTL", "0")),
+        version_ttl=float(os.getenv("VERSION_CACHE_TTL", str(DEFAULT_VERSION_TTL_SECONDS))),
+        answer_durability=os.getenv("ANSWER_DURABILITY", "immediate"),
+        flush_interval=float(os.getenv("ANSWER_FLUSH_INTERVAL", str(DEFAULT_FLUSH_INTERVAL_SECONDS))),
+        preload=_env_flag("PRELOAD_CACHES", "1"),
+        # Off by default: run `python migrations.py` once per deploy instead of in every worker
+        migrate=_env_flag("MIGRATE_ON_STARTUP"),
+        deck_snapshot=_env_flag("DECK_SNAPSHOT"),
+        # A transaction-mode pooler cannot hold a LISTEN; caches then rely on their TTLs
+        listen_for_invalidations=not settings.external_pooler,
+    )
+
+
 if __name__ == "__main__":
     import uvicorn
-    db_url = os.getenv("DATABASE_URL")
-    engine = create_engine(db_url)
-    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-    app = create_app(SessionLocal)
-    port = int(os.getenv("APP_PORT", "8000"))
-    uvicorn.run(app, host="0.0.0.0", port=port)
+    # WEB_CONCURRENCY worker processes share the port. With more than one, SIGHUP
+    # replaces them one at a time, each old worker stopping only once its
+    # replacement serves, and SIGTTIN / SIGTTOU add or remove a worker.
+    uvicorn.run(
+        "main:app_from_env",
+        factory=True,
+        host="0.0.0.0",
+        port=int(os.getenv("APP_PORT", "8000")),
+        workers=int(os.getenv("WEB_CONCURRENCY", "1")),
+        timeout_graceful_shutdown=int(os.getenv("GRACEFUL_TIMEOUT", "30")),
+    )
@@ -0,0 +1,232 @@
+"""
+Prometheus-style metrics for the API.
+
+``AppMetrics`` holds one app's metrics and renders them in the Prometheus
+text exposition format for ``GET /metrics``:
+
+- ``http_request_duration_seconds{method,route,status}``: request latency.
+  ``route`` is the matched route template, never the raw path, so label
+  cardinality stays bounded.
+- ``db_queries_per_request{route}`` and ``db_time_per_request_seconds{route}``:
+  statements executed by, and database time spent in, each request.
+- ``db_query_duration_seconds``: duration of every statement run inside a
+  request.
+- ``db_pool_*``: pool occupancy and checkout metrics (db_engine.pool_stats),
+  read at scrape time.
+
+Queries are attributed to requests through a context variable that the
+middleware sets, so one set of engine event hooks serves every app sharing
+the engine; statements issued outside a request are not recorded. The
+hot-path cost is a couple of ``perf_counter`` calls and a bisect per
+observation.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from db_engine import pool_stats
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34)
+UNMATCHED_ROUTE = "unmatched"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by label values."""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        # label values -> [per-bucket counts (+Inf last), sum]
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *labelvalues: str) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                series = self._series[labelvalues] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            series = [(labels, list(counts), total) for labels, (counts, total) in self._series.items()]
+        for labelvalues, counts, total in sorted(series):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = f'le="{_number(bound)}"'
+                yield f"{self.name}_bucket{_labels(self.labelnames, labelvalues, le)} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.labelnames, labelvalues)} {_number(total)}"
+            yield f"{self.name}_count{_labels(self.labelnames, labelvalues)} {cumulative}"
+
+
+class RequestStats:
+    """Per-request database counters, reached from the engine hooks via a context variable."""
+
+    __slots__ = ("metrics", "queries", "db_seconds")
+
+    def __init__(self, metrics: "AppMetrics"):
+        self.metrics = metrics
+        self.queries = 0
+        self.db_seconds = 0.0
+
+
+_current_request: ContextVar[Optional[RequestStats]] = ContextVar("metrics_request", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_request.get() is not None:
+        conn.info.setdefault("metrics_query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current_request.get()
+    if stats is None:
+        return
+    starts = conn.info.get("metrics_query_start")
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    stats.queries += 1
+    stats.db_seconds += elapsed
+    stats.metrics.query_duration.observe(elapsed)
+
+
+def instrument_engine(engine) -> None:
+    """Attach the query hooks to `engine` (sync or async); safe to call repeatedly."""
+    if isinstance(engine, AsyncEngine):
+        engine = engine.sync_engine
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class AppMetrics:
+    """The metrics of one app; `engine` (optional) supplies the pool gauges."""
+
+    def __init__(self, engine=None):
+        self.engine = engine
+        self.request_duration = Histogram(
+            "http_request_duration_seconds", "HTTP request latency.", ("method", "route", "status")
+        )
+        self.queries_per_request = Histogram(
+            "db_queries_per_request", "SQL statements executed per request.", ("route",), QUERY_COUNT_BUCKETS
+        )
+        self.db_time_per_request = Histogram(
+            "db_time_per_request_seconds", "Database time spent per request.", ("route",)
+        )
+        self.query_duration = Histogram(
+            "db_query_duration_seconds", "Duration of SQL statements executed by requests.", (), QUERY_BUCKETS
+        )
+        self.histograms: List[Histogram] = [
+            self.request_duration, self.queries_per_request, self.db_time_per_request, self.query_duration,
+        ]
+        if engine is not None:
+            instrument_engine(engine)
+
+    def start_request(self) -> Tuple[RequestStats, object]:
+        stats = RequestStats(self)
+        return stats, _current_request.set(stats)
+
+    def finish_request(self, stats: RequestStats, token, method: str, route: str, status: int, elapsed: float) -> None:
+        _current_request.reset(token)
+        self.request_duration.observe(elapsed, method, route, str(status))
+        self.queries_per_request.observe(stats.queries, route)
+        self.db_time_per_request.observe(stats.db_seconds, route)
+
+    def _pool_lines(self) -> Iterable[str]:
+        if self.engine is None:
+            return
+        stats = pool_stats(self.engine)
+        gauges = (
+            ("db_pool_size", "size", "Connections the pool keeps open."),
+            ("db_pool_checked_out", "checked_out", "Connections currently checked out."),
+            ("db_pool_overflow", "overflow", "Overflow connections in use (negative while below pool size)."),
+            ("db_pool_saturation", "saturation", "Checked-out connections over pool capacity."),
+        )
+        counters = (
+            ("db_pool_checkouts_total", "checkouts", "Successful pool checkouts."),
+            ("db_pool_saturated_checkouts_total", "saturated_checkouts", "Checkouts that found the pool at capacity."),
+            ("db_pool_timeouts_total", "timeouts", "Checkouts that timed out."),
+        )
+        for metrics, kind in ((gauges, "gauge"), (counters, "counter")):
+            for name, key, help in metrics:
+                if key in stats:
+                    yield f"# HELP {name} {help}"
+                    yield f"# TYPE {name} {kind}"
+                    yield f"{name} {_number(stats[key])}"
+        if "wait_ms_total" in stats:
+            yield "# HELP db_pool_checkout_wait_seconds_total Time spent waiting for pool checkouts."
+            yield "# TYPE db_pool_checkout_wait_seconds_total counter"
+            yield f"db_pool_checkout_wait_seconds_total {_number(stats['wait_ms_total'] / 1000)}"
+
+    def render(self) -> str:
+        lines = []
+        for histogram in self.histograms:
+            lines.extend(histogram.render())
+        lines.extend(self._pool_lines())
+        return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware timing every HTTP request into `metrics`."""
+
+    def __init__(self, app, metrics: AppMetrics, clock: Callable[[], float] = time.perf_counter):
+        self.app = app
+        self.metrics = metrics
+        self.clock = clock
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        started = self.clock()
+        stats, token = self.metrics.start_request()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # FastAPI stores the matched route in the scope; its template is the label
+            route = scope.get("route")
+            route = getattr(route, "path", None) or UNMATCHED_ROUTE
+            self.metrics.finish_request(stats, token, scope["method"], route, status, self.clock() - started)
@@ -2,29 +2,267 @@
 """
 Data migration script to populate the database from CSV
 Run this after setting up the database schema
+
+    python migrate_data.py            # row-by-row ORM import
+    python migrate_data.py --bulk     # set-based import (COPY on Postgres)
 """
 
+import argparse
+import csv
+import hashlib
 import os
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, Optional, Sequence
+
 from dotenv import load_dotenv
-import pandas as pd
-from sqlalchemy import create_engine
+from sqlalchemy import bindparam, func, or_, select, update
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import sessionmaker
-from database import Language, Term, Base
+from database import Language, Term
+from cache import invalidate_all, notify_invalidation
+from stats import bump_language_version, rebuild_language_stats
+from grading import answer_key, search_key
+from db_engine import create_db_engine
+from migrations import analyze, upgrade as upgrade_schema
+
+# CSV header -> terms column
+CSV_COLUMNS = {
+    "Words (English)": "english_term",
+    "Word (Arabic script)": "target_language_term",
+    "Word (Arabic with Roman characters)": "transliteration",
+    "Sample sentence (Arabic)": "example_sentence",
+    "Sample sentence explained": "example_sentence_explained",
+    "Notes": "notes",
+    "Learned": "learned",
+    "Correct Counter": "correct_counter",
+    # Written by GET /export; imports assign new ids and ignore it
+    "Id": "id_vocabulary",
+}
+TEXT_COLUMNS = [
+    "english_term",
+    "target_language_term",
+    "transliteration",
+    "example_sentence",
+    "example_sentence_explained",
+    "notes",
+]
+BULK_BATCH_SIZE = 5_000
+
+
+@dataclass
+class ImportReport:
+    rows_read: int = 0
+    inserted: int = 0
+    skipped: int = 0
+    timings: Dict[str, float] = field(default_factory=dict)
+
+    def __str__(self):
+        timings = ", ".join(f"{name}={seconds:.3f}s" for name, seconds in self.timings.items())
+        return f"read={self.rows_read} inserted={self.inserted} skipped={self.skipped} ({timings})"
+
+
+def _source_columns(header: Sequence[str]) -> list:
+    unknown = [name for name in header if name not in CSV_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unexpected CSV columns: {unknown}")
+    return [CSV_COLUMNS[name] for name in header]
+
+
+def _csv_header(header_line: str) -> list:
+    return _source_columns(next(csv.reader([header_line])))
+
+
+def _number(value: Optional[str]) -> float:
+    return float(value) if value not in (None, "") else 0.0
+
+
+def source_hash(term: dict) -> str:
+    """Digest of a source row's content columns; progress columns are not part of it."""
+    content = "\x1f".join(term[name] or "" for name in TEXT_COLUMNS)
+    return hashlib.blake2b(content.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def add_answer_keys(term: dict) -> dict:
+    """Add the grading and search keys to a `terms` column dict."""
+    term["english_key"] = answer_key(term["english_term"])
+    term["target_language_key"] = answer_key(term["target_language_term"])
+    term["search_key"] = search_key(term["english_term"], term["target_language_term"], term["transliteration"])
+    return term
+
+
+def iter_source_terms(rows: Iterable[Sequence[str]], answer_keys: bool = True) -> Iterator[dict]:
+    """Map a header row followed by data rows (CSV or spreadsheet) to `terms` column dicts (without language_id).
+
+    With `answer_keys=False` the grading keys are left out, for callers that
+    only write a few of the rows and add them with ``add_answer_keys``.
+    """
+    rows = iter(rows)
+    header = next(rows, None)
+    if header is None:
+        return
+    columns = _source_columns(header)
+    for values in rows:
+        row = dict(zip(columns, values))
+        term = {name: (row.get(name) or None) for name in TEXT_COLUMNS}
+        term["learned"] = _number(row.get("learned")) != 0
+        term["correct_counter"] = int(_number(row.get("correct_counter")))
+        term["source_hash"] = source_hash(term)
+        yield add_answer_keys(term) if answer_keys else term
 
-def migrate_data():
+
+def iter_csv_terms(csv_path: str) -> Iterator[dict]:
+    """Stream CSV rows as `terms` column dicts (without language_id)."""
+    with open(csv_path, newline="", encoding="utf-8") as fh:
+        yield from iter_source_terms(csv.reader(fh))
+
+
+def _copy_import(engine: Engine, csv_path: str, language_id: int, report: ImportReport) -> None:
+    """COPY the CSV into a temp table, then dedup and insert in one statement."""
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        with open(csv_path, newline="", encoding="utf-8") as fh:
+            columns = _csv_header(fh.readline())
+            started = time.perf_counter()
+            cursor.execute(
+                "CREATE TEMP TABLE terms_import ("
+                + ", ".join(f"{name} text" for name in CSV_COLUMNS.values())
+                + ") ON COMMIT DROP"
+            )
+            cursor.copy_expert(f"COPY terms_import ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", fh)
+            report.rows_read = cursor.rowcount
+            report.timings["copy"] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        cursor.execute(
+            f"""
+            INSERT INTO terms (language_id, {', '.join(TEXT_COLUMNS)}, learned, correct_counter)
+            SELECT DISTINCT ON (english_term, target_language_term)
+                   %(language_id)s, {', '.join(f"NULLIF({name}, '')" for name in TEXT_COLUMNS)},
+                   COALESCE(NULLIF(learned, '')::numeric, 0) <> 0,
+                   COALESCE(NULLIF(correct_counter, '')::numeric, 0)::integer
+            FROM terms_import
+            WHERE NULLIF(english_term, '') IS NOT NULL AND NULLIF(target_language_term, '') IS NOT NULL
+            ORDER BY english_term, target_language_term
+            ON CONFLICT (language_id, english_term, target_language_term) DO NOTHING
+            """,
+            {"language_id": language_id},
+        )
+        report.inserted = cursor.rowcount
+        raw.commit()
+        report.timings["insert"] = time.perf_counter() - started
+    except Exception:
+        raw.rollback()
+        raise
+    finally:
+        raw.close()
+
+    # Grading keys use Python normalization, so they are filled in after the set-based insert
+    started = time.perf_counter()
+    backfill_answer_keys(engine, language_id)
+    report.timings["answer_keys"] = time.perf_counter() - started
+
+
+def _executemany_import(engine: Engine, csv_path: str, language_id: int, report: ImportReport) -> None:
+    """Portable fallback: batched executemany of INSERT ... ON CONFLICT DO NOTHING."""
+    count_terms = select(func.count()).select_from(Term).where(Term.language_id == language_id)
+    statement = sqlite.insert(Term).on_conflict_do_nothing(
+        index_elements=["language_id", "english_term", "target_language_term"]
+    )
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        before = conn.execute(count_terms).scalar_one()
+        batch = []
+        for term in iter_csv_terms(csv_path):
+            report.rows_read += 1
+            if term["english_term"] is None or term["target_language_term"] is None:
+                continue
+            batch.append({"language_id": language_id, **term})
+            if len(batch) >= BULK_BATCH_SIZE:
+                conn.execute(statement, batch)
+                batch = []
+        if batch:
+            conn.execute(statement, batch)
+        report.inserted = conn.execute(count_terms).scalar_one() - before
+    report.timings["insert"] = time.perf_counter() - started
+
+
+def backfill_answer_keys(engine: Engine, language_id: Optional[int] = None) -> int:
+    """Compute missing grading and search keys in id-ordered batches; return the number of terms updated."""
+    statement = (
+        update(Term)
+        .where(Term.id_vocabulary == bindparam("term_id"))
+        .values(
+            english_key=bindparam("english_key"),
+            target_language_key=bindparam("target_language_key"),
+            search_key=bindparam("search_key"),
+        )
+    )
+    updated, last_id = 0, 0
+    while True:
+        query = (
+            select(Term.id_vocabulary, Term.english_term, Term.target_language_term, Term.transliteration)
+            .where(Term.id_vocabulary > last_id)
+            .where(or_(Term.english_key.is_(None), Term.target_language_key.is_(None), Term.search_key.is_(None)))
+            .order_by(Term.id_vocabulary)
+            .limit(BULK_BATCH_SIZE)
+        )
+        if language_id is not None:
+            query = query.where(Term.language_id == language_id)
+        with engine.begin() as conn:
+            rows = conn.execute(query).all()
+            if not rows:
+                return updated
+            conn.execute(statement, [
+                {
+                    "term_id": row.id_vocabulary,
+                    "english_key": answer_key(row.english_term),
+                    "target_language_key": answer_key(row.target_language_term),
+                    "search_key": search_key(row.english_term, row.target_language_term, row.transliteration),
+                }
+                for row in rows
+            ])
+        updated += len(rows)
+        last_id = rows[-1].id_vocabulary
+
+
+def bulk_import(engine: Engine, csv_path: str, language_id: int) -> ImportReport:
+    """Import `csv_path` into `terms` with set-based statements and report the counts."""
+    report = ImportReport()
+    started = time.perf_counter()
+    if engine.dialect.name == "postgresql":
+        _copy_import(engine, csv_path, language_id, report)
+    elif engine.dialect.name == "sqlite":
+        _executemany_import(engine, csv_path, language_id, report)
+    else:
+        raise ValueError(f"Bulk import is not supported for {engine.dialect.name}")
+    report.skipped = report.rows_read - report.inserted
+    # Fresh planner statistics so the pool indexes are chosen over the full deck index
+    started_analyze = time.perf_counter()
+    with engine.begin() as conn:
+        analyze(conn)
+    report.timings["analyze"] = time.perf_counter() - started_analyze
+    report.timings["total"] = time.perf_counter() - started
+    return report
+
+
+def migrate_data(bulk: bool = False, csv_path: Optional[str] = None):
     """Migrate data from CSV to database"""
     # Load env for PROJECT_ROOT, etc.
     load_dotenv()
-    project_root = os.getenv("PROJECT_ROOT", "")
-    csv_path = os.path.join(project_root, "output.csv") if project_root else "output.csv"
+    if csv_path is None:
+        project_root = os.getenv("PROJECT_ROOT", "")
+        csv_path = os.path.join(project_root, "output.csv") if project_root else "output.csv"
 
-    # Build engine/session locally from env
-    db_url = os.getenv("DATABASE_URL")
-    engine = create_engine(db_url)
+    # Build engine/session locally from env (DATABASE_URL and the DB_POOL_* settings)
+    engine = create_db_engine()
     SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-    # Ensure tables exist
-    Base.metadata.create_all(bind=engine)
+    # Ensure tables and indexes exist
+    with engine.begin() as conn:
+        upgrade_schema(conn)
 
     db = SessionLocal()
     
@@ -36,11 +274,23 @@ def migrate_data():
             db.add(arabic_lang)
             db.commit()
             db.refresh(arabic_lang)
+
+        if bulk:
+            report = bulk_import(engine, csv_path, arabic_lang.id)
+            rebuild_language_stats(db, arabic_lang.id)
+            bump_language_version(db, arabic_lang.id)
+            notify_invalidation(db)
+            db.commit()
+            invalidate_all()
+            print(f"Bulk import finished: {report}")
+            return report
         
-        # Read CSV
+        # Read CSV; pandas is only needed on this path and takes longer to import than the rest
+        import pandas as pd
         df = pd.read_csv(csv_path)
         
         # Map CSV columns to database columns
+        seen_pairs = set()
         for _, row in df.iterrows():
             # Skip rows with NaN values in required fields
             if pd.isna(row["Words (English)"]) or pd.isna(row["Word (Arabic script)"]):
@@ -48,11 +298,14 @@ def migrate_data():
                 
             # Check if term already exists
             existing_term = db.query(Term).filter(
+                Term.language_id == arabic_lang.id,
                 Term.english_term == row["Words (English)"],
                 Term.target_language_term == row["Word (Arabic script)"]
             ).first()
             
-            if not existing_term:
+            pair = (row["Words (English)"], row["Word (Arabic script)"])
+            if not existing_term and pair not in seen_pairs:
+                seen_pairs.add(pair)
                 term = Term(
                     language_id=arabic_lang.id,
                     english_term=str(row["Words (English)"]),
@@ -66,7 +319,16 @@ def migrate_data():
                 )
                 db.add(term)
         
+        # Keep the stats counters in step with the imported terms
+        rebuild_language_stats(db, arabic_lang.id)
+        bump_language_version(db, arabic_lang.id)
+        # Other processes drop their caches on commit, this one below
+        notify_invalidation(db)
         db.commit()
+        with engine.begin() as conn:
+            analyze(conn)
+        # Drop cached language metadata held by any app running in this process
+        invalidate_all()
         print(f"Successfully migrated {len(df)} terms to database")
         
     except Exception as e:
@@ -76,4 +338,8 @@ def migrate_data():
         db.close()
 
 if __name__ == "__main__":
-    migrate_data()
+    parser = argparse.ArgumentParser(description="Import output.csv into the terms table")
+    parser.add_argument("--bulk", action="store_true", help="Set-based import (COPY + INSERT ... ON CONFLICT on Postgres)")
+    parser.add_argument("--csv", dest="csv_path", help="CSV to import (default: output.csv under PROJECT_ROOT)")
+    args = parser.parse_args()
+    migrate_data(bulk=args.bulk, csv_path=args.csv_path)
@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""
+Versioned schema migrations.
+
+Each migration brings a database created from an older schema.sql (or an
+older create_all) up to the models in database.py. Applied versions are
+recorded in ``schema_migrations``, and every step checks the live schema
+before changing it, so upgrading a database that already has some of the
+objects (e.g. one built by create_all) is safe.
+
+    python migrations.py              # upgrade to the latest version
+    python migrations.py --status     # list applied and pending versions
+    python migrations.py --target 3   # upgrade up to version 3
+
+On Postgres the upgrade runs in one transaction under an advisory lock, so
+concurrently starting workers apply each migration once. Index builds take
+a write lock on `terms` for their duration; on a large live table create
+them beforehand with CREATE INDEX CONCURRENTLY under the same names and the
+migration will skip them.
+"""
+
+import argparse
+from typing import Any, Callable, List, NamedTuple, Optional, Sequence
+
+from sqlalchemy import bindparam, func, inspect, literal, or_, select, text, update
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import DBAPIError
+
+from database import (
+    DEFAULT_USER_ID, AnswerEvent, Language, LanguageStats, LanguageVersion, SchemaMigration, Term, UserTermProgress,
+    VocabRaw,
+)
+from grading import answer_key, search_key
+from scheduler import utcnow
+
+# Arbitrary application-wide key for pg_advisory_xact_lock
+ADVISORY_LOCK_KEY = 4_107_301
+BACKFILL_BATCH_SIZE = 5_000
+
+
+class Migration(NamedTuple):
+    version: int
+    description: str
+    apply: Callable[[Connection], None]
+
+
+def _columns(conn: Connection, table_name: str) -> dict:
+    return {column["name"]: column for column in inspect(conn).get_columns(table_name)}
+
+
+def _add_columns(conn: Connection, table, names: Sequence[str]) -> None:
+    existing = _columns(conn, table.name)
+    for name in names:
+        if name not in existing:
+            column_type = table.c[name].type.compile(dialect=conn.dialect)
+            conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {name} {column_type}"))
+
+
+def _create_indexes(conn: Connection, table, names: Sequence[str]) -> None:
+    indexes = {index.name: index for index in table.indexes}
+    for name in names:
+        indexes[name].create(conn, checkfirst=True)
+
+
+def _backfill(conn: Connection, table, source: Sequence[str], missing, compute: Callable[[Any], dict]) -> None:
+    """Fill the columns `compute` returns on rows matching `missing`, in id-ordered batches."""
+    statement = None
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            select(table.c.id_vocabulary, *(table.c[name] for name in source))
+            .where(table.c.id_vocabulary > last_id)
+            .where(missing)
+            .order_by(table.c.id_vocabulary)
+            .limit(BACKFILL_BATCH_SIZE)
+        ).all()
+        if not rows:
+            return
+        values = [(row.id_vocabulary, compute(row._mapping)) for row in rows]
+        if statement is None:
+            statement = (
+                update(table)
+                .where(table.c.id_vocabulary == bindparam("term_id"))
+                .values({name: bindparam(f"new_{name}") for name in values[0][1]})
+            )
+        conn.execute(statement, [
+            {"term_id": term_id, **{f"new_{name}": value for name, value in computed.items()}}
+            for term_id, computed in values
+        ])
+        last_id = rows[-1].id_vocabulary
+
+
+def _create_base_tables(conn: Connection) -> None:
+    for model in (Language, Term, VocabRaw):
+        model.__table__.create(conn, checkfirst=True)
+
+
+def _index_terms(conn: Connection) -> None:
+    terms = Term.__table__
+    # Old dumps store `learned` as an integer flag; the partial indexes compare it to true
+    learned = _columns(conn, "terms")["learned"]
+    if conn.dialect.name == "postgresql" and learned["type"].python_type is int:
+        conn.execute(text(
+            "ALTER TABLE terms ALTER COLUMN learned TYPE boolean USING COALESCE(learned, 0) <> 0"
+        ))
+    conn.execute(update(terms).where(terms.c.learned.is_(None)).values(learned=False))
+    conn.execute(update(terms).where(terms.c.correct_counter.is_(None)).values(correct_counter=0))
+    _create_indexes(conn, terms, ["ix_terms_language_deck", "ix_terms_practice_pool", "ix_terms_learned_pool"])
+    _create_indexes(conn, Language.__table__, ["ix_languages_code"])
+
+
+def _unique_translation_pairs(conn: Connection) -> None:
+    # Keep the lowest id of every duplicated pair, carrying over the best progress
+    same_pair = (
+        "d.language_id = terms.language_id AND d.english_term = terms.english_term "
+        "AND d.target_language_term = terms.target_language_term"
+    )
+    conn.execute(text(
+        f"""
+        UPDATE terms SET
+            correct_counter = (SELECT MAX(d.correct_counter) FROM terms d WHERE {same_pair}),
+            learned = (SELECT MAX(CASE WHEN d.learned THEN 1 ELSE 0 END) FROM terms d WHERE {same_pair}) = 1
+        WHERE NOT EXISTS (SELECT 1 FROM terms d WHERE {same_pair} AND d.id_vocabulary < terms.id_vocabulary)
+          AND EXISTS (SELECT 1 FROM terms d WHERE {same_pair} AND d.id_vocabulary > terms.id_vocabulary)
+        """
+    ))
+    conn.execute(text(
+        f"DELETE FROM terms WHERE EXISTS "
+        f"(SELECT 1 FROM terms d WHERE {same_pair} AND d.id_vocabulary < terms.id_vocabulary)"
+    ))
+    _create_indexes(conn, Term.__table__, ["uq_terms_language_pair"])
+
+
+def _answer_keys(conn: Connection) -> None:
+    terms = Term.__table__
+    _add_columns(conn, terms, ["english_key", "target_language_key"])
+    _backfill(
+        conn,
+        terms,
+        ["english_term", "target_language_term"],
+        terms.c.english_key.is_(None) | terms.c.target_language_key.is_(None),
+        lambda row: {
+            "english_key": answer_key(row["english_term"]),
+            "target_language_key": answer_key(row["target_language_term"]),
+        },
+    )
+
+
+def _language_stats(conn: Connection) -> None:
+    LanguageStats.__table__.create(conn, checkfirst=True)
+
+
+def _schedule(conn: Connection) -> None:
+    _add_columns(conn, Term.__table__, ["due_at", "interval_days", "ease", "repetitions"])
+    _create_indexes(conn, Term.__table__, ["ix_terms_due_queue"])
+
+
+def _user_progress(conn: Connection) -> None:
+    table = UserTermProgress.__table__
+    table.create(conn, checkfirst=True)
+    _create_indexes(conn, table, [index.name for index in table.indexes])
+
+
+def _drop_primary_key_duplicates(conn: Connection) -> None:
+    # create_all used to add a plain index next to each integer primary key
+    for name in ("ix_languages_id", "ix_terms_id_vocabulary", "ix_vocab_raw_id"):
+        conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+
+
+def _source_hash(conn: Connection) -> None:
+    _add_columns(conn, Term.__table__, ["source_hash"])
+
+
+def _language_versions(conn: Connection) -> None:
+    versions = LanguageVersion.__table__
+    versions.create(conn, checkfirst=True)
+    languages = Language.__table__
+    conn.execute(versions.insert().from_select(
+        ["language_id", "version", "updated_at"],
+        select(languages.c.id, literal(0), literal(utcnow()))
+        .where(~select(versions.c.language_id).where(versions.c.language_id == languages.c.id).exists()),
+    ))
+
+
+def _has_extension(conn: Connection, name: str) -> bool:
+    return conn.execute(text("SELECT 1 FROM pg_extension WHERE extname = :name"), {"name": name}).first() is not None
+
+
+def _search_keys(conn: Connection) -> None:
+    terms = Term.__table__
+    _add_columns(conn, terms, ["search_key"])
+    _backfill(
+        conn,
+        terms,
+        ["english_term", "target_language_term", "transliteration"],
+        terms.c.search_key.is_(None),
+        lambda row: {
+            "search_key": search_key(row["english_term"], row["target_language_term"], row["transliteration"]),
+        },
+    )
+    if conn.dialect.name != "postgresql":
+        return
+    _create_indexes(conn, terms, ["ix_terms_search_fts"])
+    try:
+        # Trusted since Postgres 13, so the database owner may install it; fuzzy search
+        # falls back to the in-memory index (search.py) where it is not available
+        with conn.begin_nested():
+            conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+    except DBAPIError:
+        pass
+    if _has_extension(conn, "pg_trgm"):
+        _create_indexes(conn, terms, ["ix_terms_search_trgm"])
+
+
+def _answer_events(conn: Connection) -> None:
+    table = AnswerEvent.__table__
+    table.create(conn, checkfirst=True)
+    _create_indexes(conn, table, [index.name for index in table.indexes])
+
+
+def _default_user_progress(conn: Connection) -> None:
+    # The web UI sends DEFAULT_USER_ID, so the progress made before per-user tracking carries over
+    progress = UserTermProgress.__table__
+    terms = Term.__table__
+    conn.execute(progress.insert().from_select(
+        ["user_id", "term_id", "language_id", "learned", "correct_counter", "due_at", "interval_days", "ease", "repetitions"],
+        select(
+            literal(DEFAULT_USER_ID),
+            terms.c.id_vocabulary,
+            terms.c.language_id,
+            func.coalesce(terms.c.learned, False),
+            func.coalesce(terms.c.correct_counter, 0),
+            terms.c.due_at,
+            func.coalesce(terms.c.interval_days, 0),
+            func.coalesce(terms.c.ease, 2.5),
+            func.coalesce(terms.c.repetitions, 0),
+        )
+        .where(
+            or_(terms.c.correct_counter > 0, terms.c.learned == True, terms.c.due_at.isnot(None)),
+            ~select(progress.c.term_id)
+            .where(progress.c.user_id == DEFAULT_USER_ID, progress.c.term_id == terms.c.id_vocabulary)
+            .exists(),
+        ),
+    ))
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, "base tables", _create_base_tables),
+    Migration(2, "boolean learned flag, deck and pool indexes on terms, unique language code", _index_terms),
+    Migration(3, "unique translation pair per language", _unique_translation_pairs),
+    Migration(4, "grading keys on terms", _answer_keys),
+    Migration(5, "language_stats counters", _language_stats),
+    Migration(6, "SM-2 schedule columns and due queue index", _schedule),
+    Migration(7, "per-user progress", _user_progress),
+    Migration(8, "drop indexes duplicating primary keys", _drop_primary_key_duplicates),
+    Migration(9, "source row hash on terms", _source_hash),
+    Migration(10, "language data versions", _language_versions),
+    Migration(11, "search keys, full-text and trigram indexes", _search_keys),
+    Migration(12, "answer event log", _answer_events),
+    Migration(13, "default user's progress from the shared term columns", _default_user_progress),
+]
+LATEST_VERSION = MIGRATIONS[-1].version
+
+
+def analyze(conn: Connection) -> None:
+    """Refresh planner statistics. SQLite never gathers them on its own, and without
+    them it cannot tell a partial pool index from the full deck index.
+
+    On Postgres this also merges the search indexes' GIN pending lists, which a
+    bulk import fills and every search would otherwise scan linearly until the
+    next autovacuum.
+    """
+    if conn.dialect.name == "sqlite":
+        conn.exec_driver_sql("ANALYZE")
+    elif conn.dialect.name == "postgresql":
+        inspector = inspect(conn)
+        for table in ("terms", "user_term_progress"):
+            if inspector.has_table(table):
+                conn.exec_driver_sql(f"ANALYZE {table}")
+        for index in ("ix_terms_search_fts", "ix_terms_search_trgm"):
+            conn.execute(
+                text("SELECT gin_clean_pending_list(to_regclass(:index)) WHERE to_regclass(:index) IS NOT NULL"),
+                {"index": index},
+            )
+
+
+def applied_versions(conn: Connection) -> List[int]:
+    if not inspect(conn).has_table(SchemaMigration.__tablename__):
+        return []
+    return list(conn.execute(select(SchemaMigration.version).order_by(SchemaMigration.version)).scalars())
+
+
+def upgrade(conn: Connection, target: Optional[int] = None) -> List[int]:
+    """Apply pending migrations up to `target` (default: latest) on `conn`; return the versions applied.
+
+    The caller owns the transaction (``engine.begin()``, or ``run_sync`` on an
+    async connection).
+    """
+    if conn.dialect.name == "postgresql":
+        conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": ADVISORY_LOCK_KEY})
+    SchemaMigration.__table__.create(conn, checkfirst=True)
+    done = set(applied_versions(conn))
+    applied = []
+    for migration in MIGRATIONS:
+        if migration.version in done or (target is not None and migration.version > target):
+            continue
+        migration.apply(conn)
+        conn.execute(SchemaMigration.__table__.insert().values(
+            version=migration.version, description=migration.description, applied_at=utcnow()
+        ))
+        applied.append(migration.version)
+    if applied:
+        analyze(conn)
+    return applied
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", type=int, help="Upgrade up to this version")
+    parser.add_argument("--status", action="store_true", help="List applied and pending versions")
+    args = parser.parse_args()
+
+    from dotenv import load_dotenv
+    from db_engine import create_db_engine
+
+    load_dotenv()
+    engine = create_db_engine()
+    if args.status:
+        with engine.connect() as conn:
+            done = set(applied_versions(conn))
+        for migration in MIGRATIONS:
+            print(f"{migration.version:>3} {'applied' if migration.version in done else 'pending'}  {migration.description}")
+        return
+    with engine.begin() as conn:
+        applied = upgrade(conn, args.target)
+    print(f"Applied migrations: {applied}" if applied else "Schema is up to date")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""
+Answer bookkeeping on ``terms``.
+
+Correct answers are applied with a single ``UPDATE ... RETURNING`` that
+increments the counter and promotes ``learned`` in the database, so
+concurrent answers for the same term can never lose an increment and no ORM
+read-modify-write round-trip is needed.
+
+Schedule updates need the previous schedule to compute the next one, so
+``apply_reviews`` reads it with ``SELECT ... FOR UPDATE`` and writes the
+result in the same transaction; concurrent reviews of a term queue up on the
+row lock instead of overwriting each other.
+
+Per-user progress lives in ``user_term_progress``. The same bookkeeping is
+done there with ``INSERT ... ON CONFLICT DO UPDATE ... RETURNING``, so a
+user's first answer creates the row and later answers increment it, still in
+one statement. Different users never write the same row, which keeps popular
+terms from becoming a lock hot spot.
+"""
+
+from datetime import datetime
+from typing import NamedTuple, Optional, Sequence
+
+from sqlalchemy import case, func, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from database import Term, UserTermProgress
+from sampler import LEARNED_THRESHOLD
+from scheduler import Schedule, answer_quality, review
+
+
+class CounterUpdate(NamedTuple):
+    correct_counter: int
+    learned: bool
+    language_id: int
+    increments: int
+
+    @property
+    def crossed_threshold(self) -> bool:
+        """True for the one update that took the counter to LEARNED_THRESHOLD or past it.
+
+        Increments are atomic, so every update sees a distinct range of counter
+        values and exactly one of them can contain the threshold.
+        """
+        return self.correct_counter - self.increments < LEARNED_THRESHOLD <= self.correct_counter
+
+
+def increment_correct(db: Session, term_id: int, increments: int = 1) -> Optional[CounterUpdate]:
+    """Atomically add `increments` correct answers to a term. Does not commit.
+
+    Returns the term's new state, or None if the term does not exist.
+    """
+    new_counter = func.coalesce(Term.correct_counter, 0) + increments
+    row = db.execute(
+        update(Term)
+        .where(Term.id_vocabulary == term_id)
+        .values(
+            correct_counter=new_counter,
+            learned=case((new_counter >= LEARNED_THRESHOLD, True), else_=Term.learned),
+        )
+        .returning(Term.correct_counter, Term.learned, Term.language_id)
+        .execution_options(synchronize_session=False)
+    ).one_or_none()
+    if row is None:
+        return None
+    return CounterUpdate(row.correct_counter, bool(row.learned), row.language_id, increments)
+
+
+def upsert_insert(db: Session):
+    """The dialect's ``insert`` construct, which supports ON CONFLICT."""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        return postgresql.insert
+    if dialect == "sqlite":
+        return sqlite.insert
+    raise ValueError(f"Upserts are not supported for {dialect}")
+
+
+def _replay(row, results: Sequence[bool], now: datetime) -> Schedule:
+    """Apply one review per answer in `results` to the schedule stored in `row`."""
+    # Columns added to an existing table start out NULL
+    schedule = Schedule(
+        row.due_at,
+        row.interval_days or 0,
+        row.ease if row.ease is not None else Schedule().ease,
+        row.repetitions or 0,
+    )
+    for correct in results:
+        schedule = review(schedule, answer_quality(correct), now)
+    return schedule
+
+
+def apply_reviews(db: Session, term_id: int, results: Sequence[bool], now: datetime) -> Optional[Schedule]:
+    """Advance a term's schedule by one review per answer in `results`. Does not commit.
+
+    Returns the new schedule, or None if the term does not exist.
+    """
+    row = db.execute(
+        select(Term.due_at, Term.interval_days, Term.ease, Term.repetitions)
+        .where(Term.id_vocabulary == term_id)
+        .with_for_update()
+    ).one_or_none()
+    if row is None:
+        return None
+    schedule = _replay(row, results, now)
+    db.execute(
+        update(Term)
+        .where(Term.id_vocabulary == term_id)
+        .values(**schedule._asdict())
+        .execution_options(synchronize_session=False)
+    )
+    return schedule
+
+
+def increment_user_correct(db: Session, user_id: str, term_id: int, language_id: int, increments: int = 1) -> CounterUpdate:
+    """Atomically add `increments` correct answers to a user's progress on a term. Does not commit."""
+    insert = upsert_insert(db)(UserTermProgress).values(
+        user_id=user_id,
+        term_id=term_id,
+        language_id=language_id,
+        correct_counter=increments,
+        learned=increments >= LEARNED_THRESHOLD,
+    )
+    new_counter = UserTermProgress.correct_counter + insert.excluded.correct_counter
+    row = db.execute(
+        insert.on_conflict_do_update(
+            index_elements=["user_id", "term_id"],
+            set_={
+                "correct_counter": new_counter,
+                "learned": case((new_counter >= LEARNED_THRESHOLD, True), else_=UserTermProgress.learned),
+            },
+        )
+        .returning(UserTermProgress.correct_counter, UserTermProgress.learned, UserTermProgress.language_id)
+        .execution_options(synchronize_session=False)
+    ).one()
+    return CounterUpdate(row.correct_counter, bool(row.learned), row.language_id, increments)
+
+
+def apply_user_reviews(
+    db: Session,
+    user_id: str,
+    term_id: int,
+    language_id: int,
+    results: Sequence[bool],
+    now: datetime,
+) -> Schedule:
+    """Advance a user's schedule for a term by one review per answer in `results`. Does not commit."""
+    db.execute(
+        upsert_insert(db)(UserTermProgress)
+        .values(user_id=user_id, term_id=term_id, language_id=language_id)
+        .on_conflict_do_nothing(index_elements=["user_id", "term_id"])
+    )
+    key = (UserTermProgress.user_id == user_id, UserTermProgress.term_id == term_id)
+    row = db.execute(
+        select(
+            UserTermProgress.due_at,
+            UserTermProgress.interval_days,
+            UserTermProgress.ease,
+            UserTermProgress.repetitions,
+        )
+        .where(*key)
+        .with_for_update()
+    ).one()
+    schedule = _replay(row, results, now)
+    db.execute(
+        update(UserTermProgress)
+        .where(*key)
+        .values(**schedule._asdict())
+        .execution_options(synchronize_session=False)
+    )
+    return schedule
@@ -0,0 +1,213 @@
+"""
+Random flashcard selection without sorting the whole deck.
+
+``ORDER BY random()`` makes the database read and sort every candidate row
+on each request. Instead we look up the id range of the candidate set in the
+partial ``(language_id, id_vocabulary)`` indexes declared on ``Term`` and
+probe a batch of distinct random ids inside it by primary key. Every
+candidate is equally likely to be among the probes, so the hits are a
+uniform sample however the candidates are spread over the range; a fetch
+costs a handful of index probes regardless of deck size.
+
+Seeking to the first candidate after a random pivot would be cheaper still,
+but it picks each card in proportion to the gap in front of it: after the
+learned cards leave the pool, a card behind a long run of them comes up
+hundreds of times more often than its neighbours. When the candidates are
+so sparse that every probe misses, a bounded run of them is read from a
+random starting point and the pick is made from that.
+
+With spaced-repetition scheduling enabled, ``due_terms`` serves reviewed
+cards in due order first: a range scan of the ``(language_id, due_at)``
+index that stops after the first rows.
+
+When a user id is given, progress comes from ``user_term_progress`` instead
+of the shared counters on ``terms``. The id range is then that of the whole
+deck (``ix_terms_language_deck``), and each probed id that exists is checked
+against the user's learned set with a primary-key probe of
+``user_term_progress``. If no probe finds a card, the fallback run is read in
+id order from the same index, with the same check on each row.
+
+Every function returns ``Term`` entities by default. Passing ``columns``
+(e.g. main.CARD_COLUMNS) selects just those columns and returns rows
+instead, which skips ORM identity-map bookkeeping for read-only callers.
+"""
+
+import random
+from datetime import datetime
+from typing import List, Optional, Sequence, Tuple
+
+from sqlalchemy import exists, func, literal_column
+from sqlalchemy.orm import Session
+
+from database import Term, UserTermProgress
+
+# A term leaves the practice pool once it has been answered correctly this many times
+LEARNED_THRESHOLD = 3
+# sample_terms reads the whole candidate range when its id span is below n times this
+DENSE_SPAN_FACTOR = 4
+MAX_SAMPLE_ROUNDS = 3
+# Random ids probed per wanted card in the first round; each later round probes this many times more
+PROBE_BATCH = 8
+PROBE_GROWTH = 8
+# Most ids probed in one round, and most candidates read when every round comes up short
+MAX_PROBES = 1024
+ENTITY = (Term,)
+
+
+def candidate_filters(
+    language_id: int,
+    learned_only: bool = False,
+    exclude_id: Optional[int] = None,
+    user_id: Optional[str] = None,
+) -> list:
+    """Return the WHERE clauses selecting the cards eligible for practice."""
+    filters = [Term.language_id == language_id]
+    if user_id is not None:
+        learned = exists().where(
+            UserTermProgress.user_id == user_id,
+            UserTermProgress.term_id == Term.id_vocabulary,
+            UserTermProgress.learned == True,
+        )
+        filters.append(learned if learned_only else ~learned)
+    elif learned_only:
+        filters.append(Term.learned == True)
+    else:
+        # Rendered as a literal so the planner can match the partial index predicate
+        filters.append(Term.correct_counter < literal_column(str(LEARNED_THRESHOLD)))
+    if exclude_id is not None:
+        filters.append(Term.id_vocabulary != exclude_id)
+    return filters
+
+
+def _id_range(db: Session, filters: list) -> Tuple[Optional[int], Optional[int]]:
+    # Separate subqueries so each aggregate is answered from one end of the index
+    return db.query(
+        db.query(func.min(Term.id_vocabulary)).filter(*filters).scalar_subquery(),
+        db.query(func.max(Term.id_vocabulary)).filter(*filters).scalar_subquery(),
+    ).one()
+
+
+def _probe(db: Session, columns: Sequence, filters: list, lo: int, hi: int, k: int, rng) -> list:
+    """Return the candidates among `k` distinct random ids in [lo, hi]."""
+    if k > hi - lo:
+        # The probes would cover the whole range; read it instead
+        return db.query(*columns).filter(*filters).all()
+    ids = rng.sample(range(lo, hi + 1), k)
+    return db.query(*columns).filter(*filters, Term.id_vocabulary.in_(ids)).all()
+
+
+def _run_from(db: Session, columns: Sequence, filters: list, pivot: int, limit: int) -> list:
+    """Read up to `limit` candidates in id order from `pivot`, wrapping around to the start."""
+    terms = db.query(*columns).filter(*filters, Term.id_vocabulary >= pivot).order_by(Term.id_vocabulary).limit(limit).all()
+    if len(terms) < limit:
+        terms += (
+            db.query(*columns)
+            .filter(*filters, Term.id_vocabulary < pivot)
+            .order_by(Term.id_vocabulary)
+            .limit(limit - len(terms))
+            .all()
+        )
+    return terms
+
+
+def sample_term(
+    db: Session,
+    language_id: int,
+    learned_only: bool = False,
+    exclude_id: Optional[int] = None,
+    rng: Optional[random.Random] = None,
+    user_id: Optional[str] = None,
+    columns: Sequence = ENTITY,
+) -> Optional[Term]:
+    """Pick a random eligible term, or return None if there is none."""
+    rng = rng or random
+    filters = candidate_filters(language_id, learned_only, exclude_id, user_id)
+    lo, hi = _id_range(db, filters)
+    if lo is None:
+        return None
+
+    for round_ in range(MAX_SAMPLE_ROUNDS):
+        terms = _probe(db, columns, filters, lo, hi, min(MAX_PROBES, PROBE_BATCH * PROBE_GROWTH**round_), rng)
+        if terms:
+            return rng.choice(terms)
+    terms = _run_from(db, columns, filters, rng.randint(lo, hi), MAX_PROBES)
+    return rng.choice(terms) if terms else None
+
+
+def sample_terms(
+    db: Session,
+    language_id: int,
+    n: int,
+    learned_only: bool = False,
+    exclude_id: Optional[int] = None,
+    rng: Optional[random.Random] = None,
+    user_id: Optional[str] = None,
+    columns: Sequence = ENTITY,
+) -> List[Term]:
+    """Pick up to `n` distinct random eligible terms in random order.
+
+    Each round probes a batch of random ids in one query, like
+    ``sample_term``, with larger batches while cards are still missing. If
+    the rounds come up short, the rest are picked from a bounded run of the
+    candidates not picked yet, so fewer than `n` terms come back only when
+    fewer than `n` are eligible.
+    """
+    rng = rng or random
+    filters = candidate_filters(language_id, learned_only, exclude_id, user_id)
+    lo, hi = _id_range(db, filters)
+    if lo is None or n <= 0:
+        return []
+
+    if hi - lo < n * DENSE_SPAN_FACTOR:
+        # Small id span: reading every candidate is cheaper than probing
+        terms = db.query(*columns).filter(*filters).all()
+        return rng.sample(terms, min(n, len(terms)))
+
+    picked = {}
+    for round_ in range(MAX_SAMPLE_ROUNDS):
+        wanted = n - len(picked)
+        k = min(MAX_PROBES, wanted * PROBE_BATCH * PROBE_GROWTH**round_)
+        for term in _probe(db, columns, filters, lo, hi, k, rng):
+            picked.setdefault(term.id_vocabulary, term)
+        if len(picked) >= n:
+            break
+    else:
+        rest = _run_from(db, columns, [*filters, Term.id_vocabulary.notin_(picked)], rng.randint(lo, hi), MAX_PROBES)
+        for term in rng.sample(rest, min(n - len(picked), len(rest))):
+            picked[term.id_vocabulary] = term
+
+    terms = list(picked.values())
+    rng.shuffle(terms)
+    return terms[:n]
+
+
+def due_terms(
+    db: Session,
+    language_id: int,
+    now: datetime,
+    n: int = 1,
+    exclude_id: Optional[int] = None,
+    user_id: Optional[str] = None,
+    columns: Sequence = ENTITY,
+) -> List[Term]:
+    """Return up to `n` reviewed terms due at `now`, most overdue first."""
+    if user_id is not None:
+        query = (
+            db.query(*columns)
+            .join(UserTermProgress, UserTermProgress.term_id == Term.id_vocabulary)
+            .filter(
+                UserTermProgress.user_id == user_id,
+                UserTermProgress.language_id == language_id,
+                UserTermProgress.due_at <= now,
+            )
+            .order_by(UserTermProgress.due_at, UserTermProgress.term_id)
+        )
+    else:
+        query = (
+            db.query(*columns)
+            .filter(Term.language_id == language_id, Term.due_at <= now)
+            .order_by(Term.due_at, Term.id_vocabulary)
+        )
+    if exclude_id is not None:
+        query = query.filter(Term.id_vocabulary != exclude_id)
+    return query.limit(n).all()
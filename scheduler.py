@@ -0,0 +1,63 @@
+"""
+SM-2 spaced-repetition scheduling.
+
+Each reviewed term carries a ``Schedule``: when it is next due, the current
+interval in days, its ease factor and the number of consecutive successful
+reviews. ``review`` is a pure function from the previous schedule and the
+answer quality (0-5, as in SM-2) to the next one, so it can be tested
+without a database.
+
+Two deviations from the original algorithm suit binary right/wrong grading:
+the ease factor is adjusted on failed reviews too (otherwise it could never
+go down), and a failed card comes back after ``RELEARN_DELAY`` rather than a
+full day so it is practised again in the same session.
+
+Datetimes are naive UTC, matching the ``terms.due_at`` column.
+"""
+
+from datetime import datetime, timedelta, timezone
+from typing import NamedTuple, Optional
+
+INITIAL_EASE = 2.5
+MIN_EASE = 1.3
+FIRST_INTERVAL_DAYS = 1
+SECOND_INTERVAL_DAYS = 6
+RELEARN_DELAY = timedelta(minutes=10)
+# Quality recorded for the app's binary grading
+CORRECT_QUALITY = 4
+INCORRECT_QUALITY = 2
+
+
+class Schedule(NamedTuple):
+    due_at: Optional[datetime] = None
+    interval_days: int = 0
+    ease: float = INITIAL_EASE
+    repetitions: int = 0
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def answer_quality(correct: bool) -> int:
+    return CORRECT_QUALITY if correct else INCORRECT_QUALITY
+
+
+def review(schedule: Schedule, quality: int, now: datetime) -> Schedule:
+    """Return the schedule after a review graded `quality` at `now`."""
+    if not 0 <= quality <= 5:
+        raise ValueError(f"quality must be between 0 and 5, got {quality}")
+
+    miss = 5 - quality
+    ease = max(MIN_EASE, schedule.ease + 0.1 - miss * (0.08 + miss * 0.02))
+    if quality < 3:
+        return Schedule(now + RELEARN_DELAY, 0, ease, 0)
+
+    repetitions = schedule.repetitions + 1
+    if repetitions == 1:
+        interval = FIRST_INTERVAL_DAYS
+    elif repetitions == 2:
+        interval = SECOND_INTERVAL_DAYS
+    else:
+        interval = max(int(round(schedule.interval_days * schedule.ease)), 1)
+    return Schedule(now + timedelta(days=interval), interval, ease, repetitions)
@@ -2,15 +2,12 @@
 -- PostgreSQL database dump
 --
 
-\restrict U2g6tpJHyruFs9BpjieSfYg9T0UubHl8CuG4d8H5Z1Zg1DZ1rG589IDivHcfgPo
-
--- Dumped from database version 18.0
--- Dumped by pg_dump version 18.0
+-- Dumped from database version 16.2
+-- Dumped by pg_dump version 16.2
 
 SET statement_timeout = 0;
 SET lock_timeout = 0;
 SET idle_in_transaction_session_timeout = 0;
-SET transaction_timeout = 0;
 SET client_encoding = 'UTF8';
 SET standard_conforming_strings = on;
 SELECT pg_catalog.set_config('search_path', '', false);
@@ -19,25 +16,95 @@ SET xmloption = content;
 SET client_min_messages = warning;
 SET row_security = off;
 
+--
+-- Name: pg_trgm; Type: EXTENSION; Schema: -; Owner: -
+--
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm WITH SCHEMA public;
+
+
+--
+-- Name: EXTENSION pg_trgm; Type: COMMENT; Schema: -; Owner: -
+--
+
+COMMENT ON EXTENSION pg_trgm IS 'text similarity measurement and index searching based on trigrams';
+
+
 SET default_tablespace = '';
 
 SET default_table_access_method = heap;
 
 --
--- Name: languages; Type: TABLE; Schema: public; Owner: postgres
+-- Name: answer_events; Type: TABLE; Schema: public; Owner: -
 --
 
-CREATE TABLE public.languages (
+CREATE TABLE public.answer_events (
     id integer NOT NULL,
-    code text NOT NULL,
-    name text NOT NULL
+    term_id integer NOT NULL,
+    language_id integer NOT NULL,
+    user_id character varying(64),
+    correct boolean NOT NULL,
+    answered_at timestamp without time zone NOT NULL,
+    folded boolean NOT NULL
+);
+
+
+--
+-- Name: answer_events_id_seq; Type: SEQUENCE; Schema: public; Owner: -
+--
+
+CREATE SEQUENCE public.answer_events_id_seq
+    AS integer
+    START WITH 1
+    INCREMENT BY 1
+    NO MINVALUE
+    NO MAXVALUE
+    CACHE 1;
+
+
+--
+-- Name: answer_events_id_seq; Type: SEQUENCE OWNED BY; Schema: public; Owner: -
+--
+
+ALTER SEQUENCE public.answer_events_id_seq OWNED BY public.answer_events.id;
+
+
+--
+-- Name: language_stats; Type: TABLE; Schema: public; Owner: -
+--
+
+CREATE TABLE public.language_stats (
+    language_id integer NOT NULL,
+    total_terms integer NOT NULL,
+    learned_terms integer NOT NULL,
+    practice_terms integer NOT NULL
 );
 
 
-ALTER TABLE public.languages OWNER TO postgres;
+--
+-- Name: language_versions; Type: TABLE; Schema: public; Owner: -
+--
+
+CREATE TABLE public.language_versions (
+    language_id integer NOT NULL,
+    version integer NOT NULL,
+    updated_at timestamp without time zone NOT NULL
+);
+
 
 --
--- Name: languages_id_seq; Type: SEQUENCE; Schema: public; Owner: postgres
+-- Name: languages; Type: TABLE; Schema: public; Owner: -
+--
+
+CREATE TABLE public.languages (
+    id integer NOT NULL,
+    code character varying(10) NOT NULL,
+    name character varying(100) NOT NULL
+);
+
+
+--
+-- Name: languages_id_seq; Type: SEQUENCE; Schema: public; Owner: -
 --
 
 CREATE SEQUENCE public.languages_id_seq
@@ -49,37 +116,52 @@ CREATE SEQUENCE public.languages_id_seq
     CACHE 1;
 
 
-ALTER SEQUENCE public.languages_id_seq OWNER TO postgres;
-
 --
--- Name: languages_id_seq; Type: SEQUENCE OWNED BY; Schema: public; Owner: postgres
+-- Name: languages_id_seq; Type: SEQUENCE OWNED BY; Schema: public; Owner: -
 --
 
 ALTER SEQUENCE public.languages_id_seq OWNED BY public.languages.id;
 
 
 --
--- Name: terms; Type: TABLE; Schema: public; Owner: postgres
+-- Name: schema_migrations; Type: TABLE; Schema: public; Owner: -
+--
+
+CREATE TABLE public.schema_migrations (
+    version integer NOT NULL,
+    description text NOT NULL,
+    applied_at timestamp without time zone NOT NULL
+);
+
+
+--
+-- Name: terms; Type: TABLE; Schema: public; Owner: -
 --
 
 CREATE TABLE public.terms (
     id_vocabulary integer NOT NULL,
     language_id integer NOT NULL,
-    english_term text,
-    target_language_term text,
+    english_term text NOT NULL,
+    target_language_term text NOT NULL,
     transliteration text,
     example_sentence text,
     example_sentence_explained text,
     notes text,
-    learned integer,
-    correct_counter integer
+    learned boolean,
+    correct_counter integer,
+    english_key text,
+    target_language_key text,
+    search_key text,
+    source_hash character varying(32),
+    due_at timestamp without time zone,
+    interval_days integer,
+    ease double precision,
+    repetitions integer
 );
 
 
-ALTER TABLE public.terms OWNER TO postgres;
-
 --
--- Name: terms_id_vocabulary_seq; Type: SEQUENCE; Schema: public; Owner: postgres
+-- Name: terms_id_vocabulary_seq; Type: SEQUENCE; Schema: public; Owner: -
 --
 
 CREATE SEQUENCE public.terms_id_vocabulary_seq
@@ -91,20 +173,36 @@ CREATE SEQUENCE public.terms_id_vocabulary_seq
     CACHE 1;
 
 
-ALTER SEQUENCE public.terms_id_vocabulary_seq OWNER TO postgres;
-
 --
--- Name: terms_id_vocabulary_seq; Type: SEQUENCE OWNED BY; Schema: public; Owner: postgres
+-- Name: terms_id_vocabulary_seq; Type: SEQUENCE OWNED BY; Schema: public; Owner: -
 --
 
 ALTER SEQUENCE public.terms_id_vocabulary_seq OWNED BY public.terms.id_vocabulary;
 
 
 --
--- Name: vocab_raw; Type: TABLE; Schema: public; Owner: postgres
+-- Name: user_term_progress; Type: TABLE; Schema: public; Owner: -
+--
+
+CREATE TABLE public.user_term_progress (
+    user_id character varying(64) NOT NULL,
+    term_id integer NOT NULL,
+    language_id integer NOT NULL,
+    learned boolean NOT NULL,
+    correct_counter integer NOT NULL,
+    due_at timestamp without time zone,
+    interval_days integer,
+    ease double precision,
+    repetitions integer
+);
+
+
+--
+-- Name: vocab_raw; Type: TABLE; Schema: public; Owner: -
 --
 
 CREATE TABLE public.vocab_raw (
+    id integer NOT NULL,
     english text,
     target_script text,
     transliteration text,
@@ -116,24 +214,80 @@ CREATE TABLE public.vocab_raw (
 );
 
 
-ALTER TABLE public.vocab_raw OWNER TO postgres;
+--
+-- Name: vocab_raw_id_seq; Type: SEQUENCE; Schema: public; Owner: -
+--
+
+CREATE SEQUENCE public.vocab_raw_id_seq
+    AS integer
+    START WITH 1
+    INCREMENT BY 1
+    NO MINVALUE
+    NO MAXVALUE
+    CACHE 1;
+
 
 --
--- Name: languages id; Type: DEFAULT; Schema: public; Owner: postgres
+-- Name: vocab_raw_id_seq; Type: SEQUENCE OWNED BY; Schema: public; Owner: -
+--
+
+ALTER SEQUENCE public.vocab_raw_id_seq OWNED BY public.vocab_raw.id;
+
+
+--
+-- Name: answer_events id; Type: DEFAULT; Schema: public; Owner: -
+--
+
+ALTER TABLE ONLY public.answer_events ALTER COLUMN id SET DEFAULT nextval('public.answer_events_id_seq'::regclass);
+
+
+--
+-- Name: languages id; Type: DEFAULT; Schema: public; Owner: -
 --
 
 ALTER TABLE ONLY public.languages ALTER COLUMN id SET DEFAULT nextval('public.languages_id_seq'::regclass);
 
 
 --
--- Name: terms id_vocabulary; Type: DEFAULT; Schema: public; Owner: postgres
+-- Name: terms id_vocabulary; Type: DEFAULT; Schema: public; Owner: -
 --
 
 ALTER TABLE ONLY public.terms ALTER COLUMN id_vocabulary SET DEFAULT nextval('public.terms_id_vocabulary_seq'::regclass);
 
 
 --
--- Name: languages languages_pkey; Type: CONSTRAINT; Schema: public; Owner: postgres
+-- Name: vocab_raw id; Type: DEFAULT; Schema: public; Owner: -
+--
+
+ALTER TABLE ONLY public.vocab_raw ALTER COLUMN id SET DEFAULT nextval('public.vocab_raw_id_seq'::regclass);
+
+
+--
+-- Name: answer_events answer_events_pkey; Type: CONSTRAINT; Schema: public; Owner: -
+--
+
+ALTER TABLE ONLY public.answer_events
+    ADD CONSTRAINT answer_events_pkey PRIMARY KEY (id);
+
+
+--
+-- Name: language_stats language_stats_pkey; Type: CONSTRAINT; Schema: public; Owner: -
+--
+
+ALTER TABLE ONLY public.language_stats
+    ADD CONSTRAINT language_stats_pkey PRIMARY KEY (language_id);
+
+
+--
+-- Name: language_versions language_versions_pkey; Type: CONSTRAINT; Schema: public; Owner: -
+--
+
+ALTER TABLE ONLY public.language_versions
+    ADD CONSTRAINT language_versions_pkey PRIMARY KEY (language_id);
+
+
+--
+-- Name: languages languages_pkey; Type: CONSTRAINT; Schema: public; Owner: -
 --
 
 ALTER TABLE ONLY public.languages
@@ -141,7 +295,15 @@ ALTER TABLE ONLY public.languages
 
 
 --
--- Name: terms terms_pkey; Type: CONSTRAINT; Schema: public; Owner: postgres
+-- Name: schema_migrations schema_migrations_pkey; Type: CONSTRAINT; Schema: public; Owner: -
+--
+
+ALTER TABLE ONLY public.schema_migrations
+    ADD CONSTRAINT schema_migrations_pkey PRIMARY KEY (version);
+
+
+--
+-- Name: terms terms_pkey; Type: CONSTRAINT; Schema: public; Owner: -
 --
 
 ALTER TABLE ONLY public.terms
@@ -149,16 +311,175 @@ ALTER TABLE ONLY public.terms
 
 
 --
--- Name: terms fk_terms_language; Type: CONSTRAINT; Schema: public; Owner: postgres
+-- Name: user_term_progress user_term_progress_pkey; Type: CONSTRAINT; Schema: public; Owner: -
+--
+
+ALTER TABLE ONLY public.user_term_progress
+    ADD CONSTRAINT user_term_progress_pkey PRIMARY KEY (user_id, term_id);
+
+
+--
+-- Name: vocab_raw vocab_raw_pkey; Type: CONSTRAINT; Schema: public; Owner: -
+--
+
+ALTER TABLE ONLY public.vocab_raw
+    ADD CONSTRAINT vocab_raw_pkey PRIMARY KEY (id);
+
+
+--
+-- Name: ix_answer_events_pending; Type: INDEX; Schema: public; Owner: -
+--
+
+CREATE INDEX ix_answer_events_pending ON public.answer_events USING btree (id) WHERE (folded = false);
+
+
+--
+-- Name: ix_languages_code; Type: INDEX; Schema: public; Owner: -
+--
+
+CREATE UNIQUE INDEX ix_languages_code ON public.languages USING btree (code);
+
+
+--
+-- Name: ix_terms_due_queue; Type: INDEX; Schema: public; Owner: -
+--
+
+CREATE INDEX ix_terms_due_queue ON public.terms USING btree (language_id, due_at, id_vocabulary) WHERE (due_at IS NOT NULL);
+
+
+--
+-- Name: ix_terms_language_deck; Type: INDEX; Schema: public; Owner: -
+--
+
+CREATE INDEX ix_terms_language_deck ON public.terms USING btree (language_id, id_vocabulary);
+
+
+--
+-- Name: ix_terms_learned_pool; Type: INDEX; Schema: public; Owner: -
+--
+
+CREATE INDEX ix_terms_learned_pool ON public.terms USING btree (language_id, id_vocabulary) WHERE (learned = true);
+
+
+--
+-- Name: ix_terms_practice_pool; Type: INDEX; Schema: public; Owner: -
+--
+
+CREATE INDEX ix_terms_practice_pool ON public.terms USING btree (language_id, id_vocabulary) WHERE (correct_counter < 3);
+
+
+--
+-- Name: ix_terms_search_fts; Type: INDEX; Schema: public; Owner: -
+--
+
+CREATE INDEX ix_terms_search_fts ON public.terms USING gin (to_tsvector('simple'::regconfig, search_key));
+
+
+--
+-- Name: ix_terms_search_trgm; Type: INDEX; Schema: public; Owner: -
+--
+
+CREATE INDEX ix_terms_search_trgm ON public.terms USING gin (search_key public.gin_trgm_ops);
+
+
+--
+-- Name: ix_user_progress_due; Type: INDEX; Schema: public; Owner: -
+--
+
+CREATE INDEX ix_user_progress_due ON public.user_term_progress USING btree (user_id, language_id, due_at, term_id) WHERE (due_at IS NOT NULL);
+
+
+--
+-- Name: ix_user_progress_learned; Type: INDEX; Schema: public; Owner: -
+--
+
+CREATE INDEX ix_user_progress_learned ON public.user_term_progress USING btree (user_id, language_id, term_id) WHERE (learned = true);
+
+
+--
+-- Name: uq_terms_language_pair; Type: INDEX; Schema: public; Owner: -
+--
+
+CREATE UNIQUE INDEX uq_terms_language_pair ON public.terms USING btree (language_id, english_term, target_language_term);
+
+
+--
+-- Name: answer_events answer_events_language_id_fkey; Type: FK CONSTRAINT; Schema: public; Owner: -
+--
+
+ALTER TABLE ONLY public.answer_events
+    ADD CONSTRAINT answer_events_language_id_fkey FOREIGN KEY (language_id) REFERENCES public.languages(id);
+
+
+--
+-- Name: answer_events answer_events_term_id_fkey; Type: FK CONSTRAINT; Schema: public; Owner: -
+--
+
+ALTER TABLE ONLY public.answer_events
+    ADD CONSTRAINT answer_events_term_id_fkey FOREIGN KEY (term_id) REFERENCES public.terms(id_vocabulary) ON DELETE CASCADE;
+
+
+--
+-- Name: language_stats language_stats_language_id_fkey; Type: FK CONSTRAINT; Schema: public; Owner: -
+--
+
+ALTER TABLE ONLY public.language_stats
+    ADD CONSTRAINT language_stats_language_id_fkey FOREIGN KEY (language_id) REFERENCES public.languages(id);
+
+
+--
+-- Name: language_versions language_versions_language_id_fkey; Type: FK CONSTRAINT; Schema: public; Owner: -
+--
+
+ALTER TABLE ONLY public.language_versions
+    ADD CONSTRAINT language_versions_language_id_fkey FOREIGN KEY (language_id) REFERENCES public.languages(id);
+
+
+--
+-- Name: terms terms_language_id_fkey; Type: FK CONSTRAINT; Schema: public; Owner: -
 --
 
 ALTER TABLE ONLY public.terms
-    ADD CONSTRAINT fk_terms_language FOREIGN KEY (language_id) REFERENCES public.languages(id) ON DELETE RESTRICT;
+    ADD CONSTRAINT terms_language_id_fkey FOREIGN KEY (language_id) REFERENCES public.languages(id);
 
 
 --
--- PostgreSQL database dump complete
+-- Name: user_term_progress user_term_progress_language_id_fkey; Type: FK CONSTRAINT; Schema: public; Owner: -
+--
+
+ALTER TABLE ONLY public.user_term_progress
+    ADD CONSTRAINT user_term_progress_language_id_fkey FOREIGN KEY (language_id) REFERENCES public.languages(id);
+
+
 --
+-- Name: user_term_progress user_term_progress_term_id_fkey; Type: FK CONSTRAINT; Schema: public; Owner: -
+--
+
+ALTER TABLE ONLY public.user_term_progress
+    ADD CONSTRAINT user_term_progress_term_id_fkey FOREIGN KEY (term_id) REFERENCES public.terms(id_vocabulary) ON DELETE CASCADE;
 
-\unrestrict U2g6tpJHyruFs9BpjieSfYg9T0UubHl8CuG4d8H5Z1Zg1DZ1rG589IDivHcfgPo
+
+--
+-- Data for Name: schema_migrations; Type: TABLE DATA; Schema: public; Owner: -
+-- (migrations.py skips the versions recorded here)
+--
+
+INSERT INTO public.schema_migrations VALUES (1, 'base tables', '2026-10-18 06:24:31.899205');
+INSERT INTO public.schema_migrations VALUES (2, 'boolean learned flag, deck and pool indexes on terms, unique language code', '2026-10-18 06:24:31.946198');
+INSERT INTO public.schema_migrations VALUES (3, 'unique translation pair per language', '2026-10-18 06:24:31.951821');
+INSERT INTO public.schema_migrations VALUES (4, 'grading keys on terms', '2026-10-18 06:24:31.956078');
+INSERT INTO public.schema_migrations VALUES (5, 'language_stats counters', '2026-10-18 06:24:31.959654');
+INSERT INTO public.schema_migrations VALUES (6, 'SM-2 schedule columns and due queue index', '2026-10-18 06:24:31.965238');
+INSERT INTO public.schema_migrations VALUES (7, 'per-user progress', '2026-10-18 06:24:31.985699');
+INSERT INTO public.schema_migrations VALUES (8, 'drop indexes duplicating primary keys', '2026-10-18 06:24:31.988976');
+INSERT INTO public.schema_migrations VALUES (9, 'source row hash on terms', '2026-10-18 06:35:15.231679');
+INSERT INTO public.schema_migrations VALUES (10, 'language data versions', '2026-10-18 06:39:55.609251');
+INSERT INTO public.schema_migrations VALUES (11, 'search keys, full-text and trigram indexes', '2026-10-18 07:00:50.224567');
+INSERT INTO public.schema_migrations VALUES (12, 'answer event log', '2026-10-18 07:13:09.463723');
+INSERT INTO public.schema_migrations VALUES (13, 'default user''s progress from the shared term columns', '2026-10-18 09:03:23.857378');
+
+
+--
+-- PostgreSQL database dump complete
+--
 
@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from pydantic import ConfigDict
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 
 class TermBase(BaseModel):
@@ -38,6 +38,11 @@ class FlashcardResponse(BaseModel):
     
     model_config = ConfigDict(from_attributes=True)
 
+class SearchResponse(BaseModel):
+    items: List[FlashcardResponse]
+    # Pass back as `cursor` for the next page; null on the last page
+    next_cursor: Optional[str] = None
+
 class AnswerRequest(BaseModel):
     term_id: int
     user_answer: str
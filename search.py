@@ -0,0 +1,335 @@
+"""
+Term search for ``GET /terms/search``.
+
+Queries and terms are compared in ``grading.search_key`` form: case-folded,
+Arabic spelling variants and Latin diacritics removed, the Arabic article
+stripped. A term is matched on its english_term, target_language_term and
+transliteration together (``Term.search_key``).
+
+- ``words`` (default): every query word must start a word of the term, so
+  "morn" finds "Good morning" and "صباح" finds "صباح الخير". Results are
+  in id order.
+- ``fuzzy``: typo-tolerant. Terms are ranked by trigram word similarity to
+  the query (as pg_trgm's ``word_similarity``), best first, and those below
+  FUZZY_THRESHOLD are dropped.
+
+On Postgres, words mode is a prefix full-text query served by the GIN index
+``ix_terms_search_fts``, and fuzzy mode uses pg_trgm's ``<%`` operator and
+``ix_terms_search_trgm``. Without pg_trgm, and on SQLite for both modes, an
+in-memory trigram index (NgramIndex) built from ``search_key`` takes over.
+It expires like the language metadata, after a TTL or when
+``cache.invalidate_all()`` runs, but building it takes seconds on a large
+deck: the API builds it once at startup (or on the first search, which
+concurrent searches wait for) and afterwards rebuilds it in the background,
+serving the previous index until the new one is in place.
+
+Pages are keyset-paginated. ``next_cursor`` encodes the last id (words) or
+the last (score, id) (fuzzy); passing it back as ``cursor`` continues after
+that row, so deep pages cost the same as the first.
+"""
+
+import time
+from array import array
+from bisect import bisect_right
+from collections import Counter, defaultdict
+from decimal import Decimal
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import Numeric, and_, cast, func, literal, or_, select, text
+from sqlalchemy.orm import Session
+
+from cache import SnapshotCache
+from database import SEARCH_VECTOR, Term
+from grading import search_key
+
+MODES = ("words", "fuzzy")
+# pg_trgm's default word_similarity_threshold
+FUZZY_THRESHOLD = 0.6
+# Fuzzy scores are compared at this many decimals, so cursors round-trip exactly
+SCORE_DECIMALS = 4
+DEFAULT_INDEX_TTL_SECONDS = 300.0
+# Terms a words search checks in id order before falling back to the GIN index
+PROBE_ROWS = 1000
+
+
+class SearchPage(NamedTuple):
+    rows: list
+    next_cursor: Optional[str]
+
+
+def parse_cursor(mode: str, cursor: Optional[str]) -> Optional[Tuple[Decimal, int]]:
+    """Decode a cursor into (score, last id); score is 0 in words mode. Raises ValueError."""
+    if not cursor:
+        return None
+    if mode == "fuzzy":
+        score_text, _, last_id = cursor.partition(":")
+        try:
+            score = Decimal(score_text)
+        except ArithmeticError:
+            raise ValueError(f"Invalid cursor: {cursor!r}")
+        if not score.is_finite():
+            raise ValueError(f"Invalid cursor: {cursor!r}")
+        return score, int(last_id)
+    return Decimal(0), int(cursor)
+
+
+def _encode_cursor(mode: str, score, last_id: int) -> str:
+    return f"{score}:{last_id}" if mode == "fuzzy" else str(last_id)
+
+
+def _prefix_query(words: List[str]) -> str:
+    # Each word quoted as a tsquery lexeme, so punctuation in it is never parsed as an operator
+    return " & ".join("'" + word.replace("'", "''") + "':*" for word in words)
+
+
+def trigrams(word: str, prefix: bool = False) -> set:
+    """pg_trgm-style trigrams of one word (two leading blanks, one trailing).
+
+    With `prefix` the trailing blank is left out, giving the trigrams every
+    word starting with `word` contains.
+    """
+    padded = "  " + word + ("" if prefix else " ")
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class NgramIndex:
+    """Trigram postings over one language's search keys, for databases without pg_trgm."""
+
+    def __init__(self, rows):
+        # rows: (id, search_key) in id order
+        self.ids = array("q")
+        self.keys: List[str] = []
+        postings: Dict[str, List[int]] = defaultdict(list)
+        for position, (term_id, key) in enumerate(rows):
+            self.ids.append(term_id)
+            self.keys.append(key or "")
+            for gram in {gram for word in self.keys[-1].split() for gram in trigrams(word)}:
+                postings[gram].append(position)
+        self.postings = {gram: array("l", positions) for gram, positions in postings.items()}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def words(self, words: List[str], after_id: int, limit: int) -> list:
+        """Ids of terms containing a word starting with each of `words`, after `after_id`."""
+        grams = set().union(*(trigrams(word, prefix=True) for word in words))
+        lists = sorted((self.postings.get(gram, ()) for gram in grams), key=len)
+        candidates = set(lists[0])
+        for positions in lists[1:]:
+            candidates.intersection_update(positions)
+        start = bisect_right(self.ids, after_id)
+        found = []
+        for position in sorted(p for p in candidates if p >= start):
+            term_words = self.keys[position].split()
+            # Trigrams only narrow things down: check the words really are prefixes
+            if all(any(term_word.startswith(word) for term_word in term_words) for word in words):
+                found.append((Decimal(0), self.ids[position]))
+                if len(found) >= limit:
+                    break
+        return found
+
+    def fuzzy(self, query: str, after: Optional[Tuple[Decimal, int]], limit: int) -> list:
+        """(score, id) of terms sharing at least FUZZY_THRESHOLD of the query's trigrams, best first."""
+        grams = set().union(*(trigrams(word) for word in query.split()))
+        shared = Counter()
+        for gram in grams:
+            shared.update(self.postings.get(gram, ()))
+        scored = []
+        for position, count in shared.items():
+            if count / len(grams) >= FUZZY_THRESHOLD:
+                score = round(Decimal(count) / len(grams), SCORE_DECIMALS)
+                scored.append((-score, self.ids[position]))
+        scored.sort()
+        found = []
+        for negative, term_id in scored:
+            score = -negative
+            if after is not None and not (score < after[0] or (score == after[0] and term_id > after[1])):
+                continue
+            found.append((score, term_id))
+            if len(found) >= limit:
+                break
+        return found
+
+
+class NgramIndexCache(SnapshotCache):
+    """An NgramIndex per language over the whole ``terms`` table.
+
+    Building it reads and tokenizes every term, seconds on a large deck, so
+    once an index is loaded requests keep using it after it expires or is
+    invalidated. The owner rebuilds it in the background when ``expired()``
+    says so: ``read()`` the rows with a session, then ``install()`` them
+    outside it, so the CPU-bound build never runs in an async session's
+    greenlet on the event loop.
+    """
+
+    def __init__(self, ttl: float = DEFAULT_INDEX_TTL_SECONDS, clock: Callable[[], float] = time.monotonic):
+        super().__init__(ttl, clock)
+        self._indexes: Optional[Dict[int, NgramIndex]] = None
+        self.stale_hits = 0
+
+    def _load(self, db: Session):
+        return self._build(self.read(db)[1])
+
+    def read(self, db: Session) -> Tuple[int, Dict[int, list]]:
+        """Return the cache generation and every language's (id, search_key) rows, for ``install()``."""
+        generation = self._generation
+        rows = defaultdict(list)
+        query = select(Term.language_id, Term.id_vocabulary, Term.search_key).order_by(Term.id_vocabulary)
+        for language_id, term_id, key in db.execute(query):
+            rows[language_id].append((term_id, key))
+        return generation, rows
+
+    @staticmethod
+    def _build(rows: Dict[int, list]) -> Dict[int, NgramIndex]:
+        return {language_id: NgramIndex(language_rows) for language_id, language_rows in rows.items()}
+
+    def install(self, read: Tuple[int, Dict[int, list]]) -> None:
+        """Build the indexes from a ``read()`` and replace the current ones; needs no session."""
+        generation, rows = read
+        self._install(generation, self._build(rows))
+
+    def _store(self, indexes) -> None:
+        self._indexes = indexes
+
+    @property
+    def loaded(self) -> bool:
+        return self._indexes is not None
+
+    def expired(self) -> bool:
+        return self._expires_at is None or self._clock() >= self._expires_at
+
+    def index(self, db: Session, language_id: int) -> NgramIndex:
+        """Return the index of a language, loading it first if none was ever loaded."""
+        indexes = self._indexes
+        if indexes is None:
+            self._snapshot(db)
+            indexes = self._indexes
+        else:
+            with self._lock:
+                self.hits += 1
+                if self.expired():
+                    self.stale_hits += 1
+        return indexes.get(language_id) or NgramIndex([])
+
+    def stats(self) -> dict:
+        indexes = self._indexes or {}
+        return {**super().stats(), "stale_hits": self.stale_hits, "terms": sum(len(index) for index in indexes.values())}
+
+
+class TermSearch:
+    """Runs searches against Postgres indexes where they exist, and the in-memory index otherwise."""
+
+    def __init__(self, index_ttl: float = DEFAULT_INDEX_TTL_SECONDS):
+        self.ngrams = NgramIndexCache(ttl=index_ttl)
+        self._pg_trgm: Optional[bool] = None
+
+    def _has_pg_trgm(self, db: Session) -> bool:
+        if self._pg_trgm is None:
+            self._pg_trgm = db.execute(text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")).first() is not None
+        return self._pg_trgm
+
+    def backend(self, db: Session, mode: str) -> str:
+        if db.get_bind().dialect.name != "postgresql":
+            return "memory"
+        if mode == "fuzzy" and not self._has_pg_trgm(db):
+            return "memory"
+        return "postgres"
+
+    def search(
+        self,
+        db: Session,
+        language_id: int,
+        query: str,
+        mode: str = "words",
+        limit: int = 20,
+        cursor: Optional[str] = None,
+        columns=(Term,),
+    ) -> SearchPage:
+        """Return one page of matches as `columns` rows; raises ValueError for a bad cursor."""
+        after = parse_cursor(mode, cursor)
+        key = search_key(query)
+        if key is None:
+            return SearchPage([], None)
+        if self.backend(db, mode) == "postgres" and mode == "fuzzy":
+            hits = self._postgres_fuzzy(db, language_id, key, limit + 1, after)
+        elif self.backend(db, mode) == "postgres":
+            hits = [(Decimal(0), term_id) for term_id in self._postgres_words(db, language_id, key, limit + 1, after)]
+        else:
+            index = self.ngrams.index(db, language_id)
+            if mode == "fuzzy":
+                hits = index.fuzzy(key, after, limit + 1)
+            else:
+                hits = index.words(key.split(), after[1] if after else 0, limit + 1)
+        next_cursor = _encode_cursor(mode, *hits[limit - 1]) if len(hits) > limit else None
+        hits = hits[:limit]
+        if not hits:
+            return SearchPage([], next_cursor)
+        ids = [term_id for _, term_id in hits]
+        rows = {row.id_vocabulary: row for row in db.query(*columns).filter(Term.id_vocabulary.in_(ids))}
+        return SearchPage([rows[term_id] for term_id in ids if term_id in rows], next_cursor)
+
+    def _postgres_fuzzy(self, db: Session, language_id: int, key: str, limit: int, after) -> list:
+        score = func.round(cast(func.word_similarity(key, Term.search_key), Numeric), SCORE_DECIMALS)
+        query = (
+            select(score, Term.id_vocabulary)
+            .where(Term.language_id == language_id, literal(key).op("<%")(Term.search_key))
+            .order_by(score.desc(), Term.id_vocabulary)
+        )
+        if after is not None:
+            query = query.where(or_(score < after[0], and_(score == after[0], Term.id_vocabulary > after[1])))
+        return [(Decimal(score), term_id) for score, term_id in db.execute(query.limit(limit))]
+
+    def _postgres_words(self, db: Session, language_id: int, key: str, limit: int, after) -> list:
+        # The planner estimates every prefix query at the same row count, so it
+        # either always walks the primary key (seconds for a rare word on a large
+        # deck) or always reads every match from the GIN index (slow for "a").
+        # Try the first: a common prefix fills the page within the next
+        # PROBE_ROWS terms, matched with LIKE since keys are just words and
+        # spaces. Otherwise the GIN index, sorted by `id + 0` so the primary key
+        # walk is off the table, and without parallel workers, whose startup
+        # costs more than the scan.
+        words = key.split()
+        conditions = [Term.language_id == language_id]
+        if after is not None:
+            conditions.append(Term.id_vocabulary > after[1])
+        window = (
+            select(Term.id_vocabulary, Term.search_key)
+            .where(*conditions)
+            .order_by(Term.id_vocabulary)
+            .limit(PROBE_ROWS)
+            .subquery()
+        )
+        probe = (
+            select(window.c.id_vocabulary)
+            .where(*(
+                or_(window.c.search_key.startswith(word, autoescape=True), window.c.search_key.contains(" " + word, autoescape=True))
+                for word in words
+            ))
+            .order_by(window.c.id_vocabulary)
+            .limit(limit)
+        )
+        ids = list(db.execute(probe).scalars())
+        if len(ids) == limit:
+            return ids
+        db.execute(text("SET LOCAL max_parallel_workers_per_gather = 0"))
+        tsquery = func.to_tsquery(text("'simple'::regconfig"), _prefix_query(words))
+        query = (
+            select(Term.id_vocabulary)
+            .where(*conditions, SEARCH_VECTOR.op("@@")(tsquery))
+            .order_by(Term.id_vocabulary + 0)
+            .limit(limit)
+        )
+        return list(db.execute(query).scalars())
+
+    def may_use_memory(self, dialect: str, mode: str) -> bool:
+        """Whether a `mode` search on `dialect` may need the in-memory index (before pg_trgm was looked up)."""
+        return dialect != "postgresql" or (mode == "fuzzy" and not self._pg_trgm)
+
+    def index_rows(self, db: Session) -> Optional[Tuple[int, Dict[int, list]]]:
+        """``NgramIndexCache.read()`` if this database needs the in-memory index for any search, else None."""
+        if self.backend(db, "fuzzy") == "memory":
+            return self.ngrams.read(db)
+        return None
+
+    def stats(self) -> dict:
+        return {"ngram_index": self.ngrams.stats()}
@@ -0,0 +1,44 @@
+"""
+JSON rendering for API responses.
+
+Uses orjson when it is installed and the standard library otherwise; both
+produce the same compact UTF-8 output as FastAPI's JSONResponse. Card
+endpoints select plain columns and hand ``card_payload`` dicts straight to
+``FastJSONResponse``, which skips Pydantic validation of the response (the
+columns already have the FlashcardResponse types).
+"""
+
+import json
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - exercised only without orjson
+    orjson = None
+
+JSON_BACKEND = "orjson" if orjson is not None else "json"
+
+
+def stdlib_dumps(payload: Any) -> bytes:
+    return json.dumps(payload, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+if orjson is not None:
+    def dumps(payload: Any) -> bytes:
+        """Render `payload` as compact UTF-8 JSON."""
+        return orjson.dumps(payload)
+else:  # pragma: no cover
+    dumps = stdlib_dumps
+
+
+def card_payload(row) -> dict:
+    """A FlashcardResponse body from a row selected with main.CARD_COLUMNS."""
+    # Several times faster than dict(row._mapping)
+    return dict(zip(row._fields, row))
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
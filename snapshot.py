@@ -0,0 +1,223 @@
+"""
+In-memory deck snapshots for serving random cards.
+
+A card's text rarely changes, but its progress changes with every answer.
+DeckSnapshots loads the text of every term once, per language, and serves
+``/flashcards/random`` and ``/flashcards/queue`` from it: random positions
+are drawn from the snapshot, and a primary-key lookup of just those ids
+overlays their current progress and drops the ones not eligible. One query
+per request replaces the sampler's range lookup and index seeks, and no
+card text is read from the database.
+
+Decks are stored column-wise to keep them small. Ids live in an
+``array('q')``, and all text goes into one UTF-8 buffer with an offset and
+a length per cell, so a card costs about 56 bytes plus its text rather than
+a Python object per field. Repeated strings (transliterations, notes) are
+stored once. The buffer is decoded per served card.
+
+A snapshot is dropped by ``cache.invalidate_all()``, which ``sync.py`` and
+``migrate_data.py`` trigger in every worker, and reloaded after its TTL.
+Until then, new terms are not served from it, and deleted ones are skipped
+because the overlay finds no row.
+"""
+
+import random
+from array import array
+from typing import Dict, List, Optional, Sequence
+
+from sqlalchemy import and_, select
+from sqlalchemy.orm import Session
+
+from cache import DEFAULT_TTL_SECONDS, SnapshotCache
+from database import Term, UserTermProgress
+from sampler import LEARNED_THRESHOLD
+
+# Card fields kept in the snapshot, in FlashcardResponse order; correct_counter is overlaid
+TEXT_FIELDS = (
+    "english_term",
+    "target_language_term",
+    "transliteration",
+    "example_sentence",
+    "example_sentence_explained",
+    "notes",
+)
+LOAD_BATCH_SIZE = 10_000
+MAX_SAMPLE_ROUNDS = 3
+# Length stored for a NULL cell
+NULL = -1
+
+
+class DeckSnapshot:
+    """The card text of one language's terms, column-wise, ordered by id."""
+
+    __slots__ = ("ids", "_offsets", "_lengths", "_text")
+
+    def __init__(self, ids: array, offsets: array, lengths: array, text: bytes):
+        self.ids = ids
+        # Cell i of row r is at r * len(TEXT_FIELDS) + i
+        self._offsets = offsets
+        self._lengths = lengths
+        self._text = text
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def card(self, position: int, correct_counter: int) -> dict:
+        """The FlashcardResponse body of the term at `position`."""
+        payload = {"id_vocabulary": self.ids[position]}
+        cell = position * len(TEXT_FIELDS)
+        text = self._text
+        for i, field in enumerate(TEXT_FIELDS):
+            length = self._lengths[cell + i]
+            if length == NULL:
+                payload[field] = None
+            else:
+                offset = self._offsets[cell + i]
+                payload[field] = text[offset:offset + length].decode("utf-8")
+        payload["correct_counter"] = correct_counter
+        return payload
+
+    def nbytes(self) -> int:
+        """Bytes held by the snapshot's arrays and text buffer."""
+        return sum(column.itemsize * len(column) for column in (self.ids, self._offsets, self._lengths)) + len(self._text)
+
+
+class _DeckBuilder:
+    def __init__(self):
+        self.ids = array("q")
+        self.offsets = array("q")
+        self.lengths = array("i")
+        self.text = bytearray()
+        # Each distinct string is encoded once; repeats point at the same bytes
+        self._seen: Dict[str, tuple] = {}
+
+    def add(self, term_id: int, values: Sequence[Optional[str]]) -> None:
+        self.ids.append(term_id)
+        for value in values:
+            if value is None:
+                self.offsets.append(0)
+                self.lengths.append(NULL)
+                continue
+            cell = self._seen.get(value)
+            if cell is None:
+                encoded = value.encode("utf-8")
+                cell = self._seen[value] = (len(self.text), len(encoded))
+                self.text += encoded
+            self.offsets.append(cell[0])
+            self.lengths.append(cell[1])
+
+    def build(self) -> DeckSnapshot:
+        # Four-byte offsets unless the text outgrows them
+        offsets = array("I", self.offsets) if len(self.text) < 2**32 else self.offsets
+        return DeckSnapshot(self.ids, offsets, self.lengths, bytes(self.text))
+
+
+class DeckSnapshots(SnapshotCache):
+    """Deck snapshots for every language, loaded together from ``terms``."""
+
+    def __init__(self, ttl: float = DEFAULT_TTL_SECONDS, **kwargs):
+        super().__init__(ttl, **kwargs)
+        self._decks: Dict[int, DeckSnapshot] = {}
+
+    def _load(self, db: Session):
+        columns = [Term.language_id, Term.id_vocabulary] + [getattr(Term, field) for field in TEXT_FIELDS]
+        builders: Dict[int, _DeckBuilder] = {}
+        rows = db.execute(
+            select(*columns).order_by(Term.language_id, Term.id_vocabulary).execution_options(yield_per=LOAD_BATCH_SIZE)
+        )
+        for language_id, term_id, *values in rows:
+            builder = builders.get(language_id)
+            if builder is None:
+                builder = builders[language_id] = _DeckBuilder()
+            builder.add(term_id, values)
+        return {language_id: builder.build() for language_id, builder in builders.items()}
+
+    def _store(self, decks) -> None:
+        self._decks = decks
+
+    def deck(self, db: Session, language_id: int) -> Optional[DeckSnapshot]:
+        self._snapshot(db)
+        return self._decks.get(language_id)
+
+    def sample_cards(
+        self,
+        db: Session,
+        language_id: int,
+        n: int,
+        learned_only: bool = False,
+        exclude_id: Optional[int] = None,
+        rng: Optional[random.Random] = None,
+        user_id: Optional[str] = None,
+    ) -> Optional[List[dict]]:
+        """Pick up to `n` distinct random eligible cards, with the same eligibility as sampler.sample_terms.
+
+        Returns None when the snapshot cannot tell: the language has no
+        deck, or most of the cards drawn were not eligible. The caller then
+        falls back to the sampler.
+        """
+        deck = self.deck(db, language_id)
+        if deck is None or not len(deck):
+            return None
+        rng = rng or random
+        cards: List[dict] = []
+        tried = set()
+        for round_ in range(MAX_SAMPLE_ROUNDS):
+            wanted = n - len(cards)
+            untried = len(deck) - len(tried)
+            if wanted <= 0 or untried <= 0:
+                break
+            # Later rounds draw more, for decks where few cards are eligible
+            draw = (wanted + wanted // 2 + 1) * 4 ** round_
+            if draw * 2 >= untried:
+                positions = [position for position in range(len(deck)) if position not in tried]
+                rng.shuffle(positions)
+            else:
+                positions = []
+                while len(positions) < draw:
+                    position = rng.randrange(len(deck))
+                    if position not in tried:
+                        tried.add(position)
+                        positions.append(position)
+            tried.update(positions)
+            progress = _progress(db, [deck.ids[position] for position in positions], user_id)
+            for position in positions:
+                term_id = deck.ids[position]
+                if term_id not in progress or term_id == exclude_id:
+                    continue
+                correct_counter, learned = progress[term_id]
+                if learned_only:
+                    eligible = learned
+                elif user_id is not None:
+                    eligible = not learned
+                else:
+                    eligible = correct_counter is not None and correct_counter < LEARNED_THRESHOLD
+                if eligible and len(cards) < n:
+                    cards.append(deck.card(position, correct_counter))
+        if len(cards) < n and len(tried) < len(deck):
+            return None
+        return cards
+
+    def stats(self) -> dict:
+        decks = self._decks
+        return {
+            **super().stats(),
+            "terms": sum(len(deck) for deck in decks.values()),
+            "bytes": sum(deck.nbytes() for deck in decks.values()),
+        }
+
+
+def _progress(db: Session, ids: List[int], user_id: Optional[str]) -> Dict[int, tuple]:
+    """Return {term id: (correct_counter, learned)} for the terms in `ids` that still exist.
+
+    With a user id, `learned` is that user's flag; correct_counter stays the
+    shared counter, as in the sampler's rows.
+    """
+    if user_id is None:
+        query = select(Term.id_vocabulary, Term.correct_counter, Term.learned)
+    else:
+        query = select(Term.id_vocabulary, Term.correct_counter, UserTermProgress.learned).outerjoin(
+            UserTermProgress,
+            and_(UserTermProgress.user_id == user_id, UserTermProgress.term_id == Term.id_vocabulary),
+        )
+    rows = db.execute(query.where(Term.id_vocabulary.in_(ids)))
+    return {term_id: (correct_counter, bool(learned)) for term_id, correct_counter, learned in rows}
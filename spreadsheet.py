@@ -0,0 +1,76 @@
+"""
+Streaming reader for the vocabulary master spreadsheet.
+
+openpyxl's read-only mode parses the worksheet XML lazily, so rows are
+produced one at a time instead of materialising the whole sheet the way
+``pd.read_excel`` does. ``convert_to_csv`` writes them out in fixed-size
+chunks, which keeps peak memory bounded by the chunk size rather than the
+sheet size.
+"""
+
+import csv
+from datetime import date, datetime
+from typing import Iterator, List, Optional, Sequence
+
+from openpyxl import load_workbook
+
+DEFAULT_CHUNK_SIZE = 1_000
+
+
+def _cell_text(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        # Keep the Learned flag numeric so importers can parse it like a counter
+        return "1" if value else "0"
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+def iter_sheet_rows(path: str, sheet: Optional[str] = None) -> Iterator[List[str]]:
+    """Yield the header and then every non-empty data row of `sheet` as strings."""
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        worksheet = workbook[sheet] if sheet else workbook.active
+        rows = worksheet.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        # Drop unnamed trailing columns (formatting often extends the used range)
+        width = len(header)
+        while width and header[width - 1] is None:
+            width -= 1
+        yield [_cell_text(value) for value in header[:width]]
+        for row in rows:
+            values = row[:width]
+            if all(value is None for value in values):
+                continue
+            cells = [_cell_text(value) for value in values]
+            cells.extend([""] * (width - len(cells)))
+            yield cells
+    finally:
+        workbook.close()
+
+
+def _chunks(rows: Iterator[Sequence[str]], size: int) -> Iterator[List[Sequence[str]]]:
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def convert_to_csv(input_path: str, output_path: str, sheet: Optional[str] = None, chunk_size: int = DEFAULT_CHUNK_SIZE) -> int:
+    """Stream `sheet` of `input_path` into `output_path`; return the number of data rows written."""
+    rows = iter_sheet_rows(input_path, sheet)
+    written = -1  # the header is not a data row
+    with open(output_path, "w", newline="", encoding="utf-8") as fh:
+        writer = csv.writer(fh)
+        for chunk in _chunks(rows, chunk_size):
+            writer.writerows(chunk)
+            written += len(chunk)
+    return max(written, 0)
@@ -0,0 +1,133 @@
+"""
+Deck statistics for /flashcards/stats.
+
+``aggregate_stats`` computes total, learned and practice counts with one
+conditional-aggregate scan over a language's terms. When stats counters are
+enabled the same numbers are kept in the ``language_stats`` table instead:
+answer handlers apply deltas in the answer's own transaction, so reading
+stats is a primary-key lookup no matter how large the deck is. Anything
+that rewrites ``terms`` in bulk (imports, admin edits) must call
+``rebuild_language_stats`` afterwards.
+
+``bump_language_version`` advances the language's row in
+``language_versions``, from which the stats ETag is derived. Answers call it
+when a term crosses the learned threshold (the only answer that changes the
+shared numbers) and imports call it after rewriting terms.
+
+``user_stats`` reports one user's progress: the deck size comes from either
+source above, and the learned count is an index-only count over the user's
+rows in ``user_term_progress``.
+"""
+
+from datetime import datetime
+from typing import Optional, Tuple
+
+from sqlalchemy import case, func, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from cache import VERSIONS, notify_invalidation
+from database import LanguageStats, LanguageVersion, Term, UserTermProgress
+from progress import upsert_insert
+from sampler import LEARNED_THRESHOLD
+from scheduler import utcnow
+
+
+def aggregate_stats(db: Session, language_id: int) -> Tuple[int, int, int]:
+    """Return (total, learned, practice) for a language in a single query."""
+    total, learned, practice = db.query(
+        func.count(Term.id_vocabulary),
+        func.coalesce(func.sum(case((Term.learned == True, 1), else_=0)), 0),
+        func.coalesce(func.sum(case((Term.correct_counter < LEARNED_THRESHOLD, 1), else_=0)), 0),
+    ).filter(Term.language_id == language_id).one()
+    return int(total), int(learned), int(practice)
+
+
+def rebuild_language_stats(db: Session, language_id: int) -> LanguageStats:
+    """Recompute the counters row for a language from `terms`. Does not commit."""
+    total, learned, practice = aggregate_stats(db, language_id)
+    row = db.get(LanguageStats, language_id)
+    if row is None:
+        row = LanguageStats(language_id=language_id)
+        db.add(row)
+    row.total_terms, row.learned_terms, row.practice_terms = total, learned, practice
+    db.flush()
+    return row
+
+
+def counter_stats(db: Session, language_id: int) -> Tuple[int, int, int]:
+    """Return (total, learned, practice) from the counters table, building the row on first use."""
+    row = db.get(LanguageStats, language_id)
+    if row is None:
+        try:
+            row = rebuild_language_stats(db, language_id)
+            db.commit()
+        except IntegrityError:
+            # Another request built the row first
+            db.rollback()
+            row = db.get(LanguageStats, language_id)
+    return row.total_terms, row.learned_terms, row.practice_terms
+
+
+def apply_stats_delta(db: Session, language_id: int, learned_delta: int = 0, practice_delta: int = 0) -> None:
+    """Adjust the counters row in the caller's transaction. Does not commit."""
+    if not learned_delta and not practice_delta:
+        return
+    db.execute(
+        update(LanguageStats)
+        .where(LanguageStats.language_id == language_id)
+        .values(
+            learned_terms=LanguageStats.learned_terms + learned_delta,
+            practice_terms=LanguageStats.practice_terms + practice_delta,
+        )
+    )
+
+
+def bump_language_version(db: Session, language_id: int, now: Optional[datetime] = None) -> None:
+    """Advance a language's data version in the caller's transaction. Does not commit.
+
+    Other processes' version caches are told on commit.
+    """
+    now = now or utcnow()
+    insert = upsert_insert(db)(LanguageVersion).values(language_id=language_id, version=1, updated_at=now)
+    db.execute(
+        insert.on_conflict_do_update(
+            index_elements=["language_id"],
+            set_={"version": LanguageVersion.version + 1, "updated_at": now},
+        ).execution_options(synchronize_session=False)
+    )
+    notify_invalidation(db, VERSIONS)
+
+
+def threshold_delta(crossed_threshold: bool, was_learned: Optional[bool]) -> Tuple[int, int]:
+    """Return the (learned, practice) counter deltas for a term's correct answers.
+
+    Only the update that takes a term across the learned threshold moves the
+    counters: it leaves the practice pool, and joins the learned pool unless
+    it was already marked learned.
+    """
+    if not crossed_threshold:
+        return 0, 0
+    return (0 if was_learned else 1), -1
+
+
+def user_stats(db: Session, user_id: str, language_id: int, total: Optional[int] = None) -> Tuple[int, int, int]:
+    """Return (total, learned, practice) for one user; `total` is counted when not given."""
+    if total is None:
+        total = db.query(func.count(Term.id_vocabulary)).filter(Term.language_id == language_id).scalar()
+    learned = db.query(func.count()).select_from(UserTermProgress).filter(
+        UserTermProgress.user_id == user_id,
+        UserTermProgress.language_id == language_id,
+        UserTermProgress.learned == True,
+    ).scalar()
+    # A user's terms only become learned by crossing the threshold, so the rest are in practice
+    return total, learned, total - learned
+
+
+def stats_payload(total: int, learned: int, practice: int) -> dict:
+    return {
+        "total_terms": total,
+        "learned_terms": learned,
+        "practice_terms": practice,
+        "progress_percentage": round((learned / total * 100) if total > 0 else 0, 1),
+    }
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+Incremental re-sync of a language's terms from the master spreadsheet.
+
+Instead of reloading everything, ``sync_terms`` diffs the source rows against
+what is stored: every term keeps ``source_hash``, a digest of its content
+columns (migrate_data.source_hash), and rows are matched on the
+(english_term, target_language_term) pair.
+
+- a pair only in the source is inserted, with the sheet's learned flag and counter
+- a pair whose hash differs is updated (content columns only)
+- a pair only in the database is deleted, together with its user progress
+- a deleted and an inserted pair that share one side, when that side matches
+  nothing else, is taken as an edited translation: the term is updated in
+  place so its progress survives
+
+Progress (learned, correct_counter, the schedule and user_term_progress) is
+never overwritten. Terms imported before syncing existed have no hash; their
+stored content is hashed on the first sync, so only real edits are written.
+All changes are applied with executemany statements in one transaction.
+
+    python sync.py --input arabic-vocabulary-master-list.xlsx
+    python sync.py --input output.csv --dry-run
+"""
+
+import argparse
+import csv
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import bindparam, delete, insert, select, update
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+from cache import invalidate_all, notify_invalidation
+from database import AnswerEvent, Language, Term, UserTermProgress
+from migrate_data import TEXT_COLUMNS, add_answer_keys, iter_source_terms, source_hash
+from stats import bump_language_version, rebuild_language_stats
+
+BATCH_SIZE = 5_000
+# Columns a sync may rewrite on an existing term
+CONTENT_COLUMNS = TEXT_COLUMNS + ["english_key", "target_language_key", "search_key", "source_hash"]
+
+Pair = Tuple[str, str]
+
+
+@dataclass
+class SyncReport:
+    rows_read: int = 0
+    inserted: int = 0
+    updated: int = 0
+    renamed: int = 0
+    deleted: int = 0
+    unchanged: int = 0
+    timings: Dict[str, float] = field(default_factory=dict)
+
+    def __str__(self):
+        timings = ", ".join(f"{name}={seconds:.3f}s" for name, seconds in self.timings.items())
+        return (
+            f"read={self.rows_read} inserted={self.inserted} updated={self.updated} renamed={self.renamed} "
+            f"deleted={self.deleted} unchanged={self.unchanged} ({timings})"
+        )
+
+
+@dataclass
+class SyncPlan:
+    inserts: List[dict] = field(default_factory=list)
+    # term id -> new content; renames also change the pair
+    updates: Dict[int, dict] = field(default_factory=dict)
+    deletes: List[int] = field(default_factory=list)
+    # unchanged terms stored without a hash: term id -> hash to record
+    hashes: Dict[int, str] = field(default_factory=dict)
+    renamed: int = 0
+    unchanged: int = 0
+
+
+def _source_pairs(rows: Iterable[Sequence[str]], report: SyncReport) -> Dict[Pair, dict]:
+    source: Dict[Pair, dict] = {}
+    # Grading keys are computed in apply_plan, only for the rows that get written
+    for term in iter_source_terms(rows, answer_keys=False):
+        report.rows_read += 1
+        pair = (term["english_term"], term["target_language_term"])
+        if None in pair:
+            continue
+        # Like the importers, the first row of a repeated pair wins
+        source.setdefault(pair, term)
+    return source
+
+
+def _stored_hashes(conn: Connection, language_id: int) -> Dict[Pair, Tuple[int, Optional[str], bool]]:
+    """Map each stored pair to (term id, content hash, whether the hash is stored)."""
+    stored, unhashed = {}, []
+    rows = conn.execute(
+        select(Term.id_vocabulary, Term.english_term, Term.target_language_term, Term.source_hash)
+        .where(Term.language_id == language_id)
+    )
+    for term_id, english, target, digest in rows:
+        stored[(english, target)] = (term_id, digest, digest is not None)
+        if digest is None:
+            unhashed.append(term_id)
+    # Terms imported before sync existed: hash what is stored so unchanged rows are skipped
+    content = [getattr(Term, name) for name in TEXT_COLUMNS]
+    for start in range(0, len(unhashed), BATCH_SIZE):
+        ids = unhashed[start:start + BATCH_SIZE]
+        for row in conn.execute(select(Term.id_vocabulary, *content).where(Term.id_vocabulary.in_(ids))):
+            term = dict(zip(TEXT_COLUMNS, row[1:]))
+            stored[(term["english_term"], term["target_language_term"])] = (row[0], source_hash(term), False)
+    return stored
+
+
+def _match_renames(gone: Dict[Pair, int], new: Dict[Pair, dict], plan: SyncPlan) -> None:
+    """Pair deleted and inserted rows that share an unambiguous english or target side."""
+    for side in (0, 1):
+        gone_by_side, new_by_side = defaultdict(list), defaultdict(list)
+        for pair in gone:
+            gone_by_side[pair[side]].append(pair)
+        for pair in new:
+            new_by_side[pair[side]].append(pair)
+        for value, old_pairs in gone_by_side.items():
+            new_pairs = new_by_side.get(value, [])
+            if len(old_pairs) == 1 and len(new_pairs) == 1:
+                plan.updates[gone.pop(old_pairs[0])] = new.pop(new_pairs[0])
+                plan.renamed += 1
+
+
+def plan_sync(source: Dict[Pair, dict], stored: Dict[Pair, Tuple[int, Optional[str], bool]]) -> SyncPlan:
+    """Diff source rows against the stored hashes by pair."""
+    plan = SyncPlan()
+    gone: Dict[Pair, int] = {}
+    for pair, (term_id, digest, hash_stored) in stored.items():
+        term = source.get(pair)
+        if term is None:
+            gone[pair] = term_id
+        elif term["source_hash"] != digest:
+            plan.updates[term_id] = term
+        else:
+            plan.unchanged += 1
+            if not hash_stored:
+                plan.hashes[term_id] = digest
+    new = {pair: term for pair, term in source.items() if pair not in stored}
+    _match_renames(gone, new, plan)
+    plan.inserts = list(new.values())
+    plan.deletes = list(gone.values())
+    return plan
+
+
+def _batches(items: List, size: int = BATCH_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def apply_plan(conn: Connection, language_id: int, plan: SyncPlan) -> None:
+    """Write `plan` on `conn`; the caller owns the transaction."""
+    if plan.inserts:
+        statement = insert(Term.__table__)
+        for batch in _batches(plan.inserts):
+            conn.execute(statement, [{"language_id": language_id, **add_answer_keys(term)} for term in batch])
+    if plan.updates:
+        terms = Term.__table__
+        statement = (
+            update(terms)
+            .where(terms.c.id_vocabulary == bindparam("term_id"))
+            .values({name: bindparam(f"new_{name}") for name in CONTENT_COLUMNS})
+        )
+        rows = []
+        for term_id, term in plan.updates.items():
+            add_answer_keys(term)
+            rows.append({"term_id": term_id, **{f"new_{name}": term[name] for name in CONTENT_COLUMNS}})
+        for batch in _batches(rows):
+            conn.execute(statement, batch)
+    if plan.hashes:
+        terms = Term.__table__
+        statement = update(terms).where(terms.c.id_vocabulary == bindparam("term_id")).values(
+            source_hash=bindparam("digest")
+        )
+        for batch in _batches(list(plan.hashes.items())):
+            conn.execute(statement, [{"term_id": term_id, "digest": digest} for term_id, digest in batch])
+    for ids in _batches(plan.deletes):
+        # Explicit rather than relying on ON DELETE CASCADE, which SQLite only honours with foreign keys on
+        conn.execute(delete(UserTermProgress.__table__).where(UserTermProgress.term_id.in_(ids)))
+        conn.execute(delete(AnswerEvent.__table__).where(AnswerEvent.term_id.in_(ids)))
+        conn.execute(delete(Term.__table__).where(Term.id_vocabulary.in_(ids)))
+
+
+def sync_terms(engine: Engine, rows: Iterable[Sequence[str]], language_id: int, dry_run: bool = False) -> SyncReport:
+    """Bring `language_id`'s terms in line with `rows` (a header row, then data rows)."""
+    report = SyncReport()
+    started = time.perf_counter()
+    source = _source_pairs(rows, report)
+    report.timings["read"] = time.perf_counter() - started
+
+    step = time.perf_counter()
+    with engine.begin() as conn:
+        plan = plan_sync(source, _stored_hashes(conn, language_id))
+        report.timings["diff"] = time.perf_counter() - step
+        report.inserted, report.deleted = len(plan.inserts), len(plan.deletes)
+        report.renamed = plan.renamed
+        report.updated = len(plan.updates) - plan.renamed
+        report.unchanged = plan.unchanged
+
+        step = time.perf_counter()
+        if not dry_run:
+            apply_plan(conn, language_id, plan)
+            if plan.inserts or plan.deletes or plan.updates:
+                db = Session(bind=conn)
+                try:
+                    if plan.inserts or plan.deletes:
+                        rebuild_language_stats(db, language_id)
+                    bump_language_version(db, language_id)
+                    notify_invalidation(db)
+                    db.flush()
+                finally:
+                    db.close()
+        report.timings["apply"] = time.perf_counter() - step
+    if not dry_run:
+        invalidate_all()
+    report.timings["total"] = time.perf_counter() - started
+    return report
+
+
+def iter_file_rows(path: str, sheet: Optional[str] = None) -> Iterable[Sequence[str]]:
+    """Header and data rows of an .xlsx workbook (streamed with openpyxl) or a CSV file."""
+    if path.lower().endswith((".xlsx", ".xlsm")):
+        from spreadsheet import iter_sheet_rows
+        yield from iter_sheet_rows(path, sheet)
+        return
+    with open(path, newline="", encoding="utf-8") as fh:
+        yield from csv.reader(fh)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--input", default="arabic-vocabulary-master-list.xlsx", help="Source .xlsx workbook or CSV")
+    parser.add_argument("--sheet", default=None, help="Worksheet name (default: the active sheet)")
+    parser.add_argument("--language-code", default="ar")
+    parser.add_argument("--language-name", default="Arabic", help="Used when the language does not exist yet")
+    parser.add_argument("--dry-run", action="store_true", help="Report the changes without writing them")
+    args = parser.parse_args()
+
+    from dotenv import load_dotenv
+    from db_engine import create_db_engine
+    from migrations import upgrade
+
+    load_dotenv()
+    engine = create_db_engine()
+    with engine.begin() as conn:
+        upgrade(conn)
+        language_id = conn.execute(select(Language.id).where(Language.code == args.language_code)).scalar()
+        if language_id is None:
+            language_id = conn.execute(
+                insert(Language).values(code=args.language_code, name=args.language_name).returning(Language.id)
+            ).scalar_one()
+
+    report = sync_terms(engine, iter_file_rows(args.input, args.sheet), language_id, dry_run=args.dry_run)
+    print(f"{'Dry run' if args.dry_run else 'Sync finished'}: {report}")
+
+
+if __name__ == "__main__":
+    main()
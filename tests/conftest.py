@@ -1,8 +1,11 @@
 import sys
+from contextlib import contextmanager
 from pathlib import Path
 import pytest
-from sqlalchemy import create_engine
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import async_sessionmaker
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
 
 # Ensure project root is on sys.path for imports like `import database`
 PROJECT_ROOT = Path(__file__).resolve().parents[1]
@@ -10,21 +13,28 @@ if str(PROJECT_ROOT) not in sys.path:
     sys.path.insert(0, str(PROJECT_ROOT))
 
 import database  # now resolvable
+from db_engine import PoolSettings, create_db_engine
 from main import create_app
 from fastapi.testclient import TestClient
 
 
 @pytest.fixture(scope="session")
 def test_sessionmaker():
-    # Dedicated SQLite engine for tests; allow cross-thread usage
-    test_engine = create_engine(
-        "sqlite:///./test_db.sqlite3", connect_args={"check_same_thread": False}
-    )
+    # Dedicated SQLite engine for tests, built by the app's engine factory with default pool settings
+    test_engine = create_db_engine("sqlite:///./test_db.sqlite3", settings=PoolSettings())
     TestSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=test_engine)
     yield TestSessionLocal
     database.Base.metadata.drop_all(bind=test_engine)
 
 
+@pytest.fixture(scope="session")
+def async_test_sessionmaker():
+    # Same SQLite file through aiosqlite. NullPool because each TestClient runs
+    # its own event loop and aiosqlite connections are tied to the loop that opened them.
+    async_engine = create_db_engine("sqlite:///./test_db.sqlite3", async_mode=True, settings=PoolSettings(), poolclass=NullPool)
+    yield async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+
 @pytest.fixture(autouse=True)
 def seed_minimal_data(test_sessionmaker):
     """Seed one language and one term before each test using the test session."""
@@ -52,11 +62,71 @@ def seed_minimal_data(test_sessionmaker):
         db.close()
 
 
-@pytest.fixture
-def client(seed_minimal_data, test_sessionmaker):
-    # Build app with DI using the test sessionmaker
+@pytest.fixture(params=["sync", "async"])
+def client(request, seed_minimal_data, test_sessionmaker, async_test_sessionmaker):
+    # Build app with DI using the test sessionmaker; every API test runs against both DB modes
     from fastapi.testclient import TestClient
-    app = create_app(test_sessionmaker)
+    if request.param == "async":
+        app = create_app(async_test_sessionmaker)
+    else:
+        app = create_app(test_sessionmaker)
     return TestClient(app)
 
 
+
+
+@pytest.fixture
+def arabic_id(seed_minimal_data, test_sessionmaker):
+    """Id of the language seeded above."""
+    db = test_sessionmaker()
+    try:
+        return db.query(database.Language).filter_by(code="ar").one().id
+    finally:
+        db.close()
+
+
+@pytest.fixture
+def add_terms(arabic_id, test_sessionmaker):
+    """Return `add(rows, **columns)`, adding (english, correct_counter, learned) rows to the seeded language.
+
+    The target-language term repeats the English one; `columns` sets other
+    columns on every row. Returns the language id.
+    """
+    def add(rows, **columns):
+        db = test_sessionmaker()
+        try:
+            for english, counter, learned in rows:
+                db.add(database.Term(
+                    language_id=arabic_id,
+                    english_term=english,
+                    target_language_term=english,
+                    correct_counter=counter,
+                    learned=learned,
+                    **columns,
+                ))
+            db.commit()
+            return arabic_id
+        finally:
+            db.close()
+    return add
+
+
+@contextmanager
+def _captured_statements(engine):
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE", "INSERT")):
+            statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+
+
+@pytest.fixture
+def captured_statements():
+    """`with captured_statements(engine) as statements:` collects the (statement, parameters) queries sent."""
+    return _captured_statements
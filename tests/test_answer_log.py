@@ -0,0 +1,152 @@
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+
+import answer_log
+import database
+from answer_log import claim_answers
+from db_engine import PoolSettings, create_db_engine
+from main import create_app
+
+# Long enough that nothing is folded until the client shuts the app down
+NO_TIMED_FLUSH = 3600.0
+
+
+def _term(test_sessionmaker):
+    db = test_sessionmaker()
+    try:
+        return db.query(database.Term).one()
+    finally:
+        db.close()
+
+
+def _events(test_sessionmaker):
+    db = test_sessionmaker()
+    try:
+        return [(event.correct, event.folded) for event in db.query(database.AnswerEvent).order_by(database.AnswerEvent.id)]
+    finally:
+        db.close()
+
+
+@pytest.fixture
+def fk_sessionmaker(test_sessionmaker):
+    """The test database with SQLite's foreign keys enforced, as Postgres does."""
+    engine = create_db_engine("sqlite:///./test_db.sqlite3", settings=PoolSettings())
+    event.listen(engine, "connect", lambda conn, record: conn.execute("PRAGMA foreign_keys=ON"))
+    yield sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    engine.dispose()
+
+
+def _answer(client, durability, user_answer="hello"):
+    term_id = client.get("/flashcards/random", params={"language_code": "ar"}).json()["id_vocabulary"]
+    return client.post(
+        "/flashcards/answer",
+        params={"durability": durability},
+        json={"term_id": term_id, "user_answer": user_answer, "answer_type": "english"},
+    )
+
+
+@pytest.mark.parametrize("mode", ["sync", "async"])
+def test_enqueued_answers_are_folded_by_the_writer(mode, test_sessionmaker, async_test_sessionmaker):
+    session_maker = async_test_sessionmaker if mode == "async" else test_sessionmaker
+    with TestClient(create_app(session_maker, flush_interval=NO_TIMED_FLUSH)) as client:
+        r = _answer(client, "enqueue")
+        assert r.status_code == 200 and r.json()["correct"] is True
+        _answer(client, "enqueue", user_answer="nope")
+        # Graded at once, counted later
+        assert _term(test_sessionmaker).correct_counter == 0
+        assert client.get("/answer-log/stats").json()["queued"] == 2
+    # Shutting down folds the queue
+    assert _term(test_sessionmaker).correct_counter == 1
+    assert _events(test_sessionmaker) == [(True, True), (False, True)]
+
+
+def test_committed_answers_wait_in_the_log(test_sessionmaker):
+    # No lifespan, so no writer: the answers stay in answer_events
+    client = TestClient(create_app(test_sessionmaker))
+    for _ in range(3):
+        assert _answer(client, "commit").status_code == 200
+    assert _events(test_sessionmaker) == [(True, False)] * 3
+    assert _term(test_sessionmaker).correct_counter == 0
+
+    with TestClient(create_app(test_sessionmaker, stats_counters=True, flush_interval=NO_TIMED_FLUSH)) as client:
+        pass
+    term = _term(test_sessionmaker)
+    assert (term.correct_counter, term.learned) == (3, True)
+    assert _events(test_sessionmaker) == [(True, True)] * 3
+    r = client.get("/flashcards/stats", params={"language_code": "ar"})
+    assert r.json()["learned_terms"] == 1
+
+
+def test_batch_answers_follow_the_durability(test_sessionmaker):
+    term_id = _term(test_sessionmaker).id_vocabulary
+    answer = {"term_id": term_id, "user_answer": "hello", "answer_type": "english"}
+    with TestClient(create_app(test_sessionmaker, answer_durability="enqueue", flush_interval=NO_TIMED_FLUSH)) as client:
+        r = client.post("/flashcards/answers/batch", json=[answer] * 2, headers={"X-User-Id": "alice"})
+        assert [item["correct"] for item in r.json()] == [True, True]
+    db = test_sessionmaker()
+    try:
+        progress = db.query(database.UserTermProgress).one()
+        assert (progress.user_id, progress.correct_counter) == ("alice", 2)
+    finally:
+        db.close()
+    assert _term(test_sessionmaker).correct_counter == 0
+
+
+def test_claims_never_return_an_event_twice(client, test_sessionmaker):
+    for _ in range(3):
+        _answer(client, "commit")
+    db = test_sessionmaker()
+    try:
+        assert len(claim_answers(db, 2)) == 2
+        assert len(claim_answers(db, 2)) == 1
+        assert claim_answers(db, 2) == []
+    finally:
+        db.close()
+
+
+def test_unknown_durability_is_rejected(client):
+    assert _answer(client, "eventually").status_code == 400
+    with pytest.raises(ValueError):
+        create_app(None, answer_durability="eventually")
+
+
+@pytest.mark.parametrize("race", [False, True])
+def test_answers_to_deleted_terms_do_not_block_the_queue(race, fk_sessionmaker, add_terms, monkeypatch):
+    if race:
+        # The term is deleted after the check, so the batch's insert breaks the foreign key
+        monkeypatch.setattr(answer_log, "existing_answers", lambda db, answers: list(answers))
+    add_terms([("book", 0, False)])
+    app = create_app(fk_sessionmaker, answer_durability="enqueue", flush_interval=NO_TIMED_FLUSH)
+    with TestClient(app) as client:
+        db = fk_sessionmaker()
+        try:
+            book = db.query(database.Term).filter_by(english_term="book").one()
+            answer = {"term_id": book.id_vocabulary, "user_answer": "book", "answer_type": "english"}
+            assert client.post("/flashcards/answer", json=answer).json()["correct"] is True
+            # A sync deletes the term while its answer is queued
+            db.delete(book)
+            db.commit()
+        finally:
+            db.close()
+        _answer(client, "enqueue")
+    stats = app.state.answer_writer.stats()
+    assert (stats["queued"], stats["folded"], stats["dropped"]) == (0, 1, 1)
+    assert stats["failures"] == (1 if race else 0)
+    assert _term(fk_sessionmaker).correct_counter == 1
+
+
+def test_writer_waits_for_the_first_write_behind_answer(test_sessionmaker, captured_statements):
+    with TestClient(create_app(test_sessionmaker, flush_interval=0.01)) as client:
+        # Immediate answers by default: nothing polls the database while idle
+        with captured_statements(test_sessionmaker.kw["bind"]) as statements:
+            time.sleep(0.2)
+        assert statements == []
+        assert client.get("/answer-log/stats").json()["running"] is False
+
+        _answer(client, "enqueue")
+        assert client.get("/answer-log/stats").json()["running"] is True
+    assert _term(test_sessionmaker).correct_counter == 1
@@ -40,3 +40,84 @@ def test_random_flashcard_learned_only_when_none_available_returns_404(client):
     assert r.status_code == 404
     assert r.json().get("detail") in {"No flashcards available", "Language not found"}
 
+
+
+def test_correct_answer_is_persisted(client):
+    card = client.get("/flashcards/random", params={"language_code": "ar"}).json()
+    client.post(
+        "/flashcards/answer",
+        json={"term_id": card["id_vocabulary"], "user_answer": "hello", "answer_type": "english"},
+    )
+    r = client.get("/flashcards/random", params={"language_code": "ar"})
+    assert r.json()["correct_counter"] == card["correct_counter"] + 1
+
+
+def test_batch_answers_grade_in_order_and_persist(client):
+    card = client.get("/flashcards/random", params={"language_code": "ar"}).json()
+    term_id = card["id_vocabulary"]
+    r = client.post(
+        "/flashcards/answers/batch",
+        json=[
+            {"term_id": term_id, "user_answer": "hello", "answer_type": "english"},
+            {"term_id": term_id, "user_answer": "bye", "answer_type": "english"},
+            {"term_id": term_id, "user_answer": " مرحبا ", "answer_type": "arabic"},
+        ],
+    )
+    assert r.status_code == 200
+    assert [item["correct"] for item in r.json()] == [True, False, True]
+
+    after = client.get("/flashcards/random", params={"language_code": "ar"}).json()
+    assert after["correct_counter"] == 2
+
+
+def test_batch_answers_with_unknown_term_writes_nothing(client):
+    card = client.get("/flashcards/random", params={"language_code": "ar"}).json()
+    r = client.post(
+        "/flashcards/answers/batch",
+        json=[
+            {"term_id": card["id_vocabulary"], "user_answer": "hello", "answer_type": "english"},
+            {"term_id": 999999, "user_answer": "x", "answer_type": "english"},
+        ],
+    )
+    assert r.status_code == 404
+    after = client.get("/flashcards/random", params={"language_code": "ar"}).json()
+    assert after["correct_counter"] == card["correct_counter"]
+
+
+def test_batch_answers_reject_invalid_answer_type(client):
+    r = client.post(
+        "/flashcards/answers/batch",
+        json=[{"term_id": 1, "user_answer": "x", "answer_type": "klingon"}],
+    )
+    assert r.status_code == 400
+
+
+def test_queue_returns_distinct_cards_with_random_filters(client, test_sessionmaker):
+    import database
+
+    db = test_sessionmaker()
+    try:
+        lang = db.query(database.Language).filter_by(code="ar").one()
+        for i in range(30):
+            db.add(database.Term(language_id=lang.id, english_term=f"w{i}", target_language_term=f"ك{i}", correct_counter=i % 4))
+        db.commit()
+    finally:
+        db.close()
+
+    r = client.get("/flashcards/queue", params={"language_code": "ar", "n": 10})
+    assert r.status_code == 200
+    cards = r.json()
+    assert len(cards) == 10
+    assert len({card["id_vocabulary"] for card in cards}) == 10
+    assert all(card["correct_counter"] < 3 for card in cards)
+
+    hello = next(c for c in client.get("/flashcards/queue", params={"n": 100}).json() if c["english_term"] == "hello")
+    everything = client.get("/flashcards/queue", params={"n": 100, "exclude_id": hello["id_vocabulary"]}).json()
+    # 1 seeded + 23 of the 30 added terms are below the learned threshold
+    assert len(everything) == 23
+    assert hello["id_vocabulary"] not in {card["id_vocabulary"] for card in everything}
+
+
+def test_queue_unknown_language_returns_404(client):
+    r = client.get("/flashcards/queue", params={"language_code": "xx"})
+    assert r.status_code == 404
@@ -0,0 +1,128 @@
+import os
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import sessionmaker
+
+import database
+from cache import VERSIONS, MetadataCache, VersionCache, invalidate_all, invalidate_scope, notify_invalidation
+from db_engine import create_db_engine
+from main import create_app
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_metadata_cache_hits_until_ttl_expires(test_sessionmaker):
+    clock = FakeClock()
+    cache = MetadataCache(ttl=10, clock=clock)
+    db = test_sessionmaker()
+    try:
+        assert cache.language_id(db, "ar") is not None
+        assert cache.language_id(db, "xx") is None
+        assert [lang["code"] for lang in cache.languages(db)] == ["ar"]
+        assert (cache.hits, cache.misses) == (2, 1)
+
+        clock.now = 11
+        cache.language_id(db, "ar")
+        assert cache.misses == 2
+    finally:
+        db.close()
+
+
+def test_invalidate_all_picks_up_new_languages(test_sessionmaker):
+    cache = MetadataCache(ttl=300)
+    db = test_sessionmaker()
+    try:
+        assert cache.language_id(db, "fr") is None
+        db.add(database.Language(code="fr", name="French"))
+        db.commit()
+        assert cache.language_id(db, "fr") is None
+
+        invalidate_all()
+        assert cache.language_id(db, "fr") is not None
+        assert cache.stats()["invalidations"] == 1
+    finally:
+        db.close()
+
+
+def test_cache_stats_endpoint_counts_hits(client):
+    client.get("/flashcards/random", params={"language_code": "ar"})
+    client.get("/flashcards/stats", params={"language_code": "ar"})
+    client.get("/languages")
+    stats = client.get("/cache/stats").json()["metadata"]
+    assert stats["misses"] == 1
+    assert stats["hits"] == 2
+
+
+def test_version_notifications_keep_the_metadata_cache(test_sessionmaker):
+    metadata, versions = MetadataCache(ttl=300), VersionCache(ttl=300)
+    db = test_sessionmaker()
+    try:
+        metadata.languages(db)
+        versions.version(db, 1)
+        invalidate_scope(VERSIONS)
+        assert (metadata.stats()["invalidations"], versions.stats()["invalidations"]) == (0, 1)
+        invalidate_scope("all")
+        assert (metadata.stats()["invalidations"], versions.stats()["invalidations"]) == (1, 2)
+    finally:
+        db.close()
+
+
+def test_notifications_are_skipped_off_postgres(test_sessionmaker):
+    db = test_sessionmaker()
+    try:
+        notify_invalidation(db)
+        db.commit()
+    finally:
+        db.close()
+    with TestClient(create_app(test_sessionmaker)) as client:
+        assert client.get("/cache/stats").json()["listener"]["enabled"] is False
+
+
+@pytest.mark.integration
+def test_workers_see_each_others_answers_at_once():
+    database_url = os.getenv("DATABASE_URL", "")
+    if not database_url.startswith("postgresql"):
+        pytest.skip("needs a Postgres DATABASE_URL for LISTEN/NOTIFY")
+    engine = create_db_engine(database_url)
+    database.Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    try:
+        # Reused across runs, like the integration test's language
+        language = db.query(database.Language).filter_by(code="zz-cache").first()
+        if not language:
+            language = database.Language(code="zz-cache", name="Cache test")
+            db.add(language)
+            db.flush()
+            db.add(database.Term(language_id=language.id, english_term="hello", target_language_term="hola"))
+        term = db.query(database.Term).filter_by(language_id=language.id).one()
+        term.correct_counter, term.learned = 0, False
+        db.commit()
+        term_id = term.id_vocabulary
+    finally:
+        db.close()
+
+    # Two apps stand in for two workers; TTLs long enough that only a notification refreshes them
+    def worker():
+        return create_app(sessionmaker(bind=create_db_engine(database_url)), stats_counters=True, cache_ttl=3600, version_ttl=3600)
+
+    params = {"language_code": "zz-cache"}
+    with TestClient(worker()) as a, TestClient(worker()) as b:
+        etag = b.get("/flashcards/stats", params=params).headers["etag"]
+        for _ in range(5):
+            a.post("/flashcards/answer", json={"term_id": term_id, "user_answer": "hello", "answer_type": "english"})
+        deadline = time.monotonic() + 2
+        while b.get("/flashcards/stats", params=params).headers["etag"] == etag and time.monotonic() < deadline:
+            time.sleep(0.01)
+        r = b.get("/flashcards/stats", params=params)
+        assert r.headers["etag"] != etag
+        assert r.json()["learned_terms"] == 1
+        assert b.get("/cache/stats").json()["listener"]["received"] >= 1
+    engine.dispose()
@@ -0,0 +1,41 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi.testclient import TestClient
+
+import database
+from main import create_app
+
+THREADS = 8
+ANSWERS = 80
+
+
+@pytest.mark.parametrize("mode", ["sync", "async"])
+def test_parallel_correct_answers_are_all_counted(mode, test_sessionmaker, async_test_sessionmaker):
+    session_maker = async_test_sessionmaker if mode == "async" else test_sessionmaker
+    client = TestClient(create_app(session_maker, stats_counters=True))
+    term_id = client.get("/flashcards/random", params={"language_code": "ar"}).json()["id_vocabulary"]
+    # Build the counters row up front so every answer applies a delta to it
+    client.get("/flashcards/stats", params={"language_code": "ar"})
+
+    def answer(_):
+        return client.post(
+            "/flashcards/answer",
+            json={"term_id": term_id, "user_answer": "hello", "answer_type": "english"},
+        ).status_code
+
+    with ThreadPoolExecutor(max_workers=THREADS) as pool:
+        statuses = list(pool.map(answer, range(ANSWERS)))
+    assert statuses == [200] * ANSWERS
+
+    db = test_sessionmaker()
+    try:
+        term = db.get(database.Term, term_id)
+        assert term.correct_counter == ANSWERS
+        assert term.learned is True
+    finally:
+        db.close()
+
+    stats = client.get("/flashcards/stats", params={"language_code": "ar"}).json()
+    assert stats["learned_terms"] == 1
+    assert stats["practice_terms"] == 0
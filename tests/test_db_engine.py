@@ -0,0 +1,74 @@
+import pytest
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import NullPool
+
+from db_engine import PoolSettings, TimedQueuePool, _connect_args, create_db_engine, pool_stats, resolve_database_url
+
+
+def test_pool_settings_from_env(monkeypatch):
+    monkeypatch.setenv("DB_POOL_SIZE", "20")
+    monkeypatch.setenv("DB_MAX_OVERFLOW", "0")
+    monkeypatch.setenv("DB_POOL_PRE_PING", "false")
+    monkeypatch.setenv("DB_STATEMENT_TIMEOUT_MS", "5000")
+    monkeypatch.setenv("DB_EXTERNAL_POOLER", "1")
+    settings = PoolSettings.from_env()
+    assert (settings.pool_size, settings.max_overflow, settings.pool_pre_ping) == (20, 0, False)
+    assert (settings.statement_timeout_ms, settings.external_pooler) == (5000, True)
+    assert settings.pool_recycle == PoolSettings().pool_recycle
+
+
+def test_pool_records_checkout_waits_and_saturation(tmp_path):
+    engine = create_db_engine(f"sqlite:///{tmp_path}/pool.db", settings=PoolSettings(pool_size=1, max_overflow=0, pool_timeout=0.05))
+    assert isinstance(engine.pool, TimedQueuePool)
+    held = engine.connect()
+    try:
+        assert pool_stats(engine)["saturation"] == 1.0
+        with pytest.raises(PoolTimeoutError):
+            engine.connect()
+    finally:
+        held.close()
+    with engine.connect():
+        pass
+
+    stats = pool_stats(engine)
+    assert (stats["checkouts"], stats["timeouts"], stats["saturated_checkouts"]) == (2, 1, 1)
+    assert stats["wait_ms_max"] >= 50
+    assert stats["checked_out"] == 0
+
+    # Metrics outlive the pool being recreated by dispose()
+    engine.dispose()
+    assert pool_stats(engine)["checkouts"] == 2
+
+
+def test_external_pooler_disables_app_pool_and_prepared_statements():
+    settings = PoolSettings(external_pooler=True)
+    engine = create_db_engine("postgresql+psycopg2://u:p@pooler/db", async_mode=True, settings=settings)
+    assert isinstance(engine.pool, NullPool)
+    args = _connect_args(engine.url, settings)
+    assert args["statement_cache_size"] == 0
+    assert engine.url.query["prepared_statement_cache_size"] == "0"
+
+    with pytest.raises(ValueError):
+        create_db_engine("postgresql+psycopg2://u:p@pooler/db", settings=PoolSettings(external_pooler=True, statement_timeout_ms=1000))
+
+
+def test_statement_timeout_connect_args():
+    settings = PoolSettings(statement_timeout_ms=1500)
+    assert _connect_args(resolve_database_url("postgresql+psycopg2://u:p@h/db"), settings) == {"options": "-c statement_timeout=1500"}
+    assert _connect_args(resolve_database_url("postgresql+asyncpg://u:p@h/db"), settings) == {
+        "server_settings": {"statement_timeout": "1500"}
+    }
+
+
+def test_resolve_database_url_prefers_argument_then_env(monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", "sqlite:///env.db")
+    assert resolve_database_url().database == "env.db"
+    assert resolve_database_url("sqlite:///arg.db").database == "arg.db"
+    monkeypatch.delenv("DATABASE_URL")
+    assert resolve_database_url().query["sslmode"] == "require"
+
+
+def test_pool_stats_endpoint(client):
+    client.get("/flashcards/random", params={"language_code": "ar"})
+    pool = client.get("/pool/stats").json()["pool"]
+    assert "pool_class" in pool
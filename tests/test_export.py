@@ -0,0 +1,122 @@
+import csv
+import gzip
+import io
+import json
+import sqlite3
+import zipfile
+from datetime import datetime, timedelta
+
+import database
+from sync import sync_terms
+
+QUOTED_NOTE = 'a, "quoted" note'
+
+
+def _words(start, count):
+    return [(f"word {i}", i % 4, i % 4 == 3) for i in range(start, start + count)]
+
+
+def _jsonl(response):
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def test_csv_export_round_trips_through_sync(client, test_sessionmaker, add_terms):
+    language_id = add_terms(_words(0, 5), notes=QUOTED_NOTE)
+    r = client.get("/export", params={"language_code": "ar", "format": "csv"})
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/csv")
+    assert r.headers["content-disposition"] == 'attachment; filename="flashcards-ar.csv"'
+    rows = list(csv.reader(io.StringIO(r.text)))
+    assert rows[0][:3] == ["Id", "Words (English)", "Word (Arabic script)"]
+    assert [row[1] for row in rows[1:]] == ["hello"] + [f"word {i}" for i in range(5)]
+    assert rows[2][6] == 'a, "quoted" note'
+    assert (rows[5][7], rows[5][8]) == ("1", "3")
+
+    # Everything in the export is already stored, so a sync from it changes nothing
+    report = sync_terms(test_sessionmaker.kw["bind"], rows, language_id)
+    assert (report.inserted, report.updated, report.deleted) == (0, 0, 0)
+
+
+def test_interrupted_export_resumes_from_the_last_id(client, add_terms):
+    add_terms(_words(0, 6))
+    full = client.get("/export", params={"format": "jsonl"})
+    records = _jsonl(full)
+    assert len(records) == 7
+    assert records[0]["english_term"] == "hello" and records[0]["due_at"] is None
+    max_id = full.headers["x-export-max-id"]
+    assert int(max_id) == records[-1]["id_vocabulary"]
+
+    # Terms added after the first response are left out of the resumed range
+    add_terms(_words(6, 2))
+    first = _jsonl(client.get("/export", params={"format": "jsonl", "max_id": records[2]["id_vocabulary"]}))
+    rest = client.get("/export", params={"format": "jsonl", "after_id": first[-1]["id_vocabulary"], "max_id": max_id})
+    assert first + _jsonl(rest) == records
+
+
+def test_resumed_csv_parts_join_into_the_full_export(client, add_terms):
+    add_terms(_words(0, 6), notes=QUOTED_NOTE)
+    full = client.get("/export", params={"format": "csv"})
+    max_id = full.headers["x-export-max-id"]
+    rows = list(csv.reader(io.StringIO(full.text)))
+    first = client.get("/export", params={"format": "csv", "max_id": rows[3][0]})
+    rest = client.get("/export", params={"format": "csv", "after_id": rows[3][0], "max_id": max_id})
+    assert not rest.text.startswith("Id,")
+    assert first.content + rest.content == full.content
+
+
+def test_export_is_gzipped_when_accepted(client, add_terms):
+    add_terms(_words(0, 3))
+    plain = client.get("/export", params={"format": "jsonl"}, headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+    with client.stream("GET", "/export", params={"format": "jsonl"}, headers={"Accept-Encoding": "gzip"}) as r:
+        assert r.headers["content-encoding"] == "gzip"
+        body = b"".join(r.iter_raw())
+    assert gzip.decompress(body) == plain.content
+
+
+def test_export_uses_the_users_progress(client):
+    client.post("/flashcards/answer", json={"term_id": 1, "user_answer": "hello", "answer_type": "english"}, headers={"X-User-Id": "alice"})
+    alice = _jsonl(client.get("/export", params={"format": "jsonl"}, headers={"X-User-Id": "alice"}))
+    shared = _jsonl(client.get("/export", params={"format": "jsonl"}))
+    assert (alice[0]["correct_counter"], shared[0]["correct_counter"]) == (1, 0)
+    assert _jsonl(client.get("/export", params={"format": "jsonl"}, headers={"X-User-Id": "bob"}))[0]["correct_counter"] == 0
+
+
+def test_apkg_export_is_an_anki_collection(client, test_sessionmaker, add_terms, tmp_path):
+    add_terms(_words(0, 4), notes=QUOTED_NOTE)
+    db = test_sessionmaker()
+    try:
+        scheduled = db.query(database.Term).filter_by(english_term="word 1").one()
+        scheduled.due_at = datetime.utcnow().replace(hour=12) + timedelta(days=3)
+        scheduled.interval_days = 3
+        db.commit()
+    finally:
+        db.close()
+
+    r = client.get("/export", params={"format": "apkg"}, headers={"Accept-Encoding": "gzip"})
+    assert r.status_code == 200 and "content-encoding" not in r.headers
+    with zipfile.ZipFile(io.BytesIO(r.content)) as package:
+        assert json.loads(package.read("media")) == {}
+        (tmp_path / "collection.anki2").write_bytes(package.read("collection.anki2"))
+    conn = sqlite3.connect(tmp_path / "collection.anki2")
+    try:
+        decks = json.loads(conn.execute("SELECT decks FROM col").fetchone()[0])
+        assert "Arabic" in [deck["name"] for deck in decks.values()]
+        notes = conn.execute("SELECT flds FROM notes ORDER BY id").fetchall()
+        assert len(notes) == 5
+        assert notes[0][0].split("\x1f")[:3] == ["hello", "مرحبا", "marḥaba"]
+        assert "a, &quot;quoted&quot; note" in notes[1][0]
+        cards = conn.execute("SELECT type, due, ivl FROM cards ORDER BY id").fetchall()
+        assert len(cards) == 10
+        # word 1 is scheduled in three days, word 3 is learned and due now, the rest are new
+        assert cards[4] == (2, 3, 3)
+        assert cards[8][:2] == (2, 0)
+        assert [card[0] for card in cards].count(0) == 6
+    finally:
+        conn.close()
+
+
+def test_export_rejects_bad_requests(client):
+    assert client.get("/export", params={"format": "xml"}).status_code == 400
+    assert client.get("/export", params={"language_code": "xx"}).status_code == 404
+    assert client.get("/export", params={"after_id": -1}).status_code == 422
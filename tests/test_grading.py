@@ -0,0 +1,54 @@
+import pytest
+
+import database
+from grading import answer_key
+
+
+@pytest.mark.parametrize("text, key", [
+    ("  Good   Morning ", "good morning"),
+    ("مَرْحَبًا", "مرحبا"),      # tashkeel
+    ("مرحبـــا", "مرحبا"),       # tatweel
+    ("أحمد إسم آخر", "احمد اسم اخر"),  # alef variants
+    ("على", "علي"),             # alef maksura
+    ("مكتبة", "مكتبه"),          # ta marbuta
+    ("ﻻ", "لا"),                # presentation form ligature
+])
+def test_answer_key_folds_spelling_variants(text, key):
+    assert answer_key(text) == key
+
+
+def test_answer_key_keeps_none():
+    assert answer_key(None) is None
+
+
+def test_term_keys_are_written_with_the_term(test_sessionmaker):
+    db = test_sessionmaker()
+    try:
+        term = db.query(database.Term).filter_by(english_term="hello").one()
+        assert (term.english_key, term.target_language_key) == ("hello", "مرحبا")
+
+        term.english_term = "Hi There"
+        db.commit()
+        db.refresh(term)
+        assert term.english_key == "hi there"
+    finally:
+        db.close()
+
+
+def test_arabic_answer_with_diacritics_is_correct(client):
+    card = client.get("/flashcards/random", params={"language_code": "ar"}).json()
+    r = client.post(
+        "/flashcards/answer",
+        json={"term_id": card["id_vocabulary"], "user_answer": "مَرْحَبـًا", "answer_type": "arabic"},
+    )
+    assert r.json()["correct"] is True
+    assert r.json()["correct_answer"] == "مرحبا"
+
+
+def test_wrong_arabic_answer_is_still_wrong(client):
+    card = client.get("/flashcards/random", params={"language_code": "ar"}).json()
+    r = client.post(
+        "/flashcards/answer",
+        json={"term_id": card["id_vocabulary"], "user_answer": "مرحب", "answer_type": "arabic"},
+    )
+    assert r.json()["correct"] is False
@@ -0,0 +1,154 @@
+from datetime import datetime
+
+from fastapi.testclient import TestClient
+
+import database
+from cache import invalidate_all
+from http_cache import ResponseCache, etag_matches, http_date
+from main import create_app
+from sampler import LEARNED_THRESHOLD
+from stats import bump_language_version
+from sync import sync_terms
+
+HEADER = ["Words (English)", "Word (Arabic script)", "Word (Arabic with Roman characters)", "Notes", "Learned", "Correct Counter"]
+
+
+def _hello_id(test_sessionmaker):
+    db = test_sessionmaker()
+    try:
+        return db.query(database.Term).filter_by(english_term="hello").one().id_vocabulary
+    finally:
+        db.close()
+
+
+def _answer_correctly(client, term_id, times=1, headers=None):
+    for _ in range(times):
+        r = client.post(
+            "/flashcards/answer",
+            json={"term_id": term_id, "user_answer": "hello", "answer_type": "english"},
+            headers=headers or {},
+        )
+        assert r.json()["correct"] is True
+
+
+def test_etag_matching():
+    assert etag_matches('W/"stats-1-2"', 'W/"stats-1-2"')
+    assert etag_matches('"other", "stats-1-2"', 'W/"stats-1-2"')
+    assert etag_matches("*", 'W/"stats-1-2"')
+    assert not etag_matches('W/"stats-1-3"', 'W/"stats-1-2"')
+
+
+def test_stats_not_modified_skips_the_database(test_sessionmaker, captured_statements):
+    client = TestClient(create_app(test_sessionmaker))
+    first = client.get("/flashcards/stats", params={"language_code": "ar"})
+    etag = first.headers["etag"]
+    assert first.headers["cache-control"] == "no-cache"
+
+    with captured_statements(test_sessionmaker.kw["bind"]) as statements:
+        r = client.get("/flashcards/stats", params={"language_code": "ar"}, headers={"If-None-Match": etag})
+    assert r.status_code == 304
+    assert r.content == b""
+    assert r.headers["etag"] == etag
+    assert statements == []
+
+
+def test_stats_etag_changes_when_a_term_is_learned(client, test_sessionmaker):
+    term_id = _hello_id(test_sessionmaker)
+    etag = client.get("/flashcards/stats", params={"language_code": "ar"}).headers["etag"]
+
+    # Answers below the threshold leave the shared stats, and so the ETag, as they were
+    _answer_correctly(client, term_id, LEARNED_THRESHOLD - 1)
+    r = client.get("/flashcards/stats", params={"language_code": "ar"}, headers={"If-None-Match": etag})
+    assert r.status_code == 304
+
+    _answer_correctly(client, term_id)
+    r = client.get("/flashcards/stats", params={"language_code": "ar"}, headers={"If-None-Match": etag})
+    assert r.status_code == 200
+    assert r.headers["etag"] != etag
+    assert r.json()["learned_terms"] == 1
+
+
+def test_stats_if_modified_since(client, test_sessionmaker):
+    # Never bumped: no timestamp to compare against
+    assert "last-modified" not in client.get("/flashcards/stats").headers
+
+    _answer_correctly(client, _hello_id(test_sessionmaker), LEARNED_THRESHOLD)
+    last_modified = client.get("/flashcards/stats").headers["last-modified"]
+    r = client.get("/flashcards/stats", headers={"If-Modified-Since": last_modified})
+    assert r.status_code == 304
+    r = client.get("/flashcards/stats", headers={"If-Modified-Since": http_date(datetime(2000, 1, 1))})
+    assert r.status_code == 200
+    # If-None-Match wins over If-Modified-Since
+    r = client.get("/flashcards/stats", headers={"If-None-Match": '"stale"', "If-Modified-Since": last_modified})
+    assert r.status_code == 200
+
+
+def test_user_stats_get_a_private_etag(client, test_sessionmaker):
+    headers = {"X-User-Id": "u1"}
+    first = client.get("/flashcards/stats", headers=headers)
+    assert first.headers["cache-control"] == "private, no-cache"
+    etag = first.headers["etag"]
+    assert client.get("/flashcards/stats", headers={**headers, "If-None-Match": etag}).status_code == 304
+
+    _answer_correctly(client, _hello_id(test_sessionmaker), LEARNED_THRESHOLD, headers=headers)
+    r = client.get("/flashcards/stats", headers={**headers, "If-None-Match": etag})
+    assert r.status_code == 200
+    assert r.json()["learned_terms"] == 1
+
+
+def test_languages_etag_follows_the_listing(client, test_sessionmaker):
+    first = client.get("/languages")
+    etag = first.headers["etag"]
+    assert [lang["code"] for lang in first.json()] == ["ar"]
+    assert client.get("/languages", headers={"If-None-Match": etag}).status_code == 304
+
+    db = test_sessionmaker()
+    try:
+        db.add(database.Language(code="fr", name="French"))
+        db.commit()
+    finally:
+        db.close()
+    invalidate_all()
+    r = client.get("/languages", headers={"If-None-Match": etag})
+    assert r.status_code == 200
+    assert r.headers["etag"] != etag
+
+
+def test_response_cache_serves_repeated_stats(test_sessionmaker, captured_statements):
+    client = TestClient(create_app(test_sessionmaker, response_cache_ttl=30))
+    first = client.get("/flashcards/stats")
+    with captured_statements(test_sessionmaker.kw["bind"]) as statements:
+        second = client.get("/flashcards/stats")
+    assert second.content == first.content
+    assert statements == []
+    assert client.get("/cache/stats").json()["responses"]["hits"] == 1
+
+
+def test_response_cache_expires_and_evicts():
+    now = [0.0]
+    cache = ResponseCache(ttl=10, max_entries=2, clock=lambda: now[0])
+    cache.put("a", b"1")
+    cache.put("b", b"2")
+    cache.put("c", b"3")
+    assert cache.get("a") is None
+    assert cache.get("c") == b"3"
+    now[0] = 11
+    assert cache.get("c") is None
+
+
+def test_imports_and_bumps_advance_the_version(client, test_sessionmaker):
+    etag = client.get("/flashcards/stats").headers["etag"]
+    db = test_sessionmaker()
+    try:
+        language_id = db.query(database.Language).filter_by(code="ar").one().id
+        bump_language_version(db, language_id)
+        bump_language_version(db, language_id)
+        db.commit()
+        assert db.get(database.LanguageVersion, language_id).version == 2
+    finally:
+        db.close()
+
+    sync_terms(test_sessionmaker.kw["bind"], [HEADER, ["book", "كتاب", "", "", "0", "0"]], language_id)
+    r = client.get("/flashcards/stats", headers={"If-None-Match": etag})
+    assert r.status_code == 200
+    assert r.headers["etag"] == f'W/"stats-{language_id}-3"'
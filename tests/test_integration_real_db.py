@@ -1,9 +1,9 @@
 import os
 import pytest
-from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
 import database
+from db_engine import create_db_engine
 from main import create_app
 from fastapi.testclient import TestClient
 
@@ -14,7 +14,7 @@ def test_backend_with_real_database_url():
     if not database_url:
         pytest.skip("DATABASE_URL not set; skipping real DB integration test")
 
-    engine = create_engine(database_url)
+    engine = create_db_engine(database_url)
     SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
     # Prepare schema and seed minimal data
@@ -0,0 +1,60 @@
+from fastapi.testclient import TestClient
+
+from main import create_app
+from metrics import Histogram
+
+
+def _samples(text):
+    samples = {}
+    for line in text.splitlines():
+        if line and not line.startswith("#"):
+            name, value = line.rsplit(" ", 1)
+            samples[name] = float(value)
+    return samples
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram("demo_seconds", "Demo.", ("route",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value, '/a"b')
+    lines = list(histogram.render())
+    assert lines[:2] == ["# HELP demo_seconds Demo.", "# TYPE demo_seconds histogram"]
+    samples = _samples("\n".join(lines))
+    assert samples['demo_seconds_bucket{route="/a\\"b",le="0.1"}'] == 2
+    assert samples['demo_seconds_bucket{route="/a\\"b",le="1.0"}'] == 3
+    assert samples['demo_seconds_bucket{route="/a\\"b",le="+Inf"}'] == 4
+    assert samples['demo_seconds_count{route="/a\\"b"}'] == 4
+    assert samples['demo_seconds_sum{route="/a\\"b"}'] == 3.65
+
+
+def test_metrics_record_routes_statuses_and_queries(client):
+    client.get("/flashcards/random", params={"language_code": "ar"})
+    client.get("/flashcards/random", params={"language_code": "xx"})
+    client.get("/no/such/path")
+
+    r = client.get("/metrics")
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/plain; version=0.0.4")
+    samples = _samples(r.text)
+    assert samples['http_request_duration_seconds_count{method="GET",route="/flashcards/random",status="200"}'] == 1
+    assert samples['http_request_duration_seconds_count{method="GET",route="/flashcards/random",status="404"}'] == 1
+    assert samples['http_request_duration_seconds_count{method="GET",route="unmatched",status="404"}'] == 1
+    # Both /flashcards/random requests queried the database
+    assert samples['db_queries_per_request_count{route="/flashcards/random"}'] == 2
+    assert samples['db_queries_per_request_sum{route="/flashcards/random"}'] >= 2
+    assert samples["db_query_duration_seconds_count"] >= 2
+    assert samples['db_queries_per_request_sum{route="unmatched"}'] == 0
+
+
+def test_metrics_include_pool_gauges(test_sessionmaker):
+    client = TestClient(create_app(test_sessionmaker))
+    client.get("/flashcards/random", params={"language_code": "ar"})
+    samples = _samples(client.get("/metrics").text)
+    assert samples["db_pool_checkouts_total"] >= 1
+    assert samples["db_pool_checked_out"] == 0
+    assert "db_pool_checkout_wait_seconds_total" in samples
+
+
+def test_metrics_can_be_disabled(test_sessionmaker):
+    client = TestClient(create_app(test_sessionmaker, metrics=False))
+    assert client.get("/metrics").status_code == 404
@@ -0,0 +1,60 @@
+from pathlib import Path
+
+import database
+from migrate_data import bulk_import, migrate_data
+
+OUTPUT_CSV = Path(__file__).resolve().parents[1] / "output.csv"
+
+
+def test_bulk_import_dedups_and_reports(test_sessionmaker, arabic_id):
+    engine = test_sessionmaker.kw["bind"]
+    language_id = arabic_id
+
+    report = bulk_import(engine, str(OUTPUT_CSV), language_id)
+    # output.csv has one row without Arabic script and one repeated (english, arabic) pair
+    assert report.rows_read == 136
+    assert report.inserted == 134
+    assert report.skipped == 2
+    assert "total" in report.timings
+
+    again = bulk_import(engine, str(OUTPUT_CSV), language_id)
+    assert again.inserted == 0
+    assert again.skipped == again.rows_read
+
+
+def test_bulk_import_converts_columns(test_sessionmaker, arabic_id):
+    bulk_import(test_sessionmaker.kw["bind"], str(OUTPUT_CSV), arabic_id)
+    db = test_sessionmaker()
+    try:
+        term = db.query(database.Term).filter_by(english_term="Good morning").one()
+        assert term.target_language_term == "صباح الخير"
+        assert term.learned is True
+        assert term.correct_counter == 0
+        assert term.notes is None
+    finally:
+        db.close()
+
+
+def test_row_and_bulk_modes_import_the_same_terms(test_sessionmaker, monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", str(test_sessionmaker.kw["bind"].url))
+    migrate_data(csv_path=str(OUTPUT_CSV))
+    report = migrate_data(bulk=True, csv_path=str(OUTPUT_CSV))
+    assert report.inserted == 0
+
+    db = test_sessionmaker()
+    try:
+        # the seeded "hello" card plus the 134 distinct pairs from the CSV
+        assert db.query(database.Term).count() == 135
+    finally:
+        db.close()
+
+
+def test_bulk_import_writes_answer_keys(test_sessionmaker, arabic_id):
+    bulk_import(test_sessionmaker.kw["bind"], str(OUTPUT_CSV), arabic_id)
+    db = test_sessionmaker()
+    try:
+        assert db.query(database.Term).filter(database.Term.target_language_key.is_(None)).count() == 0
+        term = db.query(database.Term).filter_by(english_term="Good morning").one()
+        assert term.english_key == "good morning"
+    finally:
+        db.close()
@@ -0,0 +1,78 @@
+from sqlalchemy import inspect, text
+
+from db_engine import create_db_engine
+from migrations import LATEST_VERSION, MIGRATIONS, applied_versions, upgrade
+
+# The tables as the original schema.sql dump created them: primary keys only,
+# an integer learned flag and none of the later columns
+OLD_SCHEMA = [
+    "CREATE TABLE languages (id INTEGER PRIMARY KEY, code TEXT NOT NULL, name TEXT NOT NULL)",
+    """CREATE TABLE terms (
+        id_vocabulary INTEGER PRIMARY KEY,
+        language_id INTEGER NOT NULL REFERENCES languages (id),
+        english_term TEXT, target_language_term TEXT, transliteration TEXT,
+        example_sentence TEXT, example_sentence_explained TEXT, notes TEXT,
+        learned INTEGER, correct_counter INTEGER
+    )""",
+    """CREATE TABLE vocab_raw (
+        english TEXT, target_script TEXT, transliteration TEXT, sample_sentence_target TEXT,
+        sample_sentence_explained TEXT, notes TEXT, learned NUMERIC, correct_counter NUMERIC
+    )""",
+]
+
+
+def _old_database(tmp_path):
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'old.sqlite3'}")
+    with engine.begin() as conn:
+        for statement in OLD_SCHEMA:
+            conn.execute(text(statement))
+        conn.execute(text("INSERT INTO languages (id, code, name) VALUES (1, 'ar', 'Arabic')"))
+        conn.execute(text(
+            "INSERT INTO terms (id_vocabulary, language_id, english_term, target_language_term, learned, correct_counter) "
+            "VALUES (1, 1, 'Hello', 'مرحبا', 0, 1), (2, 1, 'Hello', 'مرحبا', 1, 3), "
+            "(3, 1, 'book', 'كتاب', NULL, NULL)"
+        ))
+    return engine
+
+
+def test_upgrade_brings_old_schema_to_head(tmp_path):
+    engine = _old_database(tmp_path)
+    with engine.begin() as conn:
+        assert upgrade(conn) == [migration.version for migration in MIGRATIONS]
+
+    inspector = inspect(engine)
+    term_columns = {column["name"] for column in inspector.get_columns("terms")}
+    assert {"english_key", "target_language_key", "due_at", "ease"} <= term_columns
+    term_indexes = {index["name"] for index in inspector.get_indexes("terms")}
+    assert {"uq_terms_language_pair", "ix_terms_practice_pool", "ix_terms_learned_pool", "ix_terms_due_queue"} <= term_indexes
+    assert {"language_stats", "user_term_progress", "schema_migrations"} <= set(inspector.get_table_names())
+
+    with engine.connect() as conn:
+        rows = conn.execute(text(
+            "SELECT id_vocabulary, learned, correct_counter, english_key FROM terms ORDER BY id_vocabulary"
+        )).all()
+    # The duplicate pair collapses onto the lowest id with the best progress of the two
+    assert rows == [(1, 1, 3, "hello"), (3, 0, 0, "book")]
+
+    # The shared progress carries over to the web UI's default user; untouched terms get no row
+    with engine.connect() as conn:
+        progress = conn.execute(text("SELECT user_id, term_id, learned, correct_counter, ease FROM user_term_progress")).all()
+    assert progress == [("default", 1, 1, 3, 2.5)]
+
+
+def test_upgrade_is_idempotent_and_resumable(tmp_path):
+    engine = _old_database(tmp_path)
+    with engine.begin() as conn:
+        assert upgrade(conn, target=3) == [1, 2, 3]
+    with engine.begin() as conn:
+        assert upgrade(conn) == list(range(4, LATEST_VERSION + 1))
+    with engine.begin() as conn:
+        assert upgrade(conn) == []
+        assert applied_versions(conn) == list(range(1, LATEST_VERSION + 1))
+
+
+def test_upgrade_records_versions_on_a_create_all_database(test_sessionmaker):
+    # The test database comes from create_all, so every step finds its objects in place
+    with test_sessionmaker.kw["bind"].begin() as conn:
+        assert upgrade(conn) == list(range(1, LATEST_VERSION + 1))
+        assert conn.execute(text("SELECT COUNT(*) FROM terms")).scalar() == 1
@@ -0,0 +1,164 @@
+import os
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+import database
+from db_engine import create_db_engine
+from migrations import analyze, upgrade
+from progress import increment_correct, increment_user_correct
+from sampler import due_terms, sample_term
+from scheduler import utcnow
+from stats import aggregate_stats, user_stats
+
+HOT_TABLES = ("terms", "user_term_progress", "languages")
+
+# name -> (hot path, indexes its queries may use; at least one must appear in the plan)
+HOT_PATHS = {
+    # Most of a deck is in practice, so either deck index is a reasonable choice
+    "practice_sample": (
+        lambda db, language_id: sample_term(db, language_id), ("ix_terms_practice_pool", "ix_terms_language_deck")
+    ),
+    "learned_sample": (lambda db, language_id: sample_term(db, language_id, learned_only=True), "ix_terms_learned_pool"),
+    "due_queue": (lambda db, language_id: due_terms(db, language_id, utcnow()), "ix_terms_due_queue"),
+    "user_sample": (lambda db, language_id: sample_term(db, language_id, user_id="u1"), "ix_terms_language_deck"),
+    "user_due_queue": (lambda db, language_id: due_terms(db, language_id, utcnow(), user_id="u1"), "ix_user_progress_due"),
+    "stats": (lambda db, language_id: aggregate_stats(db, language_id), "ix_terms_language_deck"),
+    "user_stats": (lambda db, language_id: user_stats(db, "u1", language_id, total=1), "ix_user_progress_learned"),
+    "language_lookup": (
+        lambda db, language_id: db.query(database.Language).filter(database.Language.code == "ar").first(),
+        "ix_languages_code",
+    ),
+}
+
+
+def _names(index_names):
+    return (index_names,) if isinstance(index_names, str) else index_names
+
+
+def _seed_deck(session_maker, size=300):
+    """Two decks with realistic pool proportions, then ANALYZE so the planner can tell the indexes apart."""
+    db = session_maker()
+    try:
+        language = db.query(database.Language).filter_by(code="ar").one()
+        if db.query(database.Term).filter(database.Term.english_term.like("plan term %")).count() < size:
+            other = db.query(database.Language).filter_by(code="fr").first()
+            if other is None:
+                other = database.Language(code="fr", name="French")
+                db.add(other)
+                db.flush()
+            now = utcnow()
+            terms = [
+                database.Term(
+                    language_id=language.id,
+                    english_term=f"plan term {i}",
+                    target_language_term=f"plan term {i}",
+                    correct_counter=3 if i % 20 == 0 else 0,
+                    learned=i % 20 == 0,
+                    due_at=now if i % 10 == 0 else None,
+                )
+                for i in range(size)
+            ]
+            db.add_all(terms)
+            db.add_all(
+                database.Term(language_id=other.id, english_term=f"plan term {i}", target_language_term=f"terme {i}")
+                for i in range(size)
+            )
+            db.flush()
+            db.add_all(
+                database.UserTermProgress(
+                    user_id="u1",
+                    term_id=term.id_vocabulary,
+                    language_id=language.id,
+                    learned=i % 3 == 0,
+                    correct_counter=3 if i % 3 == 0 else 1,
+                    due_at=now if i % 3 == 1 else None,
+                )
+                for i, term in enumerate(terms[:30])
+            )
+            db.commit()
+    finally:
+        db.close()
+    engine = session_maker.kw["bind"]
+    with engine.begin() as conn:
+        analyze(conn)
+    # SQLite connections read the statistics when they load the schema; start from fresh ones
+    engine.dispose()
+
+
+def _hot_path_statements(session_maker, fn, captured_statements):
+    engine = session_maker.kw["bind"]
+    db = session_maker()
+    try:
+        language_id = db.query(database.Language.id).filter(database.Language.code == "ar").scalar()
+        with captured_statements(engine) as statements:
+            fn(db, language_id)
+        db.rollback()
+    finally:
+        db.close()
+    assert statements
+    return engine, statements
+
+
+@pytest.mark.parametrize("name", sorted(HOT_PATHS))
+def test_hot_queries_use_indexes_sqlite(test_sessionmaker, name, captured_statements):
+    _seed_deck(test_sessionmaker)
+    fn, index_name = HOT_PATHS[name]
+    engine, statements = _hot_path_statements(test_sessionmaker, fn, captured_statements)
+    plans = []
+    with engine.connect() as conn:
+        for statement, parameters in statements:
+            plans += [row[-1] for row in conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters)]
+    full_scans = [line for line in plans if line.startswith(tuple(f"SCAN {table}" for table in HOT_TABLES))]
+    assert not full_scans, plans
+    assert any(name in line for line in plans for name in _names(index_name)), plans
+
+
+def test_answer_writes_seek_by_key(test_sessionmaker, captured_statements):
+    def record(db, language_id):
+        term_id = db.query(database.Term.id_vocabulary).filter(database.Term.language_id == language_id).scalar()
+        increment_correct(db, term_id)
+        increment_user_correct(db, "u1", term_id, language_id)
+
+    engine, statements = _hot_path_statements(test_sessionmaker, record, captured_statements)
+    with engine.connect() as conn:
+        plans = [
+            row[-1]
+            for statement, parameters in statements[1:]
+            for row in conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters)
+        ]
+    assert any("INTEGER PRIMARY KEY" in line for line in plans), plans
+    assert not any(line.startswith("SCAN terms") for line in plans), plans
+
+
+@pytest.mark.integration
+@pytest.mark.parametrize("name", sorted(HOT_PATHS))
+def test_hot_queries_use_indexes_postgres(name, captured_statements):
+    database_url = os.getenv("DATABASE_URL")
+    if not database_url or not database_url.startswith("postgresql"):
+        pytest.skip("DATABASE_URL does not point at Postgres; skipping query plan test")
+
+    engine = create_db_engine(database_url)
+    with engine.begin() as conn:
+        upgrade(conn)
+    session_maker = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    db = session_maker()
+    try:
+        if db.query(database.Language).filter_by(code="ar").first() is None:
+            db.add(database.Language(code="ar", name="Arabic"))
+            db.commit()
+    finally:
+        db.close()
+
+    _seed_deck(session_maker)
+    fn, index_name = HOT_PATHS[name]
+    _, statements = _hot_path_statements(session_maker, fn, captured_statements)
+    plans = []
+    with engine.begin() as conn:
+        # Small test tables would otherwise be read sequentially regardless of indexes
+        conn.exec_driver_sql("SET LOCAL enable_seqscan = off")
+        for statement, parameters in statements:
+            plans += [row[0] for row in conn.exec_driver_sql("EXPLAIN " + statement, parameters)]
+    engine.dispose()
+    assert not any(f"Seq Scan on {table}" in line for line in plans for table in HOT_TABLES), plans
+    assert any(name in line for line in plans for name in _names(index_name)), plans
@@ -0,0 +1,97 @@
+import random
+from collections import Counter
+
+import database
+from sampler import sample_term, sample_terms
+
+
+def test_sample_term_only_returns_practice_terms(test_sessionmaker, add_terms):
+    language_id = add_terms([("done", 3, True), ("almost", 2, False)])
+    db = test_sessionmaker()
+    try:
+        rng = random.Random(0)
+        seen = {sample_term(db, language_id, rng=rng).english_term for _ in range(50)}
+    finally:
+        db.close()
+    assert seen == {"hello", "almost"}
+
+
+def test_sample_term_learned_only(test_sessionmaker, add_terms):
+    language_id = add_terms([("done", 3, True), ("almost", 2, False)])
+    db = test_sessionmaker()
+    try:
+        term = sample_term(db, language_id, learned_only=True)
+    finally:
+        db.close()
+    assert term.english_term == "done"
+
+
+def test_sample_term_respects_exclude_id(test_sessionmaker, add_terms):
+    language_id = add_terms([("second", 0, False)])
+    db = test_sessionmaker()
+    try:
+        hello = db.query(database.Term).filter_by(english_term="hello").one()
+        rng = random.Random(1)
+        seen = {sample_term(db, language_id, exclude_id=hello.id_vocabulary, rng=rng).english_term for _ in range(20)}
+        assert sample_term(db, language_id, learned_only=True) is None
+    finally:
+        db.close()
+    assert seen == {"second"}
+
+
+def test_sample_term_is_uniform_over_scattered_cards(test_sessionmaker, add_terms):
+    # 30 practice cards scattered between learned ones: the gaps in front of them range from 1 to dozens of ids
+    practice = set(random.Random(7).sample(range(300), 30))
+    language_id = add_terms([(f"w{i}", 0 if i in practice else 3, i not in practice) for i in range(300)])
+    draws = 3100
+    db = test_sessionmaker()
+    try:
+        rng = random.Random(0)
+        counts = Counter(sample_term(db, language_id, rng=rng).english_term for _ in range(draws))
+    finally:
+        db.close()
+    assert len(counts) == 31
+    expected = draws / 31
+    chi_square = sum((count - expected) ** 2 / expected for count in counts.values())
+    # 59.7 is the 99.9th percentile of chi-square with 30 degrees of freedom
+    assert chi_square < 59.7, counts
+
+
+def test_random_flashcard_excluding_only_card_returns_404(client):
+    card = client.get("/flashcards/random", params={"language_code": "ar"}).json()
+    r = client.get("/flashcards/random", params={"language_code": "ar", "exclude_id": card["id_vocabulary"]})
+    assert r.status_code == 404
+    assert r.json().get("detail") == "No flashcards available"
+
+
+def test_sample_terms_seeks_distinct_practice_terms(test_sessionmaker, add_terms):
+    # Wide id span so sample_terms takes the UNION ALL seek path
+    language_id = add_terms([(f"w{i}", i % 4, i % 4 == 3) for i in range(200)])
+    db = test_sessionmaker()
+    try:
+        hello = db.query(database.Term).filter_by(english_term="hello").one()
+        for seed in range(5):
+            terms = sample_terms(db, language_id, 10, exclude_id=hello.id_vocabulary, rng=random.Random(seed))
+            assert len({term.id_vocabulary for term in terms}) == len(terms) == 10
+            assert all(term.correct_counter < 3 for term in terms)
+            assert hello.id_vocabulary not in {term.id_vocabulary for term in terms}
+
+        learned = sample_terms(db, language_id, 10, learned_only=True, rng=random.Random(0))
+        assert len(learned) == 10
+        assert all(term.learned for term in learned)
+    finally:
+        db.close()
+
+
+def test_sample_terms_returns_every_eligible_card_on_a_sparse_range(test_sessionmaker, add_terms):
+    # hello, then 2000 learned cards, then 9 practice cards: almost every probe misses
+    language_id = add_terms([(f"w{i}", 3, True) for i in range(2000)] + [(f"p{i}", 0, False) for i in range(9)])
+    db = test_sessionmaker()
+    try:
+        for n in (5, 10, 20):
+            for seed in range(3):
+                terms = sample_terms(db, language_id, n, rng=random.Random(seed))
+                assert len({term.id_vocabulary for term in terms}) == len(terms) == min(n, 10)
+                assert all(term.correct_counter < 3 for term in terms)
+    finally:
+        db.close()
@@ -0,0 +1,105 @@
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+import database
+from main import create_app
+from scheduler import MIN_EASE, RELEARN_DELAY, Schedule, answer_quality, review
+
+NOW = datetime(2024, 1, 1, 12, 0)
+
+
+@pytest.fixture
+def scheduling_client(test_sessionmaker):
+    return TestClient(create_app(test_sessionmaker, scheduling=True))
+
+
+def test_review_intervals_follow_sm2():
+    schedule = Schedule()
+    intervals = []
+    for _ in range(4):
+        schedule = review(schedule, 5, NOW)
+        intervals.append(schedule.interval_days)
+    assert intervals == [1, 6, 16, 45]
+    assert schedule.repetitions == 4
+    assert schedule.ease == pytest.approx(2.9)
+    assert schedule.due_at == NOW + timedelta(days=45)
+
+
+def test_review_quality_four_keeps_ease():
+    schedule = review(Schedule(), answer_quality(True), NOW)
+    assert schedule.ease == pytest.approx(2.5)
+    assert (schedule.interval_days, schedule.repetitions) == (1, 1)
+
+
+def test_failed_review_resets_and_relearns_soon():
+    schedule = Schedule(NOW, 16, 2.5, 3)
+    failed = review(schedule, answer_quality(False), NOW)
+    assert failed == Schedule(NOW + RELEARN_DELAY, 0, pytest.approx(2.18), 0)
+
+
+def test_ease_never_drops_below_minimum():
+    schedule = Schedule()
+    for _ in range(10):
+        schedule = review(schedule, 0, NOW)
+    assert schedule.ease == MIN_EASE
+
+
+def test_review_rejects_out_of_range_quality():
+    with pytest.raises(ValueError):
+        review(Schedule(), 6, NOW)
+
+
+def test_answer_schedules_term(scheduling_client, test_sessionmaker):
+    card = scheduling_client.get("/flashcards/random", params={"language_code": "ar"}).json()
+    r = scheduling_client.post(
+        "/flashcards/answer",
+        json={"term_id": card["id_vocabulary"], "user_answer": "nope", "answer_type": "english"},
+    )
+    assert r.json()["correct"] is False
+
+    db = test_sessionmaker()
+    try:
+        term = db.get(database.Term, card["id_vocabulary"])
+        assert term.due_at is not None
+        assert (term.interval_days, term.repetitions) == (0, 0)
+    finally:
+        db.close()
+
+
+def test_due_card_is_served_before_random_practice(scheduling_client, test_sessionmaker):
+    db = test_sessionmaker()
+    try:
+        lang = db.query(database.Language).filter_by(code="ar").one()
+        for i in range(20):
+            db.add(database.Term(language_id=lang.id, english_term=f"new {i}", target_language_term=f"new {i}"))
+        # Learned terms are still reviewed when due
+        due = database.Term(
+            language_id=lang.id, english_term="due", target_language_term="due",
+            correct_counter=5, learned=True, due_at=NOW, interval_days=6, repetitions=2,
+        )
+        later = database.Term(
+            language_id=lang.id, english_term="later", target_language_term="later",
+            due_at=datetime(2999, 1, 1),
+        )
+        db.add_all([due, later])
+        db.commit()
+        due_id = due.id_vocabulary
+    finally:
+        db.close()
+
+    for _ in range(3):
+        card = scheduling_client.get("/flashcards/random", params={"language_code": "ar"}).json()
+        assert card["id_vocabulary"] == due_id
+    queue = scheduling_client.get("/flashcards/queue", params={"language_code": "ar", "n": 5}).json()
+    assert queue[0]["id_vocabulary"] == due_id
+    assert len({card["id_vocabulary"] for card in queue}) == 5
+
+    r = scheduling_client.post(
+        "/flashcards/answer",
+        json={"term_id": due_id, "user_answer": "due", "answer_type": "english"},
+    )
+    assert r.json()["correct"] is True
+    card = scheduling_client.get("/flashcards/random", params={"language_code": "ar"}).json()
+    assert card["id_vocabulary"] != due_id
@@ -0,0 +1,131 @@
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import database
+from cache import invalidate_all
+from grading import search_key
+from main import create_app
+from search import NgramIndex, NgramIndexCache, parse_cursor
+
+TERMS = [
+    ("Good morning", "صَباح الخير", "ṣabāḥ al-khayr"),
+    ("morning star", "نجمة الصباح", None),
+    ("the book", "الكتاب", "al-kitāb"),
+    ("evening", "مساء", "masāʾ"),
+]
+
+
+@pytest.fixture
+def vocabulary(test_sessionmaker):
+    db = test_sessionmaker()
+    try:
+        language_id = db.query(database.Language).filter_by(code="ar").one().id
+        for english, arabic, transliteration in TERMS:
+            db.add(database.Term(
+                language_id=language_id, english_term=english, target_language_term=arabic, transliteration=transliteration
+            ))
+        db.commit()
+    finally:
+        db.close()
+    # Other tests' apps may have indexed the previous contents of the database
+    invalidate_all()
+    return language_id
+
+
+def _english(response):
+    return [item["english_term"] for item in response.json()["items"]]
+
+
+def test_search_key_normalizes_arabic_and_transliteration():
+    assert search_key("The Book", "الكِتاب", "al-kitāb") == "the book كتاب al kitab"
+    assert search_key("أحمد") == search_key("احمد")
+    assert search_key("?!") is None
+
+
+@pytest.mark.usefixtures("vocabulary")
+def test_words_search_matches_word_prefixes(client):
+    assert _english(client.get("/terms/search", params={"q": "morn"})) == ["Good morning", "morning star"]
+    # Arabic without its article, diacritics or exact spelling still matches
+    assert _english(client.get("/terms/search", params={"q": "صباح"})) == ["Good morning", "morning star"]
+    assert _english(client.get("/terms/search", params={"q": "الكتاب"})) == ["the book"]
+    assert _english(client.get("/terms/search", params={"q": "kitab"})) == ["the book"]
+    # Every word has to match
+    assert _english(client.get("/terms/search", params={"q": "morning star"})) == ["morning star"]
+    assert _english(client.get("/terms/search", params={"q": "orning"})) == []
+
+
+@pytest.mark.usefixtures("vocabulary")
+def test_fuzzy_search_tolerates_typos(client):
+    r = client.get("/terms/search", params={"q": "evning", "mode": "fuzzy"})
+    assert _english(r) == ["evening"]
+    assert client.get("/terms/search", params={"q": "evning"}).json()["items"] == []
+
+
+@pytest.mark.usefixtures("vocabulary")
+def test_search_pages_with_a_cursor(client):
+    first = client.get("/terms/search", params={"q": "m", "limit": 2}).json()
+    # The seeded "hello" matches through its transliteration "marhaba", "evening" through "masa"
+    assert [item["english_term"] for item in first["items"]] == ["hello", "Good morning"]
+    second = client.get("/terms/search", params={"q": "m", "limit": 2, "cursor": first["next_cursor"]}).json()
+    assert [item["english_term"] for item in second["items"]] == ["morning star", "evening"]
+    assert second["next_cursor"] is None
+
+
+def test_searches_use_the_previous_index_while_it_rebuilds(seed_minimal_data, vocabulary, test_sessionmaker, monkeypatch):
+    builds = []
+    release = threading.Event()
+    read = NgramIndexCache.read
+
+    def slow_read(self, db):
+        builds.append(db)
+        if len(builds) > 1:
+            release.wait(5)
+        return read(self, db)
+
+    monkeypatch.setattr(NgramIndexCache, "read", slow_read)
+    with TestClient(create_app(test_sessionmaker)) as client:
+        assert _english(client.get("/terms/search", params={"q": "star"})) == ["morning star"]
+        db = test_sessionmaker()
+        try:
+            db.add(database.Term(language_id=vocabulary, english_term="star anise", target_language_term="يانسون"))
+            db.commit()
+        finally:
+            db.close()
+        invalidate_all()
+
+        # The first search after the invalidation starts the rebuild; none of them waits for it or starts another
+        for _ in range(3):
+            assert _english(client.get("/terms/search", params={"q": "star"})) == ["morning star"]
+        assert len(builds) == 2
+        assert client.get("/cache/stats").json()["ngram_index"]["stale_hits"] == 3
+
+        release.set()
+        deadline = time.monotonic() + 5
+        while client.get("/cache/stats").json()["ngram_index"]["misses"] < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert _english(client.get("/terms/search", params={"q": "star"})) == ["morning star", "star anise"]
+    assert len(builds) == 2
+
+
+def test_search_rejects_bad_input(client):
+    assert client.get("/terms/search", params={"q": "x", "mode": "regex"}).status_code == 400
+    assert client.get("/terms/search", params={"q": "x", "cursor": "abc"}).status_code == 400
+    assert client.get("/terms/search", params={"q": "x", "language_code": "xx"}).status_code == 404
+
+
+def test_fuzzy_pages_cover_every_match_once():
+    index = NgramIndex([(i, search_key(f"morning {i}")) for i in range(1, 8)] + [(8, "mourning")])
+    seen, after = [], None
+    while True:
+        page = index.fuzzy("morning", after, 3)
+        if not page:
+            break
+        seen += [term_id for _, term_id in page]
+        after = page[-1]
+    # Exact matches first in id order, then the near miss
+    assert seen == list(range(1, 9))
+    with pytest.raises(ValueError):
+        parse_cursor("fuzzy", "nan:3")
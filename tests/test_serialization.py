@@ -0,0 +1,39 @@
+import math
+
+import pytest
+
+import database
+from main import CARD_COLUMNS
+from sampler import sample_term, sample_terms
+from schemas import FlashcardResponse
+from serialization import dumps, stdlib_dumps
+
+
+def test_dumps_matches_the_stdlib_rendering():
+    payload = {"english_term": "hello", "target_language_term": "مرحبا", "notes": None, "n": [1, 2.5, True]}
+    assert dumps(payload) == stdlib_dumps(payload)
+    assert "مرحبا".encode("utf-8") in dumps(payload)
+    with pytest.raises(ValueError):
+        stdlib_dumps({"x": math.nan})
+
+
+def test_column_rows_carry_the_card_fields(test_sessionmaker):
+    db = test_sessionmaker()
+    try:
+        language_id = db.query(database.Language).filter_by(code="ar").one().id
+        row = sample_term(db, language_id, columns=CARD_COLUMNS)
+        assert list(row._mapping) == list(FlashcardResponse.model_fields)
+        assert [r.english_term for r in sample_terms(db, language_id, 5, columns=CARD_COLUMNS)] == ["hello"]
+        # Nothing was loaded into the identity map
+        assert len(db.identity_map) == 0
+    finally:
+        db.close()
+
+
+def test_card_endpoints_still_match_the_response_model(client):
+    card = client.get("/flashcards/random", params={"language_code": "ar"}).json()
+    assert FlashcardResponse.model_validate(card).model_dump() == card
+    assert card["target_language_term"] == "مرحبا"
+
+    queue = client.get("/flashcards/queue", params={"language_code": "ar", "n": 5}).json()
+    assert queue == [card]
@@ -0,0 +1,76 @@
+import random
+
+import pytest
+from fastapi.testclient import TestClient
+
+import database
+from cache import invalidate_all
+from main import CARD_COLUMNS, create_app
+from serialization import card_payload
+from snapshot import DeckSnapshots
+
+
+@pytest.fixture(params=["sync", "async"])
+def snapshot_client(request, test_sessionmaker, async_test_sessionmaker):
+    session_maker = async_test_sessionmaker if request.param == "async" else test_sessionmaker
+    return TestClient(create_app(session_maker, deck_snapshot=True))
+
+
+def test_snapshot_cards_match_the_database(test_sessionmaker, add_terms):
+    language_id = add_terms([("book", 1, False), ("pen", 0, False)], notes="see the grammar appendix")
+    db = test_sessionmaker()
+    try:
+        deck = DeckSnapshots(ttl=300).deck(db, language_id)
+        rows = db.query(*CARD_COLUMNS).order_by(database.Term.id_vocabulary).all()
+    finally:
+        db.close()
+    assert [deck.card(position, row.correct_counter) for position, row in enumerate(rows)] == [card_payload(row) for row in rows]
+    assert deck._text.count(b"grammar appendix") == 1
+
+
+def test_snapshot_serves_only_eligible_cards(snapshot_client, test_sessionmaker, add_terms):
+    add_terms([("done", 3, True), ("almost", 2, False)])
+    params = {"language_code": "ar"}
+    seen = {snapshot_client.get("/flashcards/random", params=params).json()["english_term"] for _ in range(30)}
+    assert seen == {"hello", "almost"}
+    learned = snapshot_client.get("/flashcards/random", params={**params, "learned_only": True}).json()
+    assert learned["english_term"] == "done"
+    queue = snapshot_client.get("/flashcards/queue", params={**params, "n": 5}).json()
+    assert sorted(card["english_term"] for card in queue) == ["almost", "hello"]
+    assert snapshot_client.get("/cache/stats").json()["decks"]["terms"] == 3
+
+
+def test_progress_is_read_per_request(snapshot_client, test_sessionmaker):
+    params = {"language_code": "ar"}
+    card = snapshot_client.get("/flashcards/random", params=params).json()
+    assert card["correct_counter"] == 0
+    answer = {"term_id": card["id_vocabulary"], "user_answer": "hello", "answer_type": "english"}
+    snapshot_client.post("/flashcards/answer", json=answer)
+    assert snapshot_client.get("/flashcards/random", params=params).json()["correct_counter"] == 1
+
+    # A user's learned cards leave only that user's practice pool
+    headers = {"X-User-Id": "alice"}
+    for _ in range(3):
+        snapshot_client.post("/flashcards/answer", json=answer, headers=headers)
+    assert snapshot_client.get("/flashcards/random", params=params, headers=headers).status_code == 404
+    assert snapshot_client.get("/flashcards/random", params=params).json()["id_vocabulary"] == card["id_vocabulary"]
+
+
+def test_deck_changes_show_up_after_invalidation(test_sessionmaker, add_terms):
+    snapshots = DeckSnapshots(ttl=300)
+    language_id = add_terms([("book", 0, False), ("pen", 0, False)])
+    db = test_sessionmaker()
+    try:
+        assert len(snapshots.deck(db, language_id)) == 3
+        db.query(database.Term).filter_by(english_term="book").delete()
+        db.commit()
+        add_terms([("ink", 0, False)])
+
+        # Deleted cards are skipped at once; new ones wait for the next load
+        cards = snapshots.sample_cards(db, language_id, 5, rng=random.Random(0))
+        assert sorted(card["english_term"] for card in cards) == ["hello", "pen"]
+        invalidate_all()
+        cards = snapshots.sample_cards(db, language_id, 5, rng=random.Random(0))
+        assert sorted(card["english_term"] for card in cards) == ["hello", "ink", "pen"]
+    finally:
+        db.close()
@@ -0,0 +1,43 @@
+import csv
+
+from openpyxl import Workbook
+
+from spreadsheet import convert_to_csv, iter_sheet_rows
+
+
+def _write_workbook(path):
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.title = "Master List"
+    sheet.append(["Words (English)", "Word (Arabic script)", "Learned", "Correct Counter", None])
+    sheet.append(["hello", "مرحبا", True, 0])
+    sheet.append([None, None, None, None])
+    sheet.append(["who", None, None, None])
+    sheet.append(["and", "و", False, 2])
+    other = workbook.create_sheet("Other")
+    other.append(["Words (English)"])
+    other.append(["only"])
+    workbook.save(path)
+
+
+def test_convert_to_csv_streams_rows_in_chunks(tmp_path):
+    xlsx, out = tmp_path / "deck.xlsx", tmp_path / "out.csv"
+    _write_workbook(xlsx)
+
+    written = convert_to_csv(str(xlsx), str(out), chunk_size=1)
+
+    with open(out, newline="", encoding="utf-8") as fh:
+        rows = list(csv.reader(fh))
+    assert written == 3
+    assert rows == [
+        ["Words (English)", "Word (Arabic script)", "Learned", "Correct Counter"],
+        ["hello", "مرحبا", "1", "0"],
+        ["who", "", "", ""],
+        ["and", "و", "0", "2"],
+    ]
+
+
+def test_iter_sheet_rows_reads_named_sheet(tmp_path):
+    xlsx = tmp_path / "deck.xlsx"
+    _write_workbook(xlsx)
+    assert list(iter_sheet_rows(str(xlsx), sheet="Other")) == [["Words (English)"], ["only"]]
@@ -0,0 +1,60 @@
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+from sqlalchemy import inspect
+from sqlalchemy.orm import sessionmaker
+
+from db_engine import create_db_engine
+from main import create_app
+from migrations import LATEST_VERSION, applied_versions
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+# Cumulative `import main` time: about 0.8 s today, nearly all FastAPI and
+# SQLAlchemy. Loose, so slow CI machines pass; it catches gross regressions
+IMPORT_BUDGET_SECONDS = 3.0
+# Only loaded by the jobs that need them
+OPTIONAL_MODULES = {"pandas", "numpy", "openpyxl", "migrations"}
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+\d+ \|\s+(\d+) \| (\s*)(\S+)")
+
+
+def _importtime(module: str) -> dict:
+    """Import `module` in a fresh interpreter; return {top-level package: cumulative µs}."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=PROJECT_ROOT, capture_output=True, text=True, check=True,
+    )
+    timings = {}
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            cumulative, _indent, name = match.groups()
+            package = name.split(".")[0]
+            timings[package] = max(timings.get(package, 0), int(cumulative))
+    return timings
+
+
+def test_api_import_stays_lean():
+    timings = _importtime("main")
+    assert not OPTIONAL_MODULES & timings.keys()
+    assert timings["main"] / 1e6 < IMPORT_BUDGET_SECONDS
+
+
+def test_migrate_data_imports_pandas_only_for_the_orm_import():
+    assert "pandas" not in _importtime("migrate_data")
+
+
+def test_schema_is_only_upgraded_when_asked(tmp_path):
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'empty.sqlite3'}")
+    session_maker = sessionmaker(bind=engine)
+    with TestClient(create_app(session_maker)):
+        pass
+    assert inspect(engine).get_table_names() == []
+
+    with TestClient(create_app(session_maker, migrate=True)):
+        pass
+    with engine.connect() as conn:
+        assert applied_versions(conn)[-1] == LATEST_VERSION
@@ -0,0 +1,77 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import database
+from main import create_app
+from stats import aggregate_stats
+
+
+@pytest.fixture
+def counters_client(test_sessionmaker):
+    return TestClient(create_app(test_sessionmaker, stats_counters=True))
+
+
+def _answer(client, correct=True):
+    card = client.get("/flashcards/random", params={"language_code": "ar"}).json()
+    client.post(
+        "/flashcards/answer",
+        json={"term_id": card["id_vocabulary"], "user_answer": "hello" if correct else "nope", "answer_type": "english"},
+    )
+
+
+def test_stats_counts_seeded_deck(client):
+    r = client.get("/flashcards/stats", params={"language_code": "ar"})
+    assert r.status_code == 200
+    assert r.json() == {"total_terms": 1, "learned_terms": 0, "practice_terms": 1, "progress_percentage": 0.0}
+
+
+def test_stats_unknown_language_returns_404(client):
+    r = client.get("/flashcards/stats", params={"language_code": "xx"})
+    assert r.status_code == 404
+
+
+def test_aggregate_stats_single_query_matches_counts(test_sessionmaker):
+    db = test_sessionmaker()
+    try:
+        lang = db.query(database.Language).filter_by(code="ar").one()
+        db.add(database.Term(language_id=lang.id, english_term="a", target_language_term="a", correct_counter=3, learned=True))
+        db.add(database.Term(language_id=lang.id, english_term="b", target_language_term="b", correct_counter=1, learned=True))
+        db.commit()
+        assert aggregate_stats(db, lang.id) == (3, 2, 2)
+    finally:
+        db.close()
+
+
+def test_stats_counters_follow_answers(counters_client, test_sessionmaker):
+    before = counters_client.get("/flashcards/stats", params={"language_code": "ar"}).json()
+    assert before["practice_terms"] == 1
+
+    _answer(counters_client, correct=False)
+    for _ in range(3):
+        _answer(counters_client)
+
+    after = counters_client.get("/flashcards/stats", params={"language_code": "ar"}).json()
+    assert after == {"total_terms": 1, "learned_terms": 1, "practice_terms": 0, "progress_percentage": 100.0}
+
+    db = test_sessionmaker()
+    try:
+        lang = db.query(database.Language).filter_by(code="ar").one()
+        assert aggregate_stats(db, lang.id) == (1, 1, 0)
+    finally:
+        db.close()
+
+
+@pytest.mark.parametrize("mode", ["sync", "async"])
+def test_startup_rebuilds_stale_counters(mode, test_sessionmaker, async_test_sessionmaker):
+    db = test_sessionmaker()
+    try:
+        lang = db.query(database.Language).filter_by(code="ar").one()
+        db.add(database.LanguageStats(language_id=lang.id, total_terms=7, learned_terms=7, practice_terms=0))
+        db.commit()
+    finally:
+        db.close()
+
+    session_maker = async_test_sessionmaker if mode == "async" else test_sessionmaker
+    with TestClient(create_app(session_maker, stats_counters=True)) as client:
+        r = client.get("/flashcards/stats", params={"language_code": "ar"})
+    assert r.json() == {"total_terms": 1, "learned_terms": 0, "practice_terms": 1, "progress_percentage": 0.0}
@@ -0,0 +1,127 @@
+from pathlib import Path
+
+import pytest
+from openpyxl import Workbook
+
+import database
+from migrate_data import bulk_import
+from sync import iter_file_rows, sync_terms
+
+OUTPUT_CSV = Path(__file__).resolve().parents[1] / "output.csv"
+HEADER = ["Words (English)", "Word (Arabic script)", "Word (Arabic with Roman characters)", "Notes", "Learned", "Correct Counter"]
+
+
+def _terms(test_sessionmaker):
+    db = test_sessionmaker()
+    try:
+        return {term.english_term: term for term in db.query(database.Term).all()}
+    finally:
+        db.close()
+
+
+@pytest.fixture
+def sync(test_sessionmaker, arabic_id):
+    def run(rows, **kwargs):
+        return sync_terms(test_sessionmaker.kw["bind"], [HEADER] + rows, arabic_id, **kwargs)
+    return run
+
+
+def test_sync_inserts_updates_and_deletes(test_sessionmaker, sync):
+    first = sync([
+        ["hello", "مرحبا", "marḥaba", "", "0", "0"],
+        ["book", "كتاب", "", "noun", "1", "3"],
+        ["door", "باب", "", "", "", ""],
+    ])
+    # "hello" was seeded by conftest without a hash; its content matches, so it only gets one
+    assert (first.inserted, first.updated, first.deleted, first.unchanged) == (2, 0, 0, 1)
+    assert _terms(test_sessionmaker)["book"].learned is True
+
+    second = sync([
+        ["hello", "مرحبا", "marḥaba", "greeting", "0", "0"],
+        ["book", "كتاب", "", "noun", "0", "0"],
+        ["pen", "قلم", "", "", "0", "0"],
+    ])
+    assert (second.inserted, second.updated, second.deleted, second.unchanged) == (1, 1, 1, 1)
+    terms = _terms(test_sessionmaker)
+    assert set(terms) == {"hello", "book", "pen"}
+    assert terms["hello"].notes == "greeting"
+    # Progress in the sheet is only used for new terms
+    assert terms["book"].learned is True and terms["book"].correct_counter == 3
+
+
+def test_sync_keeps_progress_across_edited_translations(test_sessionmaker, sync):
+    sync([["hello", "مرحبا", "marḥaba", "", "0", "0"], ["book", "كتاب", "", "", "0", "0"]])
+    db = test_sessionmaker()
+    try:
+        book = db.query(database.Term).filter_by(english_term="book").one()
+        book.correct_counter = 2
+        db.add(database.UserTermProgress(
+            user_id="u1", term_id=book.id_vocabulary, language_id=book.language_id, correct_counter=1
+        ))
+        db.commit()
+        book_id = book.id_vocabulary
+    finally:
+        db.close()
+
+    report = sync([["hello", "مرحبا", "marḥaba", "", "0", "0"], ["book", "الكتاب", "", "", "0", "0"]])
+    assert (report.renamed, report.inserted, report.deleted) == (1, 0, 0)
+    db = test_sessionmaker()
+    try:
+        book = db.get(database.Term, book_id)
+        assert book.target_language_term == "الكتاب"
+        assert book.target_language_key == "الكتاب"
+        assert book.correct_counter == 2
+        assert db.query(database.UserTermProgress).count() == 1
+    finally:
+        db.close()
+
+
+def test_sync_deletes_user_progress_of_removed_terms(test_sessionmaker, sync):
+    sync([["hello", "مرحبا", "marḥaba", "", "0", "0"], ["door", "باب", "", "", "0", "0"]])
+    terms = _terms(test_sessionmaker)
+    db = test_sessionmaker()
+    try:
+        door = terms["door"]
+        db.add(database.UserTermProgress(user_id="u1", term_id=door.id_vocabulary, language_id=door.language_id))
+        db.commit()
+    finally:
+        db.close()
+
+    report = sync([["hello", "مرحبا", "marḥaba", "", "0", "0"], ["window", "شباك", "", "", "0", "0"]])
+    # Nothing is shared between "door" and "window", so this is a delete and an insert
+    assert (report.renamed, report.inserted, report.deleted) == (0, 1, 1)
+    db = test_sessionmaker()
+    try:
+        assert db.query(database.UserTermProgress).count() == 0
+    finally:
+        db.close()
+
+
+def test_dry_run_writes_nothing(test_sessionmaker, sync):
+    report = sync([["book", "كتاب", "", "", "0", "0"]], dry_run=True)
+    assert (report.inserted, report.deleted) == (1, 1)
+    assert set(_terms(test_sessionmaker)) == {"hello"}
+
+
+def test_resync_after_bulk_import_changes_nothing(test_sessionmaker, arabic_id):
+    engine = test_sessionmaker.kw["bind"]
+    language_id = arabic_id
+    bulk_import(engine, str(OUTPUT_CSV), language_id)
+
+    report = sync_terms(engine, iter_file_rows(str(OUTPUT_CSV)), language_id)
+    # The seeded "hello" card is not in output.csv
+    assert (report.inserted, report.updated, report.renamed, report.deleted) == (0, 0, 0, 1)
+    assert report.unchanged == 134
+
+
+def test_sync_reads_spreadsheets(test_sessionmaker, tmp_path, arabic_id):
+    workbook = Workbook()
+    workbook.active.append(HEADER)
+    workbook.active.append(["hello", "مرحبا", "marḥaba", None, False, 0])
+    workbook.active.append(["book", "كتاب", "", "noun", True, 3])
+    path = tmp_path / "deck.xlsx"
+    workbook.save(path)
+
+    report = sync_terms(test_sessionmaker.kw["bind"], iter_file_rows(str(path)), arabic_id)
+    assert (report.inserted, report.unchanged) == (1, 1)
+    assert _terms(test_sessionmaker)["book"].correct_counter == 3
@@ -0,0 +1,95 @@
+from fastapi.testclient import TestClient
+
+import database
+from main import create_app
+
+ALICE = {"X-User-Id": "alice"}
+BOB = {"X-User-Id": "bob"}
+
+
+def _answer(client, headers, term_id, user_answer="hello"):
+    return client.post(
+        "/flashcards/answer",
+        json={"term_id": term_id, "user_answer": user_answer, "answer_type": "english"},
+        headers=headers,
+    ).json()
+
+
+def _hello_id(test_sessionmaker):
+    db = test_sessionmaker()
+    try:
+        return db.query(database.Term).filter_by(english_term="hello").one().id_vocabulary
+    finally:
+        db.close()
+
+
+def test_progress_is_tracked_per_user(client, test_sessionmaker):
+    term_id = _hello_id(test_sessionmaker)
+    for _ in range(3):
+        assert _answer(client, ALICE, term_id)["correct"] is True
+    _answer(client, BOB, term_id)
+
+    db = test_sessionmaker()
+    try:
+        rows = {row.user_id: row for row in db.query(database.UserTermProgress)}
+        assert (rows["alice"].correct_counter, rows["alice"].learned) == (3, True)
+        assert (rows["bob"].correct_counter, rows["bob"].learned) == (1, False)
+        # The shared vocabulary row is not written
+        assert db.get(database.Term, term_id).correct_counter == 0
+    finally:
+        db.close()
+
+    alice = client.get("/flashcards/stats", params={"language_code": "ar"}, headers=ALICE).json()
+    bob = client.get("/flashcards/stats", params={"language_code": "ar"}, headers=BOB).json()
+    shared = client.get("/flashcards/stats", params={"language_code": "ar"}).json()
+    assert alice == {"total_terms": 1, "learned_terms": 1, "practice_terms": 0, "progress_percentage": 100.0}
+    assert bob == {"total_terms": 1, "learned_terms": 0, "practice_terms": 1, "progress_percentage": 0.0}
+    assert shared["learned_terms"] == 0
+
+
+def test_random_and_queue_use_the_users_learned_set(client, test_sessionmaker):
+    term_id = _hello_id(test_sessionmaker)
+    for _ in range(3):
+        _answer(client, ALICE, term_id)
+
+    r = client.get("/flashcards/random", params={"language_code": "ar"}, headers=ALICE)
+    assert r.status_code == 404
+    assert client.get("/flashcards/queue", params={"language_code": "ar"}, headers=ALICE).json() == []
+    learned = client.get("/flashcards/random", params={"language_code": "ar", "learned_only": True}, headers=ALICE)
+    assert learned.json()["id_vocabulary"] == term_id
+
+    assert client.get("/flashcards/random", params={"language_code": "ar"}, headers=BOB).status_code == 200
+    r = client.get("/flashcards/random", params={"language_code": "ar", "learned_only": True}, headers=BOB)
+    assert r.status_code == 404
+
+
+def test_batch_answers_count_per_user(client, test_sessionmaker):
+    term_id = _hello_id(test_sessionmaker)
+    batch = [{"term_id": term_id, "user_answer": "hello", "answer_type": "english"}] * 4
+    assert client.post("/flashcards/answers/batch", json=batch, headers=ALICE).status_code == 200
+
+    db = test_sessionmaker()
+    try:
+        row = db.get(database.UserTermProgress, ("alice", term_id))
+        assert (row.correct_counter, row.learned) == (4, True)
+    finally:
+        db.close()
+
+
+def test_user_schedule_is_separate(test_sessionmaker):
+    client = TestClient(create_app(test_sessionmaker, scheduling=True))
+    term_id = _hello_id(test_sessionmaker)
+    _answer(client, ALICE, term_id, user_answer="nope")
+
+    db = test_sessionmaker()
+    try:
+        row = db.get(database.UserTermProgress, ("alice", term_id))
+        assert row.due_at is not None and row.correct_counter == 0
+        assert db.get(database.Term, term_id).due_at is None
+    finally:
+        db.close()
+
+
+def test_overlong_user_id_is_rejected(client):
+    r = client.get("/flashcards/random", params={"language_code": "ar"}, headers={"X-User-Id": "x" * 65})
+    assert r.status_code == 422